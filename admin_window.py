@@ -1,15 +1,22 @@
-from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, QComboBox, QMessageBox
-from models import User, Role, UserRole
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QTableView, QAbstractItemView, QComboBox, QMessageBox
+from models import User, UserRole
 from create_user_dialog import CreateUserDialog
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 from edit_user_dialog import EditUserDialog
+from query_executor import QueryExecutor
+from loading_overlay import LoadingOverlay
+from permissions import Permissions
+from table_models import UserTableModel
 
 class AdminWindow(QMainWindow):
-    def __init__(self, session: Session, user: User, role: str):
+    def __init__(self, session: Session, user: User, permissions: Permissions):
         super().__init__()
         self.session = session
         self.user = user
-        self.role = role
+        self.permissions = permissions
+        # Страницы списка пользователей читаются в фоновом потоке
+        self.executor = QueryExecutor(sessionmaker(bind=session.get_bind()), self)
         self.setWindowTitle("Интерфейс администратора - Управление пользователями")
         self.setGeometry(100, 100, 600, 400)
 
@@ -30,10 +37,27 @@ class AdminWindow(QMainWindow):
         buttons_layout.addWidget(self.delete_user_button)
         layout.addLayout(buttons_layout)
 
-        # Таблица пользователей
-        self.user_table = QTableWidget()
-        self.user_table.setColumnCount(3)
-        self.user_table.setHorizontalHeaderLabels(["ID", "Имя пользователя", "Роль"])
+        # Поиск по началу имени пользователя; запрос отправляется после паузы в наборе
+        self.search_input = QLineEdit(self)
+        self.search_input.setPlaceholderText("Поиск по имени пользователя")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(lambda: self.user_model.set_search(self.search_input.text().strip()))
+        self.search_input.textChanged.connect(self.search_timer.start)
+        layout.addWidget(self.search_input)
+
+        # Таблица пользователей подгружается из базы страницами и сортируется в базе
+        self.user_model = UserTableModel(self.session, self, self.executor)
+        self.user_table = QTableView()
+        self.user_table.setModel(self.user_model)
+        self.user_loading = LoadingOverlay(self.user_table)
+        self.user_model.loading_changed.connect(self.user_loading.set_loading)
+        self.user_model.load_failed.connect(self.show_load_error)
+        self.user_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.user_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.user_table.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
+        self.user_table.setSortingEnabled(True)
         layout.addWidget(self.user_table)
 
         widget.setLayout(layout)
@@ -46,16 +70,15 @@ class AdminWindow(QMainWindow):
         """Открывает диалоговое окно для создания пользователя."""
         dialog = CreateUserDialog(self.session, self)
         if dialog.exec():
-            self.load_users()
+            self.user_model.refresh_rows(dialog.changed_ids)
 
     def open_edit_user_dialog(self):
         """Открывает диалоговое окно для редактирования пользователя."""
-        selected_row = self.user_table.currentRow()
-        if selected_row < 0:
+        user_id = self.selected_user_id()
+        if user_id is None:
             QMessageBox.warning(self, "Ошибка", "Выберите пользователя для редактирования")
             return
 
-        user_id = int(self.user_table.item(selected_row, 0).text())
         user = self.session.query(User).filter_by(id=user_id).first()
         if not user:
             QMessageBox.warning(self, "Ошибка", "Пользователь не найден")
@@ -68,16 +91,15 @@ class AdminWindow(QMainWindow):
 
         dialog = EditUserDialog(self.session, user, self)
         if dialog.exec():
-            self.load_users()
+            self.user_model.refresh_rows(dialog.changed_ids)
 
     def delete_user(self):
         """Удаляет выбранного пользователя."""
-        selected_row = self.user_table.currentRow()
-        if selected_row < 0:
+        user_id = self.selected_user_id()
+        if user_id is None:
             QMessageBox.warning(self, "Ошибка", "Выберите пользователя для удаления")
             return
 
-        user_id = int(self.user_table.item(selected_row, 0).text())
         user = self.session.query(User).filter_by(id=user_id).first()
         if not user:
             QMessageBox.warning(self, "Ошибка", "Пользователь не найден")
@@ -99,20 +121,27 @@ class AdminWindow(QMainWindow):
                 self.session.delete(user)
                 self.session.commit()
                 QMessageBox.information(self, "Успех", "Пользователь успешно удалён")
-                self.load_users()
+                self.user_model.refresh_rows([user_id])
             except Exception as e:
                 self.session.rollback()
                 QMessageBox.critical(self, "Ошибка", f"Ошибка при удалении пользователя: {e}")
 
+    def selected_user_id(self):
+        """Возвращает ID выбранного в таблице пользователя или None."""
+        index = self.user_table.currentIndex()
+        if not index.isValid():
+            return None
+        return self.user_model.row_id(index.row())
+
     def load_users(self):
-        """Загружает список пользователей."""
-        self.user_table.setRowCount(0)
-        users = self.session.query(User).all()
-        self.user_table.setRowCount(len(users))
-        for row, user in enumerate(users):
-            user_role = self.session.query(UserRole).filter_by(user_id=user.id).first()
-            role = self.session.query(Role).filter_by(id=user_role.role_id).first() if user_role else None
-            role_name = role.name if role else "Не указана"
-            self.user_table.setItem(row, 0, QTableWidgetItem(str(user.id)))
-            self.user_table.setItem(row, 1, QTableWidgetItem(user.username))
-            self.user_table.setItem(row, 2, QTableWidgetItem(role_name))
\ No newline at end of file
+        """Перечитывает список пользователей с текущими поиском и сортировкой."""
+        self.user_model.reload()
+
+    def show_load_error(self, error):
+        self.user_loading.set_loading(False)
+        QMessageBox.critical(self, "Ошибка", f"Ошибка при загрузке пользователей: {error}")
+
+    def closeEvent(self, event):
+        # Дожидаемся фоновых запросов, чтобы потоки не пережили окно
+        self.executor.wait()
+        super().closeEvent(event)
\ No newline at end of file
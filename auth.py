@@ -0,0 +1,36 @@
+# auth.py
+"""Проверка имени пользователя и пароля.
+
+Выполняется в рабочем потоке (bcrypt намеренно медленный), поэтому
+возвращает простые данные, а не ORM-объекты.
+"""
+from models import User, Role, UserRole, Permission, RolePermission
+from permissions import Permissions
+
+
+def authenticate(session, username, password):
+    """Возвращает (ID пользователя, Permissions) или None, если имя или пароль неверны.
+
+    Хеш, посчитанный с меньшей стоимостью bcrypt, чем задана в настройках,
+    пересчитывается при успешном входе.
+    """
+    # Пользователь, его роли и разрешения ролей одним запросом (строка на каждое разрешение)
+    rows = session.query(User, Role.name, Permission.name) \
+        .outerjoin(UserRole, UserRole.user_id == User.id) \
+        .outerjoin(Role, Role.id == UserRole.role_id) \
+        .outerjoin(RolePermission, RolePermission.role_id == Role.id) \
+        .outerjoin(Permission, Permission.id == RolePermission.permission_id) \
+        .filter(User.username == username) \
+        .all()
+    if not rows:
+        return None
+    user = rows[0][0]
+    if not user.check_password(password):
+        return None
+    if user.needs_rehash():
+        user.password_hash = User.hash_password(password)
+        session.commit()
+    # Разрешения всех ролей объединяются, в названии перечисляются все роли — как в списке пользователей
+    role_name = ", ".join(sorted({role for _, role, _ in rows if role is not None}))
+    actions = frozenset(permission for _, _, permission in rows if permission is not None)
+    return user.id, Permissions(role_name or "Basic User", actions)
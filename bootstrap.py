@@ -0,0 +1,29 @@
+# bootstrap.py
+"""Создание и обновление схемы базы данных миграциями Alembic.
+
+Запускается отдельно перед первым запуском приложения и после обновлений:
+    python bootstrap.py
+(то же самое, что alembic upgrade head).
+"""
+import os
+
+from alembic import command
+from alembic.config import Config
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+
+def bootstrap(engine=None, revision="head"):
+    """Применяет миграции до revision; без engine — к базе из настроек db.py."""
+    config = Config(ALEMBIC_INI)
+    if engine is None:
+        command.upgrade(config, revision)
+        return
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+
+if __name__ == "__main__":
+    bootstrap()
+    print("Схема базы данных обновлена")
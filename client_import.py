@@ -0,0 +1,161 @@
+# client_import.py
+"""Массовый импорт клиентов из CSV.
+
+Файл целиком загружается через COPY во временную таблицу, проверяется
+SQL-запросами и раскладывается по Client, IndividualClient и
+LegalEntityClient командами INSERT ... SELECT. Отклонённые строки с
+причиной выгружаются в отдельный CSV рядом с исходным файлом.
+"""
+import os
+
+from sqlalchemy import text
+
+from reports import ReportProgress
+
+# Столбцы, допустимые в заголовке CSV
+IMPORT_COLUMNS = [
+    "client_type", "phone", "email",
+    "last_name", "first_name", "middle_name",
+    "company_name", "inn", "kpp", "ogrn",
+]
+
+STAGING_TABLE = "client_import_staging"
+
+# Проверки выполняются по порядку; строке записывается первая найденная ошибка
+VALIDATIONS = [
+    ("client_type IS NULL OR client_type NOT IN ('individual', 'legal_entity')",
+     "Неизвестный тип клиента (ожидается Физлицо или Юрлицо)"),
+    ("email IS NULL", "Email обязателен"),
+    ("email !~ '^[^@[:space:]]+@[^@[:space:]]+$'", "Некорректный email"),
+    ("length(email) > 50 OR length(phone) > 12", "Слишком длинный email или телефон"),
+    ("client_type = 'individual' AND (first_name IS NULL OR last_name IS NULL)",
+     "Имя и фамилия обязательны для физлица"),
+    ("client_type = 'individual' AND (length(first_name) > 50 OR length(last_name) > 50 OR length(middle_name) > 50)",
+     "Слишком длинное имя, фамилия или отчество"),
+    ("client_type = 'legal_entity' AND (company_name IS NULL OR inn IS NULL)",
+     "Название компании и ИНН обязательны для юрлица"),
+    ("client_type = 'legal_entity' AND length(company_name) > 100", "Слишком длинное название компании"),
+    ("client_type = 'legal_entity' AND inn !~ '^([0-9]{10}|[0-9]{12})$'", "ИНН должен состоять из 10 или 12 цифр"),
+    ("client_type = 'legal_entity' AND kpp !~ '^[0-9]{4}[0-9A-Z]{2}[0-9]{3}$'", "Некорректный КПП"),
+    ("client_type = 'legal_entity' AND ogrn !~ '^([0-9]{13}|[0-9]{15})$'", "ОГРН должен состоять из 13 или 15 цифр"),
+    ('EXISTS (SELECT 1 FROM "Client" c WHERE c.email = s.email)', "Клиент с таким email уже существует"),
+    # Повтором считается только email строки, прошедшей проверки выше: она будет импортирована
+    (f"EXISTS (SELECT 1 FROM {STAGING_TABLE} d WHERE d.email = s.email AND d.line_no < s.line_no AND d.error IS NULL)",
+     "Email повторяется в файле"),
+]
+
+
+class ClientImportError(Exception):
+    """Файл импорта не может быть обработан целиком (например, неверный заголовок)."""
+
+
+class _CopyReader:
+    """Файл для copy_expert: отдаёт байты и считает строки для индикатора хода."""
+
+    def __init__(self, file, progress):
+        self.file = file
+        self.progress = progress
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.progress.rows_fetched(data.count(b"\n"))
+        return data
+
+    def readline(self, size=-1):
+        data = self.file.readline(size)
+        self.progress.rows_fetched(data.count(b"\n"))
+        return data
+
+
+def _read_header(file):
+    header = file.readline().decode("utf-8-sig").strip()
+    columns = [column.strip().lower() for column in header.split(",")]
+    unknown = [column for column in columns if column not in IMPORT_COLUMNS]
+    if not header or unknown:
+        raise ClientImportError(
+            f"Неизвестные столбцы: {', '.join(unknown) or '(пустой заголовок)'}. "
+            f"Допустимые столбцы: {', '.join(IMPORT_COLUMNS)}")
+    return columns
+
+
+def import_clients(session, filename, progress=None):
+    """Импортирует клиентов из CSV и возвращает имя файла с отклонёнными строками (или None)."""
+    progress = progress or ReportProgress()
+    connection = session.connection()
+    raw = connection.connection
+
+    # Все столбцы текстовые, чтобы COPY принял любую строку, а проверки сделал SQL
+    connection.execute(text(
+        f"CREATE TEMP TABLE {STAGING_TABLE} ("
+        "line_no bigserial PRIMARY KEY, "
+        + ", ".join(f"{column} text" for column in IMPORT_COLUMNS)
+        + ", error text, client_id integer) ON COMMIT DROP"))
+
+    with open(filename, "rb") as file:
+        columns = _read_header(file)
+        cursor = raw.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {STAGING_TABLE} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, ENCODING 'UTF8')",
+                _CopyReader(file, progress))
+        finally:
+            cursor.close()
+    progress.check()
+
+    # Нормализация: обрезаем пробелы, пустые строки превращаем в NULL, тип клиента приводим к имени перечисления
+    connection.execute(text(
+        f"UPDATE {STAGING_TABLE} SET "
+        + ", ".join(f"{column} = NULLIF(btrim({column}), '')" for column in IMPORT_COLUMNS)))
+    connection.execute(text(
+        f"UPDATE {STAGING_TABLE} SET client_type = CASE lower(client_type) "
+        "WHEN 'физлицо' THEN 'individual' WHEN 'individual' THEN 'individual' "
+        "WHEN 'юрлицо' THEN 'legal_entity' WHEN 'legal_entity' THEN 'legal_entity' END, "
+        "kpp = upper(kpp)"))
+    # Индекс для проверки повторов email и статистика для планировщика: временные таблицы autovacuum не анализирует
+    connection.execute(text(f"CREATE INDEX ON {STAGING_TABLE} (email, line_no)"))
+    connection.execute(text(f"ANALYZE {STAGING_TABLE}"))
+
+    for condition, message in VALIDATIONS:
+        connection.execute(
+            text(f"UPDATE {STAGING_TABLE} s SET error = :message WHERE s.error IS NULL AND ({condition})"),
+            {"message": message})
+        progress.check()
+
+    # Раздаём новым клиентам идентификаторы из последовательности Client.id и раскладываем строки по таблицам
+    connection.execute(text(
+        f"UPDATE {STAGING_TABLE} SET client_id = nextval(pg_get_serial_sequence('\"Client\"', 'id')) "
+        "WHERE error IS NULL"))
+    imported = connection.execute(text(
+        'INSERT INTO "Client" (id, client_type, phone, email, is_deleted, display_name) '
+        "SELECT client_id, CAST(client_type AS clienttype), phone, email, false, "
+        "CASE client_type WHEN 'legal_entity' THEN company_name "
+        "ELSE concat_ws(' ', last_name, first_name, middle_name) END "
+        f"FROM {STAGING_TABLE} WHERE error IS NULL ORDER BY line_no")).rowcount
+    connection.execute(text(
+        'INSERT INTO "IndividualClient" (id, first_name, last_name, middle_name) '
+        f"SELECT client_id, first_name, last_name, middle_name FROM {STAGING_TABLE} "
+        "WHERE error IS NULL AND client_type = 'individual'"))
+    connection.execute(text(
+        'INSERT INTO "LegalEntityClient" (id, company_name, inn, kpp, ogrn) '
+        f"SELECT client_id, company_name, inn, kpp, ogrn FROM {STAGING_TABLE} "
+        "WHERE error IS NULL AND client_type = 'legal_entity'"))
+
+    rejected = connection.execute(text(f"SELECT count(*) FROM {STAGING_TABLE} WHERE error IS NOT NULL")).scalar()
+    rejection_file = None
+    if rejected:
+        rejection_file = f"{os.path.splitext(filename)[0]}_rejected.csv"
+        # Номер строки считаем с учётом заголовка, как в текстовом редакторе
+        cursor = raw.cursor()
+        try:
+            with open(rejection_file, "wb") as file:
+                file.write(b"\xef\xbb\xbf")
+                cursor.copy_expert(
+                    f"COPY (SELECT line_no + 1 AS line, error, {', '.join(IMPORT_COLUMNS)} FROM {STAGING_TABLE} "
+                    "WHERE error IS NOT NULL ORDER BY line_no) TO STDOUT WITH (FORMAT csv, HEADER true, ENCODING 'UTF8')",
+                    file)
+        finally:
+            cursor.close()
+
+    session.commit()
+    progress.summary = f"импортировано {imported}, отклонено {rejected}"
+    return rejection_file
@@ -0,0 +1,167 @@
+# client_lookup.py
+"""Общий для процесса индекс клиентов для быстрого выбора клиента в заказе.
+
+Индекс хранит ID, имя, ИНН, телефон и email неудалённых клиентов и ищет по
+началу любого поля (или слова имени) и по подстроке без обращения к базе.
+Поиск по началу логарифмический, по подстроке — линейный просмотр всех данных.
+Актуальность проверяется по версии в таблице TableVersion, которую триггеры
+увеличивают при каждом изменении клиентов (миграция 0008): refresh() в фоне
+читает версию и перестраивает индекс, только если она изменилась.
+"""
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from PySide6.QtCore import QObject, Signal
+
+from projections import ClientLookupRow, client_lookup_query, table_version
+
+logger = logging.getLogger(__name__)
+
+# Разделитель записей в общей строке поиска: в тексте запроса его не бывает
+_SEPARATOR = "\x00"
+
+
+class _Snapshot(NamedTuple):
+    version: Optional[int]
+    rows: dict  # ID -> ClientLookupRow
+    keys: list  # отсортированные (ключ, ID) для поиска по началу
+    text: str  # строки поиска всех клиентов через _SEPARATOR
+    offsets: list  # начало строки каждого клиента в text
+    ids: list  # ID клиента для каждого элемента offsets
+
+
+def _build_snapshot(version, rows):
+    keys = []
+    parts = []
+    offsets = []
+    ids = []
+    position = 0
+    for row in rows:
+        fields = [value.lower() for value in (row.display_name, row.inn, row.phone, row.email) if value]
+        words = row.display_name.lower().split()[1:] if row.display_name else []
+        keys.extend((key, row.id) for key in fields + words)
+        search_text = " ".join(fields)
+        parts.append(search_text)
+        offsets.append(position)
+        ids.append(row.id)
+        position += len(search_text) + len(_SEPARATOR)
+    keys.sort()
+    return _Snapshot(version, {row.id: row for row in rows}, keys, _SEPARATOR.join(parts), offsets, ids)
+
+
+class ClientLookupIndex(QObject):
+    """Индекс клиентов в памяти; updated испускается после перестройки."""
+
+    updated = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Снимок заменяется целиком, поэтому поиск не требует блокировок
+        self._snapshot = _build_snapshot(None, [])
+        self._refresh_lock = threading.Lock()
+        # Запрошена проверка, которую ещё не выполнили
+        self._refresh_pending = False
+
+    @property
+    def ready(self):
+        """Загружен ли индекс хотя бы один раз."""
+        return self._snapshot.version is not None
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def refresh(self, session_factory, background=True):
+        """Перестраивает индекс, если данные клиентов изменились с прошлой загрузки.
+
+        В фоне выполняется в отдельном потоке. Если проверка уже идёт, новая не
+        запускается, но запрос не теряется: идущая проверка повторится после себя.
+        """
+        self._refresh_pending = True
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        if not background:
+            self._refresh(session_factory)
+            return
+        threading.Thread(target=self._refresh, args=(session_factory,), name="med-client-lookup", daemon=True).start()
+
+    def _refresh(self, session_factory):
+        while True:
+            try:
+                while self._refresh_pending:
+                    self._refresh_pending = False
+                    if self._rebuild(session_factory):
+                        self.updated.emit()
+            finally:
+                self._refresh_lock.release()
+            # Запрос мог прийти между последней проверкой и освобождением блокировки
+            if not self._refresh_pending or not self._refresh_lock.acquire(blocking=False):
+                return
+
+    def _rebuild(self, session_factory):
+        """Читает версию и при её изменении строки клиентов; True, если индекс перестроен."""
+        try:
+            session = session_factory()
+            try:
+                # Версия читается раньше строк: изменение между запросами лишь вызовет
+                # ещё одну перестройку, но не оставит индекс устаревшим
+                version = table_version(session, "Client")
+                if version == self._snapshot.version:
+                    return False
+                rows = [ClientLookupRow._make(row) for row in client_lookup_query(session)]
+            finally:
+                session.close()
+        except Exception:
+            # Индекс остаётся прежним; следующая проверка повторит загрузку
+            logger.exception("Не удалось загрузить индекс клиентов")
+            return False
+        self._snapshot = _build_snapshot(version, rows)
+        return True
+
+    def get(self, client_id):
+        """Возвращает ClientLookupRow клиента или None."""
+        return self._snapshot.rows.get(client_id)
+
+    def search(self, text, limit=20):
+        """Клиенты, у которых поле или слово имени начинается с text, затем — содержащие text.
+
+        Поиск по началу — двоичный поиск по ключам. Поиск по подстроке просматривает
+        общую строку индекса (str.find), его время растёт с суммарным размером данных
+        клиентов; он выполняется, только если совпадений по началу меньше limit.
+        """
+        snapshot = self._snapshot
+        needle = text.strip().lower()
+        if not needle:
+            return []
+        found = []
+        seen = set()
+
+        def add(client_id):
+            if client_id not in seen:
+                seen.add(client_id)
+                found.append(snapshot.rows[client_id])
+
+        keys = snapshot.keys
+        index = bisect_left(keys, (needle,))
+        while index < len(keys) and len(found) < limit and keys[index][0].startswith(needle):
+            add(keys[index][1])
+            index += 1
+
+        position = snapshot.text.find(needle)
+        while position != -1 and len(found) < limit:
+            entry = bisect_right(snapshot.offsets, position) - 1
+            add(snapshot.ids[entry])
+            # Следующее совпадение ищем со строки следующего клиента
+            if entry + 1 == len(snapshot.offsets):
+                break
+            position = snapshot.text.find(needle, snapshot.offsets[entry + 1])
+        return found
+
+
+@lru_cache(maxsize=None)
+def client_index():
+    """Возвращает общий для процесса индекс клиентов."""
+    return ClientLookupIndex()
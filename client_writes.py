@@ -0,0 +1,92 @@
+# client_writes.py
+"""Создание и изменение клиента одним SQL-запросом.
+
+Запись в Client и в таблицу подтипа (IndividualClient или LegalEntityClient)
+объединена в один оператор с изменяющими данные CTE: клиент пишется атомарно,
+за один обмен с базой, и в сессии не остаётся недописанных объектов.
+Уникальность email проверяет ограничение базы; его нарушение превращается
+в DuplicateEmail с понятным пользователю текстом.
+"""
+from sqlalchemy import insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+
+from db import run_in_transaction
+from models import Client, ClientType, IndividualClient, LegalEntityClient
+
+# SQLSTATE unique_violation
+UNIQUE_VIOLATION = "23505"
+
+
+class DuplicateEmail(Exception):
+    """Клиент с таким email уже существует."""
+
+    def __init__(self, email):
+        self.email = email
+        super().__init__("Клиент с таким email уже существует")
+
+
+def _subtype_values(client_type, details):
+    """Таблица подтипа и значения её столбцов из details."""
+    if client_type == ClientType.individual:
+        return IndividualClient, {
+            "first_name": details.get("first_name"),
+            "last_name": details.get("last_name"),
+            "middle_name": details.get("middle_name"),
+        }
+    return LegalEntityClient, {
+        "company_name": details.get("company_name"),
+        "inn": details.get("inn"),
+        "kpp": details.get("kpp"),
+        "ogrn": details.get("ogrn"),
+    }
+
+
+def _display_name(client_type, details):
+    return Client.make_display_name(
+        client_type,
+        last_name=details.get("last_name"),
+        first_name=details.get("first_name"),
+        middle_name=details.get("middle_name"),
+        company_name=details.get("company_name"),
+    )
+
+
+def _execute(session, statement, email):
+    """Выполняет запись клиента в транзакции и возвращает ID клиента."""
+    try:
+        return run_in_transaction(session, lambda session: session.execute(statement).scalar_one())
+    except IntegrityError as e:
+        constraint = getattr(getattr(e.orig, "diag", None), "constraint_name", None) or ""
+        if getattr(e.orig, "pgcode", None) == UNIQUE_VIOLATION and "email" in constraint:
+            raise DuplicateEmail(email) from e
+        raise
+
+
+def create_client(session, client_type, phone, email, **details):
+    """Создаёт клиента и запись физлица или юрлица; details — поля подтипа. Возвращает ID клиента."""
+    subtype, values = _subtype_values(client_type, details)
+    new_client = insert(Client) \
+        .values(client_type=client_type, phone=phone, email=email, is_deleted=False,
+                display_name=_display_name(client_type, details)) \
+        .returning(Client.id) \
+        .cte("new_client")
+    new_subtype = insert(subtype) \
+        .from_select(["id", *values], select(new_client.c.id, *(literal(value, subtype.__table__.c[name].type)
+                                                                 for name, value in values.items()))) \
+        .cte("new_subtype")
+    return _execute(session, select(new_client.c.id).add_cte(new_subtype), email)
+
+
+def update_client(session, client_id, client_type, phone, email, **details):
+    """Меняет контакты клиента и данные его физлица или юрлица. Возвращает ID клиента."""
+    subtype, values = _subtype_values(client_type, details)
+    updated_client = update(Client) \
+        .where(Client.id == client_id) \
+        .values(phone=phone, email=email, display_name=_display_name(client_type, details)) \
+        .returning(Client.id) \
+        .cte("updated_client")
+    updated_subtype = update(subtype) \
+        .where(subtype.id == client_id) \
+        .values(**values) \
+        .cte("updated_subtype")
+    return _execute(session, select(updated_client.c.id).add_cte(updated_subtype), email)
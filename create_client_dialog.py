@@ -1,10 +1,13 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QLineEdit, QMessageBox, QStackedWidget, QDialog
 
-from models import Client, ClientType, IndividualClient, LegalEntityClient
+from models import ClientType
+from client_writes import create_client, DuplicateEmail
 class CreateClientDialog(QDialog):
     def __init__(self, session, parent=None):
         super().__init__(parent)
         self.session = session
+        # ID созданных записей; по ним окно обновляет только нужные строки
+        self.changed_ids = []
         self.setWindowTitle("Создание нового клиента")
         self.setGeometry(200, 200, 500, 300)
 
@@ -104,52 +107,35 @@ class CreateClientDialog(QDialog):
                 QMessageBox.warning(self, "Ошибка", "Email обязателен")
                 return
 
-            # Проверка уникальности email
-            if self.session.query(Client).filter_by(email=email).first():
-                QMessageBox.warning(self, "Ошибка", "Клиент с таким email уже существует")
-                return
-
-            # Создание клиента
-            new_client = Client(client_type=client_type, phone=phone, email=email, is_deleted=False)
-            self.session.add(new_client)
-            self.session.flush()
-
-            # Создание записи в зависимости от типа
+            # Все поля проверяются до записи, чтобы не оставлять в сессии недописанного клиента
             if client_type == ClientType.individual:
-                first_name = self.first_name_input.text().strip() or None
-                last_name = self.last_name_input.text().strip() or None
-                middle_name = self.middle_name_input.text().strip() or None
-                if not first_name or not last_name:
+                details = {
+                    "first_name": self.first_name_input.text().strip() or None,
+                    "last_name": self.last_name_input.text().strip() or None,
+                    "middle_name": self.middle_name_input.text().strip() or None,
+                }
+                if not details["first_name"] or not details["last_name"]:
                     QMessageBox.warning(self, "Ошибка", "Имя и фамилия обязательны для физлица")
                     return
-                individual_client = IndividualClient(
-                    id=new_client.id,
-                    first_name=first_name,
-                    last_name=last_name,
-                    middle_name=middle_name
-                )
-                self.session.add(individual_client)
             else:
-                company_name = self.company_name_input.text().strip() or None
-                inn = self.inn_input.text().strip() or None
-                kpp = self.kpp_input.text().strip() or None
-                ogrn = self.ogrn_input.text().strip() or None
-                if not company_name or not inn:
+                details = {
+                    "company_name": self.company_name_input.text().strip() or None,
+                    "inn": self.inn_input.text().strip() or None,
+                    "kpp": self.kpp_input.text().strip() or None,
+                    "ogrn": self.ogrn_input.text().strip() or None,
+                }
+                if not details["company_name"] or not details["inn"]:
                     QMessageBox.warning(self, "Ошибка", "Название компании и ИНН обязательны для юрлица")
                     return
-                legal_entity_client = LegalEntityClient(
-                    id=new_client.id,
-                    company_name=company_name,
-                    inn=inn,
-                    kpp=kpp,
-                    ogrn=ogrn
-                )
-                self.session.add(legal_entity_client)
-
-            self.session.commit()
+
+            # Клиент и запись физлица/юрлица создаются одним запросом; уникальность email проверяет база
+            client_id = create_client(self.session, client_type, phone, email, **details)
+            self.changed_ids = [client_id]
             QMessageBox.information(self, "Успех", "Клиент успешно создан")
             self.accept()
 
+        except DuplicateEmail as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
         except Exception as e:
             self.session.rollback()
             QMessageBox.critical(self, "Ошибка", f"Ошибка при создании клиента: {e}")
\ No newline at end of file
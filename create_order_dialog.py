@@ -1,14 +1,32 @@
-from PySide6.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QLineEdit, QMessageBox, QDialog
-from PySide6.QtCore import Qt
-from models import Client, ClientOrder, OrderItem, Product, OrderStatus, ClientType
-from datetime import datetime
+from PySide6.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit, QMessageBox, QDialog, QTableWidget, QTableWidgetItem, QAbstractItemView, QCompleter
+from PySide6.QtGui import QStandardItem, QStandardItemModel
+from PySide6.QtCore import Qt, QModelIndex, QTimer
+from sqlalchemy.orm import sessionmaker
+from orders import create_order, InsufficientStock
+from projections import product_search_query, fetch_product_rows
+from client_lookup import client_index
+
+# Поиск товара начинается с этого числа символов: из более короткой строки
+# не получается ни одной триграммы, и индекс pg_trgm просматривается целиком
+PRODUCT_SEARCH_MIN_LENGTH = 3
 
 class CreateOrderDialog(QDialog):
-    def __init__(self, session, parent=None):
+    def __init__(self, session, parent=None, executor=None):
         super().__init__(parent)
         self.session = session
+        self.executor = executor
+        # ID созданных записей; по ним окно обновляет только нужные строки
+        self.changed_ids = []
+        # Позиции заказа (корзина): ID товара -> (название, количество)
+        self.lines = {}
+        # Клиент и товар, выбранные в подсказках: (ID, название)
+        self.selected_client = None
+        self.selected_product = None
+        if self.executor is not None:
+            # Закрытый диалог не должен получать результаты фоновых запросов
+            self.finished.connect(self._cancel_loading)
         self.setWindowTitle("Создание нового заказа")
-        self.setGeometry(200, 200, 400, 300)
+        self.setGeometry(200, 200, 500, 450)
 
         # Основной layout
         layout = QVBoxLayout()
@@ -16,22 +34,43 @@ class CreateOrderDialog(QDialog):
         # Форма для создания заказа (вертикальное расположение)
         form_layout = QVBoxLayout()
 
-        # Поле "Клиент"
+        # Поле "Клиент": подсказки берутся из общего индекса клиентов в памяти, без запросов к базе
         client_layout = QHBoxLayout()
         client_label = QLabel("Клиент:")
-        self.client_combo = QComboBox(self)
-        self.update_client_combo()
+        self.client_search = QLineEdit(self)
+        self.client_search.setPlaceholderText("Имя, ИНН, телефон или email клиента")
+        self.client_matches = QStandardItemModel(self)
+        self.client_completer = QCompleter(self.client_matches, self)
+        self.client_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.client_completer.activated[QModelIndex].connect(self._on_client_chosen)
+        self.client_search.setCompleter(self.client_completer)
+        self.client_search.textEdited.connect(self._on_client_text_edited)
         client_layout.addWidget(client_label)
-        client_layout.addWidget(self.client_combo)
+        client_layout.addWidget(self.client_search)
         form_layout.addLayout(client_layout)
+        # Перестроенный в фоне индекс сразу обновляет подсказки
+        client_index().updated.connect(self.search_clients)
+        self.finished.connect(lambda: client_index().updated.disconnect(self.search_clients))
+        self.update_client_index()
 
-        # Поле "Товар"
+        # Поле "Товар": каталог не загружается целиком, подсказки ищутся в базе по мере ввода
         product_layout = QHBoxLayout()
         product_label = QLabel("Товар:")
-        self.product_combo = QComboBox(self)
-        self.update_product_combo()
+        self.product_search = QLineEdit(self)
+        self.product_search.setPlaceholderText(f"Название или описание товара (от {PRODUCT_SEARCH_MIN_LENGTH} символов)")
+        self.product_matches = QStandardItemModel(self)
+        self.product_completer = QCompleter(self.product_matches, self)
+        # Подсказки уже отобраны базой, сам QCompleter их не фильтрует
+        self.product_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.product_completer.activated[QModelIndex].connect(self._on_product_chosen)
+        self.product_search.setCompleter(self.product_completer)
+        self.product_search_timer = QTimer(self)
+        self.product_search_timer.setSingleShot(True)
+        self.product_search_timer.setInterval(250)
+        self.product_search_timer.timeout.connect(self.search_products)
+        self.product_search.textEdited.connect(self._on_product_text_edited)
         product_layout.addWidget(product_label)
-        product_layout.addWidget(self.product_combo)
+        product_layout.addWidget(self.product_search)
         form_layout.addLayout(product_layout)
 
         # Поле "Количество"
@@ -41,10 +80,24 @@ class CreateOrderDialog(QDialog):
         self.quantity_input.setPlaceholderText("Количество")
         quantity_layout.addWidget(quantity_label)
         quantity_layout.addWidget(self.quantity_input)
+        self.add_line_button = QPushButton("Добавить", self)
+        self.add_line_button.clicked.connect(self.add_line)
+        quantity_layout.addWidget(self.add_line_button)
         form_layout.addLayout(quantity_layout)
+        # Enter в поле количества добавляет позицию, а не создаёт заказ
+        self.add_line_button.setDefault(True)
 
-        # Добавляем растяжку между полями и кнопкой
-        form_layout.addStretch()
+        # Позиции заказа
+        self.lines_table = QTableWidget(0, 2, self)
+        self.lines_table.setHorizontalHeaderLabels(["Товар", "Количество"])
+        self.lines_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.lines_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.lines_table.horizontalHeader().setStretchLastSection(True)
+        form_layout.addWidget(self.lines_table)
+
+        self.remove_line_button = QPushButton("Удалить позицию", self)
+        self.remove_line_button.clicked.connect(self.remove_line)
+        form_layout.addWidget(self.remove_line_button, alignment=Qt.AlignRight)
 
         layout.addLayout(form_layout)
 
@@ -56,76 +109,139 @@ class CreateOrderDialog(QDialog):
 
         self.setLayout(layout)
 
-    def update_client_combo(self):
-        """Обновляет выпадающий список клиентов."""
-        self.client_combo.clear()
-        clients = self.session.query(Client).filter_by(is_deleted=False).all()
-        for client in clients:
-            # Определяем, что отображать: название организации или ФИО
-            if client.client_type == ClientType.legal_entity and client.legal_entity_client:
-                client_display = client.legal_entity_client.name
-            elif client.client_type == ClientType.individual and client.individual_client:
-                client_display = f"{client.individual_client.last_name} {client.individual_client.first_name}" + \
-                                 (f" {client.individual_client.middle_name}" if client.individual_client.middle_name else "")
-            else:
-                client_display = "Неизвестный клиент"
-            self.client_combo.addItem(f"{client.id} - {client_display}", client.id)
-
-    def update_product_combo(self):
-        """Обновляет выпадающий список товаров."""
-        self.product_combo.clear()
-        products = self.session.query(Product).all()
+    def update_client_index(self):
+        """Проверяет версию индекса клиентов; при наличии executor — в фоне, не задерживая диалог."""
+        index = client_index()
+        if self.executor is None:
+            index.refresh(sessionmaker(bind=self.session.get_bind()), background=False)
+        else:
+            index.refresh(self.executor.session_factory)
+
+    def search_clients(self):
+        """Показывает клиентов, подходящих к введённому тексту."""
+        if self.selected_client is not None:
+            return
+        self.client_matches.clear()
+        for client in client_index().search(self.client_search.text()):
+            details = ", ".join(value for value in (client.inn, client.phone, client.email) if value)
+            item = QStandardItem(f"{client.display_name} ({details})" if details else client.display_name)
+            item.setData(client.id, Qt.UserRole)
+            item.setData(client.display_name, Qt.UserRole + 1)
+            self.client_matches.appendRow(item)
+        if self.client_matches.rowCount() and self.client_search.hasFocus():
+            self.client_completer.complete()
+
+    def select_client(self, client_id, name):
+        """Выбирает клиента заказа."""
+        self.selected_client = (client_id, name)
+
+    def _on_client_text_edited(self, text):
+        self.selected_client = None
+        self.search_clients()
+
+    def _on_client_chosen(self, index):
+        self.select_client(index.data(Qt.UserRole), index.data(Qt.UserRole + 1))
+
+    def search_products(self):
+        """Ищет товары по введённому тексту и показывает лучшие совпадения."""
+        search = self.product_search.text().strip()
+        if len(search) < PRODUCT_SEARCH_MIN_LENGTH or self.selected_product is not None:
+            return
+        load_matches = lambda session: fetch_product_rows(product_search_query(session, search))
+        if self.executor is None:
+            self._show_product_matches(load_matches(self.session))
+        else:
+            # Новый запрос с тем же ключом отменяет ещё не завершённый предыдущий
+            self.executor.submit("create_order:products", load_matches, self._show_product_matches,
+                                 self._on_load_failed)
+
+    def refresh_product_matches(self):
+        """Перечитывает подсказки (изменились цены или остатки товаров)."""
+        self.search_products()
+
+    def select_product(self, product_id, name):
+        """Выбирает товар для следующей позиции заказа."""
+        self.selected_product = (product_id, name)
+
+    def _on_product_text_edited(self, text):
+        # Изменённый текст больше не соответствует выбранному товару
+        self.selected_product = None
+        self.product_search_timer.start()
+
+    def _show_product_matches(self, products):
+        self.product_matches.clear()
         for product in products:
-            self.product_combo.addItem(f"{product.name} (Цена: {product.price})", product.id)
+            price = f"{product.price:.2f}" if product.price is not None else "—"
+            item = QStandardItem(f"{product.name} — {price} руб., в наличии: {product.stock_quantity or 0}")
+            item.setData(product.id, Qt.UserRole)
+            item.setData(product.name, Qt.UserRole + 1)
+            self.product_matches.appendRow(item)
+        if products and self.product_search.hasFocus():
+            self.product_completer.complete()
+
+    def _on_product_chosen(self, index):
+        self.select_product(index.data(Qt.UserRole), index.data(Qt.UserRole + 1))
+
+    def _cancel_loading(self):
+        self.executor.cancel("create_order:products")
+
+    def _on_load_failed(self, error):
+        QMessageBox.critical(self, "Ошибка", f"Ошибка при загрузке данных: {error}")
+
+    def add_line(self):
+        """Добавляет выбранный товар в заказ (повторный товар увеличивает количество)."""
+        quantity = self.quantity_input.text().strip()
+        if self.selected_product is None or not quantity:
+            QMessageBox.warning(self, "Ошибка", "Выберите товар и укажите количество")
+            return
+        try:
+            quantity = int(quantity)
+        except ValueError:
+            QMessageBox.warning(self, "Ошибка", "Количество должно быть числом")
+            return
+        if quantity <= 0:
+            QMessageBox.warning(self, "Ошибка", "Количество должно быть больше 0")
+            return
+
+        product_id, name = self.selected_product
+        _, current = self.lines.get(product_id, (name, 0))
+        self.lines[product_id] = (name, current + quantity)
+        self.quantity_input.clear()
+        self.show_lines()
+
+    def remove_line(self):
+        """Убирает выбранную позицию из заказа."""
+        row = self.lines_table.currentRow()
+        if row < 0:
+            QMessageBox.warning(self, "Ошибка", "Выберите позицию для удаления")
+            return
+        del self.lines[list(self.lines)[row]]
+        self.show_lines()
+
+    def show_lines(self):
+        self.lines_table.setRowCount(len(self.lines))
+        for row, (name, quantity) in enumerate(self.lines.values()):
+            self.lines_table.setItem(row, 0, QTableWidgetItem(name))
+            self.lines_table.setItem(row, 1, QTableWidgetItem(str(quantity)))
 
     def create_order(self):
-        """Создаёт новый заказ."""
+        """Создаёт новый заказ из всех добавленных позиций."""
         try:
-            client_id = self.client_combo.currentData()
-            product_id = self.product_combo.currentData()
-            quantity = self.quantity_input.text().strip()
-
-            if not client_id or not product_id or not quantity:
-                QMessageBox.warning(self, "Ошибка", "Заполните все поля")
-                return
-
-            quantity = int(quantity)
-            if quantity <= 0:
-                QMessageBox.warning(self, "Ошибка", "Количество должно быть больше 0")
-                return
+            client_id = self.selected_client[0] if self.selected_client else None
 
-            product = self.session.query(Product).filter_by(id=product_id).first()
-            if product.stock_quantity < quantity:
-                QMessageBox.warning(self, "Ошибка", f"Недостаточно товара на складе. В наличии: {product.stock_quantity}")
+            if not client_id or not self.lines:
+                QMessageBox.warning(self, "Ошибка", "Выберите клиента и добавьте хотя бы один товар")
                 return
 
-            # Создание заказа
-            new_order = ClientOrder(
-                client_id=client_id,
-                order_date=datetime.now().date(),
-                status=OrderStatus.created
-            )
-            self.session.add(new_order)
-            self.session.flush()  # Получаем ID нового заказа
-
-            # Создание позиции заказа
-            order_item = OrderItem(
-                order_id=new_order.id,
-                product_id=product_id,
-                quantity=quantity,
-                price=product.price * quantity
-            )
-            self.session.add(order_item)
-
-            # Обновление остатка товара
-            product.stock_quantity -= quantity
-
-            self.session.commit()
+            # Заказ, его позиции и списание остатков — одна транзакция
+            order_id = create_order(self.session, client_id,
+                                    [(product_id, quantity) for product_id, (_, quantity) in self.lines.items()])
+            self.changed_ids = [order_id]
             QMessageBox.information(self, "Успех", "Заказ успешно создан")
             self.accept()
 
-        except ValueError:
-            QMessageBox.warning(self, "Ошибка", "Количество должно быть числом")
+        except InsufficientStock as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
         except Exception as e:
             self.session.rollback()
             QMessageBox.critical(self, "Ошибка", f"Ошибка при создании заказа: {e}")
\ No newline at end of file
@@ -7,6 +7,8 @@ class CreateUserDialog(QDialog):
     def __init__(self, session, parent=None):
         super().__init__(parent)
         self.session = session
+        # ID созданных записей; по ним окно обновляет только нужные строки
+        self.changed_ids = []
         self.setWindowTitle("Создание нового пользователя")
         self.setGeometry(200, 200, 400, 200)
 
@@ -72,6 +74,7 @@ class CreateUserDialog(QDialog):
             self.session.add(user_role)
 
             self.session.commit()
+            self.changed_ids = [new_user.id]
             QMessageBox.information(self, "Успех", "Пользователь успешно создан")
             self.accept()
 
@@ -1,6 +1,7 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit, QMessageBox, QStackedWidget, QDialog
 
 from models import Client, ClientType
+from client_writes import update_client, DuplicateEmail
 
 
 class EditClientDialog(QDialog):
@@ -8,6 +9,8 @@ class EditClientDialog(QDialog):
         super().__init__(parent)
         self.session = session
         self.client = client
+        # ID изменённых записей; по ним окно обновляет только нужные строки
+        self.changed_ids = []
         self.setWindowTitle("Редактирование клиента")
         self.setGeometry(200, 200, 500, 300)
 
@@ -97,46 +100,35 @@ class EditClientDialog(QDialog):
                 QMessageBox.warning(self, "Ошибка", "Email обязателен")
                 return
 
-            # Проверка уникальности email
-            existing_client = self.session.query(Client).filter_by(email=new_email).filter(Client.id != self.client.id).first()
-            if existing_client:
-                QMessageBox.warning(self, "Ошибка", "Клиент с таким email уже существует")
-                return
-
-            # Обновление общих полей
-            self.client.phone = new_phone
-            self.client.email = new_email
-
-            # Обновление специфических полей
             if self.client.client_type == ClientType.individual:
-                first_name = self.first_name_input.text().strip() or None
-                last_name = self.last_name_input.text().strip() or None
-                middle_name = self.middle_name_input.text().strip() or None
-                if not first_name or not last_name:
+                details = {
+                    "first_name": self.first_name_input.text().strip() or None,
+                    "last_name": self.last_name_input.text().strip() or None,
+                    "middle_name": self.middle_name_input.text().strip() or None,
+                }
+                if not details["first_name"] or not details["last_name"]:
                     QMessageBox.warning(self, "Ошибка", "Имя и фамилия обязательны для физлица")
                     return
-                if self.client.individual_client:
-                    self.client.individual_client.first_name = first_name
-                    self.client.individual_client.last_name = last_name
-                    self.client.individual_client.middle_name = middle_name
             else:
-                company_name = self.company_name_input.text().strip() or None
-                inn = self.inn_input.text().strip() or None
-                kpp = self.kpp_input.text().strip() or None
-                ogrn = self.ogrn_input.text().strip() or None
-                if not company_name or not inn:
+                details = {
+                    "company_name": self.company_name_input.text().strip() or None,
+                    "inn": self.inn_input.text().strip() or None,
+                    "kpp": self.kpp_input.text().strip() or None,
+                    "ogrn": self.ogrn_input.text().strip() or None,
+                }
+                if not details["company_name"] or not details["inn"]:
                     QMessageBox.warning(self, "Ошибка", "Название компании и ИНН обязательны для юрлица")
                     return
-                if self.client.legal_entity_client:
-                    self.client.legal_entity_client.company_name = company_name
-                    self.client.legal_entity_client.inn = inn
-                    self.client.legal_entity_client.kpp = kpp
-                    self.client.legal_entity_client.ogrn = ogrn
 
-            self.session.commit()
+            # Клиент, его физлицо/юрлицо и отображаемое имя обновляются одним запросом
+            client_id = update_client(self.session, self.client.id, self.client.client_type, new_phone, new_email,
+                                      **details)
+            self.changed_ids = [client_id]
             QMessageBox.information(self, "Успех", "Клиент успешно обновлён")
             self.accept()
 
+        except DuplicateEmail as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
         except Exception as e:
             self.session.rollback()
             QMessageBox.critical(self, "Ошибка", f"Ошибка при обновлении клиента: {e}")
\ No newline at end of file
@@ -1,39 +1,54 @@
-from PySide6.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QLineEdit, QMessageBox, QDialog
-from models import ClientOrder, OrderItem, Product, OrderStatus
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QMessageBox, QDialog, QTableWidget, QTableWidgetItem, QAbstractItemView
+from models import ClientOrder, OrderItem, OrderStatus, Product
+from orders import update_order, InsufficientStock
+from permissions import Permissions, EDIT_ORDER_ITEMS, EDIT_ORDER_STATUS
 
 
 class EditOrderDialog(QDialog):
-    def __init__(self, session, order: ClientOrder, user_role: str, parent=None):
+    def __init__(self, session, order: ClientOrder, permissions: Permissions, parent=None):
         super().__init__(parent)
         self.session = session
         self.order = order
-        self.user_role = user_role
-        self.order_item = self.session.query(OrderItem).filter_by(order_id=order.id).first()
-        self.product = self.session.query(Product).filter_by(id=self.order_item.product_id).first()
+        self.permissions = permissions
+        # ID изменённых записей; по ним окно обновляет только нужные строки
+        self.changed_ids = []
+        # Позиции заказа: (ID позиции, товар, количество) в порядке добавления
+        self.items = self.session.query(OrderItem.id, Product.name, OrderItem.quantity) \
+            .outerjoin(Product, Product.id == OrderItem.product_id) \
+            .filter(OrderItem.order_id == order.id) \
+            .order_by(OrderItem.id) \
+            .all()
         self.setWindowTitle("Редактирование заказа")
-        self.setGeometry(200, 200, 400, 200)
+        self.setGeometry(200, 200, 450, 350)
 
         # Основной layout
         layout = QVBoxLayout()
 
-        # Форма для редактирования заказа
+        # Позиции заказа; количество редактируется прямо в таблице
+        self.items_table = QTableWidget(len(self.items), 2, self)
+        self.items_table.setHorizontalHeaderLabels(["Товар", "Количество"])
+        self.items_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.items_table.horizontalHeader().setStretchLastSection(True)
+        can_edit_items = self.permissions.can(EDIT_ORDER_ITEMS)
+        for row, (_, name, quantity) in enumerate(self.items):
+            name_item = QTableWidgetItem(name or "")
+            name_item.setFlags(name_item.flags() & ~Qt.ItemIsEditable)
+            quantity_item = QTableWidgetItem(str(quantity))
+            if not can_edit_items:
+                quantity_item.setFlags(quantity_item.flags() & ~Qt.ItemIsEditable)
+            self.items_table.setItem(row, 0, name_item)
+            self.items_table.setItem(row, 1, quantity_item)
+        layout.addWidget(self.items_table)
+
+        # Ограничиваем доступ к полям в зависимости от разрешений
         form_layout = QHBoxLayout()
         self.status_combo = QComboBox(self)
         self.status_combo.addItems([status.value for status in OrderStatus])
         self.status_combo.setCurrentText(order.status.value)
-        self.quantity_input = QLineEdit(self)
-        self.quantity_input.setText(str(self.order_item.quantity))
-
-        # Ограничиваем доступ к полям в зависимости от роли
-        if self.user_role in ["sales_manager", "director"]:
-            # Менеджер по продажам и руководитель могут редактировать количество
-            form_layout.addWidget(QLabel("Количество:"))
-            form_layout.addWidget(self.quantity_input)
-        if self.user_role in ["production_worker", "director"]:
-            # Производственный сотрудник и руководитель могут менять статус
+        if self.permissions.can(EDIT_ORDER_STATUS):
             form_layout.addWidget(QLabel("Статус:"))
             form_layout.addWidget(self.status_combo)
-
         layout.addLayout(form_layout)
 
         # Кнопка сохранения
@@ -42,38 +57,38 @@ class EditOrderDialog(QDialog):
         layout.addWidget(self.save_button)
 
         self.setLayout(layout)
-        
+
+    def item_quantities(self):
+        """Возвращает {ID позиции: количество} из таблицы; ValueError, если количество не число."""
+        return {item_id: int(self.items_table.item(row, 1).text().strip())
+                for row, (item_id, _, _) in enumerate(self.items)}
+
     def save_order(self):
         """Сохраняет изменения в заказе."""
         try:
             new_status = OrderStatus(self.status_combo.currentText())
-            new_quantity = int(self.quantity_input.text().strip()) if self.user_role in ["sales_manager", "director"] else self.order_item.quantity
-
-            if new_quantity <= 0:
-                QMessageBox.warning(self, "Ошибка", "Количество должно быть больше 0")
-                return
-
-            # Проверка остатка товара, если редактируется количество
-            if self.user_role in ["sales_manager", "director"]:
-                original_quantity = self.order_item.quantity
-                quantity_diff = new_quantity - original_quantity
-                if quantity_diff > 0 and self.product.stock_quantity < quantity_diff:
-                    QMessageBox.warning(self, "Ошибка", f"Недостаточно товара на складе. В наличии: {self.product.stock_quantity}")
+            quantities = None
+            if self.permissions.can(EDIT_ORDER_ITEMS):
+                quantities = self.item_quantities()
+                if any(quantity <= 0 for quantity in quantities.values()):
+                    QMessageBox.warning(self, "Ошибка", "Количество должно быть больше 0")
                     return
-                self.order_item.quantity = new_quantity
-                self.order_item.price = self.product.price * new_quantity
-                self.product.stock_quantity -= quantity_diff
-
-            # Обновление статуса, если разрешено
-            if self.user_role in ["production_worker", "director"]:
-                self.order.status = new_status
 
-            self.session.commit()
+            # Остатки по всем изменённым позициям проверяются и меняются в базе одним запросом
+            update_order(
+                self.session,
+                self.order.id,
+                quantities=quantities,
+                status=new_status if self.permissions.can(EDIT_ORDER_STATUS) else None,
+            )
+            self.changed_ids = [self.order.id]
             QMessageBox.information(self, "Успех", "Заказ успешно обновлён")
             self.accept()
 
+        except InsufficientStock as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
         except ValueError:
             QMessageBox.warning(self, "Ошибка", "Количество должно быть числом")
         except Exception as e:
             self.session.rollback()
-            QMessageBox.critical(self, "Ошибка", f"Ошибка при обновлении заказа: {e}")
\ No newline at end of file
+            QMessageBox.critical(self, "Ошибка", f"Ошибка при обновлении заказа: {e}")
@@ -7,6 +7,8 @@ class EditUserDialog(QDialog):
         super().__init__(parent)
         self.session = session
         self.user = user
+        # ID изменённых записей; по ним окно обновляет только нужные строки
+        self.changed_ids = []
         self.setWindowTitle("Редактирование пользователя")
         self.setGeometry(200, 200, 400, 200)
 
@@ -85,6 +87,7 @@ class EditUserDialog(QDialog):
                 self.session.add(new_user_role)
 
             self.session.commit()
+            self.changed_ids = [self.user.id]
             QMessageBox.information(self, "Успех", "Пользователь успешно обновлён")
             self.accept()
 
@@ -0,0 +1,171 @@
+# export.py
+"""Потоковая выгрузка клиентов и заказов в CSV, XLSX и Parquet.
+
+Строки не собираются в памяти целиком: CSV пишет сам PostgreSQL через
+COPY ... TO STDOUT, XLSX — openpyxl в режиме write_only, Parquet — pyarrow
+пакетами записей. openpyxl и pyarrow нужны только для своих форматов.
+"""
+import os
+
+from sqlalchemy import Date, Float, Integer, case, func, select
+
+from models import Client, ClientType, ClientOrder, IndividualClient, LegalEntityClient, OrderItem, OrderStatus, Product
+from reports import ReportProgress
+
+# Размер пакета строк для XLSX и Parquet
+EXPORT_BATCH = 5000
+
+FORMATS = {
+    ".csv": "CSV (*.csv)",
+    ".xlsx": "Excel (*.xlsx)",
+    ".parquet": "Parquet (*.parquet)",
+}
+
+
+class ExportError(Exception):
+    """Выгрузка невозможна (неизвестный формат или не установлен нужный пакет)."""
+
+
+def _enum_label(column, enum_class):
+    # В базе хранятся имена элементов, в выгрузку попадают русские названия
+    return case(*[(column == item, item.value) for item in enum_class])
+
+
+def clients_export_query():
+    """Выборка неудалённых клиентов для выгрузки."""
+    return select(
+        Client.id.label("ID"),
+        _enum_label(Client.client_type, ClientType).label("Тип клиента"),
+        Client.display_name.label("Клиент"),
+        Client.phone.label("Телефон"),
+        Client.email.label("Email"),
+        IndividualClient.last_name.label("Фамилия"),
+        IndividualClient.first_name.label("Имя"),
+        IndividualClient.middle_name.label("Отчество"),
+        LegalEntityClient.company_name.label("Название компании"),
+        LegalEntityClient.inn.label("ИНН"),
+        LegalEntityClient.kpp.label("КПП"),
+        LegalEntityClient.ogrn.label("ОГРН"),
+    ) \
+        .outerjoin(IndividualClient, IndividualClient.id == Client.id) \
+        .outerjoin(LegalEntityClient, LegalEntityClient.id == Client.id) \
+        .where(Client.is_deleted == False) \
+        .order_by(Client.id)
+
+
+def orders_export_query():
+    """Выборка всех позиций заказов для выгрузки."""
+    return select(
+        ClientOrder.id.label("ID заказа"),
+        ClientOrder.order_date.label("Дата заказа"),
+        _enum_label(ClientOrder.status, OrderStatus).label("Статус"),
+        Client.id.label("ID клиента"),
+        Client.display_name.label("Клиент"),
+        Product.id.label("ID товара"),
+        Product.name.label("Товар"),
+        OrderItem.quantity.label("Количество"),
+        func.coalesce(OrderItem.price, Product.price * OrderItem.quantity).label("Сумма"),
+    ) \
+        .select_from(OrderItem) \
+        .join(ClientOrder, ClientOrder.id == OrderItem.order_id) \
+        .join(Client, Client.id == ClientOrder.client_id) \
+        .outerjoin(Product, Product.id == OrderItem.product_id) \
+        .order_by(ClientOrder.id, OrderItem.id)
+
+
+DATASETS = {
+    "clients": clients_export_query,
+    "orders": orders_export_query,
+}
+
+
+def export_dataset(session, dataset, filename, progress=None):
+    """Выгружает набор данных dataset ("clients" или "orders") в файл; формат — по расширению."""
+    progress = progress or ReportProgress()
+    statement = DATASETS[dataset]()
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        export_csv(session, statement, filename, progress)
+    elif extension == ".xlsx":
+        export_xlsx(session, statement, filename, progress)
+    elif extension == ".parquet":
+        export_parquet(session, statement, filename, progress)
+    else:
+        raise ExportError(f"Неизвестный формат выгрузки: {extension or filename}")
+    return filename
+
+
+class _CopyWriter:
+    """Файл для copy_expert: пишет байты и между порциями проверяет отмену задания."""
+
+    def __init__(self, file, progress):
+        self.file = file
+        self.progress = progress
+
+    def write(self, data):
+        self.file.write(data)
+        self.progress.check()
+
+
+def export_csv(session, statement, filename, progress):
+    """CSV формирует сам PostgreSQL (COPY ... TO STDOUT), Python только пишет поток в файл."""
+    sql = statement.compile(dialect=session.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    cursor = session.connection().connection.cursor()
+    try:
+        with open(filename, "wb") as file:
+            # BOM, чтобы Excel открыл файл в UTF-8
+            file.write(b"\xef\xbb\xbf")
+            cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true, ENCODING 'UTF8')",
+                               _CopyWriter(file, progress))
+        # Число строк берётся из ответа COPY: переводы строк в значениях и заголовок его не искажают
+        progress.rows_fetched(cursor.rowcount)
+    finally:
+        cursor.close()
+
+
+def _stream_batches(session, statement, progress):
+    """Читает выборку из серверного курсора пакетами по EXPORT_BATCH строк."""
+    result = session.execute(statement.execution_options(yield_per=EXPORT_BATCH))
+    for batch in result.partitions():
+        progress.rows_fetched(len(batch))
+        yield batch
+
+
+def export_xlsx(session, statement, filename, progress):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ExportError("Для выгрузки в XLSX установите пакет openpyxl")
+    # write_only: строки сразу сбрасываются во временный файл, память не растёт
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append([column.name for column in statement.selected_columns])
+    for batch in _stream_batches(session, statement, progress):
+        for row in batch:
+            sheet.append(list(row))
+    workbook.save(filename)
+
+
+def _arrow_type(column, pa):
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def export_parquet(session, statement, filename, progress):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Для выгрузки в Parquet установите пакет pyarrow")
+    columns = list(statement.selected_columns)
+    schema = pa.schema([(column.name, _arrow_type(column, pa)) for column in columns])
+    with pq.ParquetWriter(filename, schema) as writer:
+        for batch in _stream_batches(session, statement, progress):
+            # Каждый пакет строк превращается в одну группу строк Parquet
+            arrays = [pa.array([row[i] for row in batch], type=field.type) for i, field in enumerate(schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
@@ -1,4 +1,4 @@
-import bcrypt
+from models import User
 password = 'admin'
-hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-print(hashed.decode('utf-8'))
\ No newline at end of file
+# Стоимость bcrypt берётся из настроек (med.ini или MED_BCRYPT_ROUNDS)
+print(User.hash_password(password))
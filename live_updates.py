@@ -0,0 +1,158 @@
+# live_updates.py
+"""Живое обновление данных между рабочими местами через LISTEN/NOTIFY.
+
+Триггеры уровня оператора (миграция 0006) отправляют в канал med_changes
+JSON вида {"table": "ClientOrder", "op": "INSERT", "ids": [5, 6], "parent_ids": [1]},
+где parent_ids — клиенты заказов или заказы позиций. Вместо очень больших пачек
+(импорт) приходит {"table": ..., "op": ..., "reload": true}. ChangeListener слушает канал
+на отдельном соединении в фоновом потоке, собирает события за короткий
+интервал и передаёт в поток интерфейса сигналом changed(table, ids, parent_ids).
+"""
+import json
+import select
+import threading
+
+from PySide6.QtCore import QCoreApplication, QObject, QTimer, Signal
+
+CHANNEL = "med_changes"
+
+# Сколько ждать следующих событий, прежде чем передать накопленные в интерфейс (мс)
+BATCH_INTERVAL = 200
+
+
+class _ListenerSignals(QObject):
+    notified = Signal(list)  # список разобранных уведомлений
+    reconnected = Signal()
+
+
+class _ListenerThread(threading.Thread):
+    """Поток с собственным соединением, ожидающий уведомлений PostgreSQL.
+
+    Поток фоновый (daemon): незакрытое окно не задерживает выход из программы.
+    """
+
+    # Как часто проверять запрос на остановку и повторять подключение (секунды)
+    poll_timeout = 0.5
+    retry_interval = 5.0
+
+    def __init__(self, engine):
+        super().__init__(name="med-change-listener", daemon=True)
+        self.engine = engine
+        self.signals = _ListenerSignals()
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def _connect(self):
+        # Отдельное соединение вне пула: оно занято LISTEN всё время работы окна
+        dialect = self.engine.dialect
+        args, kwargs = dialect.create_connect_args(self.engine.url)
+        connection = dialect.dbapi.connect(*args, **kwargs)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        return connection
+
+    def run(self):
+        connected_before = False
+        while not self._stop_event.is_set():
+            try:
+                connection = self._connect()
+            except Exception:
+                self._stop_event.wait(self.retry_interval)
+                continue
+            if connected_before:
+                # Пока соединения не было, события могли потеряться
+                self.signals.reconnected.emit()
+            connected_before = True
+            try:
+                self._listen(connection)
+            except Exception:
+                self._stop_event.wait(self.retry_interval)
+            finally:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+
+    def _listen(self, connection):
+        while not self._stop_event.is_set():
+            if select.select([connection], [], [], self.poll_timeout) == ([], [], []):
+                continue
+            connection.poll()
+            events = []
+            while connection.notifies:
+                notify = connection.notifies.pop(0)
+                try:
+                    events.append(json.loads(notify.payload))
+                except ValueError:
+                    continue
+            if events:
+                self.signals.notified.emit(events)
+
+
+class ChangeListener(QObject):
+    """Подписка на изменения других рабочих мест.
+
+    changed(table, ids, parent_ids) приходит в потоке интерфейса не чаще раза
+    в BATCH_INTERVAL на таблицу; reload_required — если события могли быть
+    потеряны (обрыв соединения) или изменений слишком много (массовый импорт)
+    и открытые списки нужно перечитать целиком.
+    """
+
+    changed = Signal(str, object, object)  # (таблица, множество ID, множество parent_id)
+    reload_required = Signal()
+
+    def __init__(self, engine, parent=None):
+        super().__init__(parent)
+        self._pending = {}
+        self._reload_pending = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(BATCH_INTERVAL)
+        self._timer.timeout.connect(self._flush)
+        self._thread = _ListenerThread(engine)
+        self._thread.signals.notified.connect(self._collect)
+        self._thread.signals.reconnected.connect(self.reload_required)
+        # Соединение LISTEN закрывается, даже если окно удалено без closeEvent или приложение завершается
+        thread = self._thread
+        self.destroyed.connect(lambda: thread.stop() if thread.is_alive() else None)
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop)
+
+    @staticmethod
+    def is_supported(engine):
+        return engine.dialect.name == "postgresql"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._timer.stop()
+        if self._thread.is_alive():
+            self._thread.stop()
+
+    def _collect(self, events):
+        for event in events:
+            if event.get("reload"):
+                # Изменено слишком много строк, чтобы перечислять их ID
+                self._reload_pending = True
+                continue
+            ids, parent_ids = self._pending.setdefault(event["table"], (set(), set()))
+            ids.update(event.get("ids") or ())
+            parent_ids.update(event.get("parent_ids") or ())
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _flush(self):
+        pending, self._pending = self._pending, {}
+        if self._reload_pending:
+            # Полная перезагрузка покрывает и накопленные изменения отдельных строк
+            self._reload_pending = False
+            self.reload_required.emit()
+            return
+        for table, (ids, parent_ids) in pending.items():
+            self.changed.emit(table, ids, parent_ids)
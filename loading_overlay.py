@@ -0,0 +1,27 @@
+from PySide6.QtCore import Qt, QEvent
+from PySide6.QtWidgets import QLabel
+
+
+class LoadingOverlay(QLabel):
+    """Полупрозрачная надпись "Загрузка…" поверх таблицы на время фонового запроса."""
+
+    def __init__(self, table, text="Загрузка…"):
+        super().__init__(text, table.viewport())
+        self.setAlignment(Qt.AlignCenter)
+        self.setStyleSheet("background-color: rgba(255, 255, 255, 180); color: #555; font-size: 14px;")
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.hide()
+        table.viewport().installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Resize:
+            self.setGeometry(watched.rect())
+        return False
+
+    def set_loading(self, loading):
+        if loading:
+            self.setGeometry(self.parentWidget().rect())
+            self.raise_()
+            self.show()
+        else:
+            self.hide()
@@ -1,11 +1,18 @@
 from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox
-from models import create_connection, User, Role, UserRole
+from models import User
+from db import get_session_factory
+from auth import authenticate
+from permissions import MANAGE_USERS
+from query_executor import QueryExecutor
 from admin_window import AdminWindow
 from user_window import UserWindow
 
 class LoginWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, session_factory=None):
         super().__init__()
+        self.session_factory = session_factory or get_session_factory()
+        # Проверка пароля (bcrypt) выполняется в фоновом потоке, окно не зависает
+        self.executor = QueryExecutor(self.session_factory, self, max_threads=1)
         self.setWindowTitle("Вход в систему")
         self.setGeometry(100, 100, 300, 200)
 
@@ -19,6 +26,7 @@ class LoginWindow(QMainWindow):
         self.password_input = QLineEdit(self)
         self.password_input.setPlaceholderText("Пароль")
         self.password_input.setEchoMode(QLineEdit.Password)
+        self.password_input.returnPressed.connect(self.login)
 
         # Кнопка входа
         self.login_button = QPushButton("Войти", self)
@@ -44,34 +52,44 @@ class LoginWindow(QMainWindow):
             return
 
         # Проверка пользователя в базе
-        session = create_connection()
-        user = session.query(User).filter_by(username=username).first()
-
-        if user and user.check_password(password):
-            # Получаем роль пользователя
-            user_role = session.query(UserRole).filter_by(user_id=user.id).first()
-            role = session.query(Role).filter_by(id=user_role.role_id).first() if user_role else None
-            role_name = role.name if role else "Basic User"
-
-            # Приводим имя роли к значению, используемому в коде
-            role_mapping = {
-                "Basic User": "basic",
-                "Administrator": "admin",
-                "Sales Manager": "sales_manager",
-                "Worker": "worker",
-                "Accountant": "accountant",
-                "Director": "director"
-            }
-            role_value = role_mapping.get(role_name, "basic")
-
-            # В зависимости от роли открываем соответствующий интерфейс
-            if role_value == "admin":
-                self.admin_window = AdminWindow(session, user, role_value)
-                self.admin_window.show()
-            else:
-                self.user_window = UserWindow(session, user, role_value)
-                self.user_window.show()
-            self.close()
-        else:
+        self.set_signing_in(True)
+        self.executor.submit(
+            "login",
+            lambda session: authenticate(session, username, password),
+            self.on_authenticated,
+            self.on_login_error,
+        )
+
+    def set_signing_in(self, signing_in):
+        """Блокирует форму на время проверки пароля."""
+        self.username_input.setEnabled(not signing_in)
+        self.password_input.setEnabled(not signing_in)
+        self.login_button.setEnabled(not signing_in)
+        self.login_button.setText("Вход…" if signing_in else "Войти")
+
+    def on_authenticated(self, result):
+        self.set_signing_in(False)
+        if result is None:
             QMessageBox.critical(self, "Ошибка", "Неверное имя пользователя или пароль")
-            session.close()
\ No newline at end of file
+            return
+
+        user_id, permissions = result
+        session = self.session_factory()
+        user = session.get(User, user_id)
+
+        # В зависимости от разрешений открываем соответствующий интерфейс
+        if permissions.can(MANAGE_USERS):
+            self.admin_window = AdminWindow(session, user, permissions)
+            self.admin_window.show()
+        else:
+            self.user_window = UserWindow(session, user, permissions)
+            self.user_window.show()
+        self.close()
+
+    def on_login_error(self, error):
+        self.set_signing_in(False)
+        QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к базе данных: {error}")
+
+    def closeEvent(self, event):
+        self.executor.wait()
+        super().closeEvent(event)
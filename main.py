@@ -1,8 +1,10 @@
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import QApplication
 from login_window import LoginWindow 
+from db import dispose_engine
 
 app = QApplication([])
 window = LoginWindow()
 window.show()
-app.exec()
\ No newline at end of file
+app.exec()
+dispose_engine()
\ No newline at end of file
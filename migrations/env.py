@@ -0,0 +1,44 @@
+# migrations/env.py
+"""Окружение Alembic: схема описана в models.Base, подключение — из db.py.
+
+bootstrap.py может передать готовое соединение через config.attributes["connection"]
+(так миграции применяются к тестовой базе).
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from db import get_engine, load_settings
+from models import Base
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("connection") is None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Генерация SQL-скрипта без подключения к базе (alembic upgrade --sql)."""
+    context.configure(url=load_settings()["url"], target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+    with get_engine().connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
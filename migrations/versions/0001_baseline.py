@@ -0,0 +1,100 @@
+"""Исходная схема базы
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Базы, созданные до появления миграций (create_all при входе), уже содержат эти таблицы
+    if not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table("User"):
+        return
+
+    op.create_table(
+        "Role",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String(20), nullable=False),
+    )
+    op.create_table(
+        "User",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("username", sa.String(50), nullable=False, unique=True),
+        sa.Column("password_hash", sa.String(255), nullable=False),
+    )
+    op.create_table(
+        "UserRole",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("User.id"), primary_key=True),
+        sa.Column("role_id", sa.Integer, sa.ForeignKey("Role.id"), primary_key=True),
+    )
+    op.create_table(
+        "Client",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("client_type", sa.Enum("individual", "legal_entity", name="clienttype"), nullable=False),
+        sa.Column("phone", sa.String(12)),
+        sa.Column("email", sa.String(50), unique=True),
+        sa.Column("is_deleted", sa.Boolean),
+    )
+    op.create_table(
+        "IndividualClient",
+        sa.Column("id", sa.Integer, sa.ForeignKey("Client.id"), primary_key=True),
+        sa.Column("first_name", sa.String(50)),
+        sa.Column("last_name", sa.String(50)),
+        sa.Column("middle_name", sa.String(50)),
+    )
+    op.create_table(
+        "LegalEntityClient",
+        sa.Column("id", sa.Integer, sa.ForeignKey("Client.id"), primary_key=True),
+        sa.Column("company_name", sa.String(100)),
+        sa.Column("inn", sa.String(12)),
+        sa.Column("kpp", sa.String(9)),
+        sa.Column("ogrn", sa.String(15)),
+    )
+    op.create_table(
+        "ClientOrder",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("client_id", sa.Integer, sa.ForeignKey("Client.id")),
+        sa.Column("order_date", sa.Date),
+        sa.Column("status", sa.Enum("created", "awaiting_payment", "processing", "awaiting_delivery", "completed",
+                                    name="orderstatus"), nullable=False),
+    )
+    op.create_table(
+        "Product",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String(50), nullable=False),
+        sa.Column("description", sa.String(255)),
+        sa.Column("price", sa.Float),
+        sa.Column("stock_quantity", sa.Integer),
+    )
+    op.create_table(
+        "OrderItem",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("order_id", sa.Integer, sa.ForeignKey("ClientOrder.id")),
+        sa.Column("product_id", sa.Integer, sa.ForeignKey("Product.id")),
+        sa.Column("quantity", sa.Integer),
+        sa.Column("price", sa.Float),
+    )
+    op.create_table(
+        "Payment",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("order_id", sa.Integer, sa.ForeignKey("ClientOrder.id")),
+        sa.Column("amount", sa.Float),
+        sa.Column("payment_date", sa.Date),
+        sa.Column("payment_method", sa.Enum("cash", "bank_transfer", name="paymentmethod"), nullable=False),
+    )
+
+
+def downgrade():
+    for table in ["Payment", "OrderItem", "Product", "ClientOrder", "LegalEntityClient",
+                  "IndividualClient", "Client", "UserRole", "User", "Role"]:
+        op.drop_table(table)
+    for enum_name in ["paymentmethod", "orderstatus", "clienttype"]:
+        sa.Enum(name=enum_name).drop(op.get_bind())
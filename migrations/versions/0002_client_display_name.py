@@ -0,0 +1,39 @@
+"""Отображаемое имя клиента
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # IF NOT EXISTS: в базах, обновлённых до появления миграций, столбец уже есть
+    op.execute('ALTER TABLE "Client" ADD COLUMN IF NOT EXISTS display_name VARCHAR(160)')
+    op.execute('CREATE INDEX IF NOT EXISTS "ix_Client_display_name" ON "Client" (display_name)')
+    # Заполняем отображаемое имя для клиентов, созданных до появления столбца
+    op.execute("""
+        UPDATE "Client" c
+           SET display_name = COALESCE(
+               CASE c.client_type
+                   WHEN 'legal_entity' THEN NULLIF(l.company_name, '')
+                   WHEN 'individual' THEN CASE WHEN i.last_name <> ''
+                       THEN concat_ws(' ', i.last_name, NULLIF(i.first_name, ''), NULLIF(i.middle_name, '')) END
+               END,
+               'Неизвестный клиент')
+          FROM "Client" c2
+          LEFT JOIN "IndividualClient" i ON i.id = c2.id
+          LEFT JOIN "LegalEntityClient" l ON l.id = c2.id
+         WHERE c2.id = c.id AND c.display_name IS NULL
+    """)
+
+
+def downgrade():
+    op.drop_index("ix_Client_display_name", table_name="Client")
+    op.drop_column("Client", "display_name")
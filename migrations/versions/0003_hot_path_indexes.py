@@ -0,0 +1,33 @@
+"""Индексы для частых запросов
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Заказы клиента (список заказов, отчёты)
+    op.create_index("ix_ClientOrder_client_id", "ClientOrder", ["client_id"], if_not_exists=True)
+    # Позиции заказа (редактирование заказа, суммы в списке заказов)
+    op.create_index("ix_OrderItem_order_id", "OrderItem", ["order_id"], if_not_exists=True)
+    # Позиции по товару (проверки при изменении товара, аналитика)
+    op.create_index("ix_OrderItem_product_id", "OrderItem", ["product_id"], if_not_exists=True)
+    # Список неудалённых клиентов с фильтром по типу и сортировкой по ID
+    op.create_index("ix_Client_active_type", "Client", ["client_type", "id"],
+                    postgresql_where=sa.text("is_deleted = false"), if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_Client_active_type", table_name="Client")
+    op.drop_index("ix_OrderItem_product_id", table_name="OrderItem")
+    op.drop_index("ix_OrderItem_order_id", table_name="OrderItem")
+    op.drop_index("ix_ClientOrder_client_id", table_name="ClientOrder")
@@ -0,0 +1,67 @@
+"""Разрешения ролей
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+PERMISSIONS = [
+    ("manage_users", "Управление пользователями"),
+    ("view_clients", "Просмотр клиентов и заказов"),
+    ("manage_clients", "Создание, редактирование, удаление и импорт клиентов"),
+    ("create_orders", "Создание заказов"),
+    ("edit_order_items", "Изменение количества в заказе"),
+    ("edit_order_status", "Изменение статуса заказа"),
+    ("build_reports", "Отчёты и выгрузка данных"),
+]
+
+# Права, которые раньше были зашиты в код интерфейса
+ROLE_PERMISSIONS = {
+    "Basic User": [],
+    "Administrator": ["manage_users"],
+    "Sales Manager": ["view_clients", "create_orders", "edit_order_items"],
+    "Worker": ["view_clients", "edit_order_status"],
+    "Accountant": ["view_clients", "build_reports"],
+    "Director": ["view_clients", "manage_clients", "create_orders", "edit_order_items",
+                 "edit_order_status", "build_reports"],
+}
+
+
+def upgrade():
+    permission = op.create_table(
+        "Permission",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String(50), nullable=False, unique=True),
+        sa.Column("description", sa.String(255)),
+    )
+    op.create_table(
+        "RolePermission",
+        sa.Column("role_id", sa.Integer, sa.ForeignKey("Role.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("permission_id", sa.Integer, sa.ForeignKey("Permission.id", ondelete="CASCADE"), primary_key=True),
+    )
+    op.bulk_insert(permission, [{"name": name, "description": description} for name, description in PERMISSIONS])
+
+    # Роли могли добавляться вручную с явными ID, поэтому сначала догоняем последовательность
+    op.execute("""SELECT setval(pg_get_serial_sequence('"Role"', 'id'), COALESCE(max(id), 0) + 1, false) FROM "Role\"""")
+    for role_name, permission_names in ROLE_PERMISSIONS.items():
+        op.execute(sa.text(
+            'INSERT INTO "Role" (name) SELECT :role WHERE NOT EXISTS (SELECT 1 FROM "Role" WHERE name = :role)'
+        ).bindparams(role=role_name))
+        for permission_name in permission_names:
+            op.execute(sa.text(
+                'INSERT INTO "RolePermission" (role_id, permission_id) '
+                'SELECT r.id, p.id FROM "Role" r, "Permission" p WHERE r.name = :role AND p.name = :permission'
+            ).bindparams(role=role_name, permission=permission_name))
+
+
+def downgrade():
+    op.drop_table("RolePermission")
+    op.drop_table("Permission")
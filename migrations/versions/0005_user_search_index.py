@@ -0,0 +1,23 @@
+"""Индекс для поиска пользователей по имени
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # text_pattern_ops позволяет использовать индекс для LIKE 'начало%' при любой локали базы
+    op.create_index("ix_User_username_lower", "User", [sa.text("lower(username) text_pattern_ops")])
+
+
+def downgrade():
+    op.drop_index("ix_User_username_lower", table_name="User")
@@ -0,0 +1,89 @@
+"""Уведомления об изменениях для других рабочих мест
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Таблица и столбец со ссылкой на родителя, который нужно обновить вместе с записью
+NOTIFY_TABLES = {
+    "Client": None,
+    "IndividualClient": None,
+    "LegalEntityClient": None,
+    "ClientOrder": "client_id",
+    "OrderItem": "order_id",
+    "Product": None,
+}
+
+# Сколько ID отправлять в одном уведомлении: полезная нагрузка NOTIFY ограничена 8000 байт
+NOTIFY_BATCH = 250
+# Если оператор изменил больше строк, вместо ID отправляется одно уведомление {"reload": true}
+RELOAD_THRESHOLD = 1000
+
+# Таблицы переходов допустимы только у триггера на одно событие, поэтому их три на таблицу
+EVENTS = {
+    "insert": ("INSERT", "NEW TABLE AS changed_rows"),
+    "update": ("UPDATE", "NEW TABLE AS changed_rows"),
+    "delete": ("DELETE", "OLD TABLE AS changed_rows"),
+}
+
+
+def upgrade():
+    # Триггер уровня оператора: массовое изменение (импорт клиентов) отправляет
+    # несколько уведомлений с пачками ID, а не уведомление на каждую строку.
+    # Одна функция на все таблицы: имя столбца с parent_id передаётся аргументом триггера
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION med_notify_change() RETURNS trigger AS $$
+        DECLARE
+            parent_column text := CASE WHEN TG_NARGS > 0 THEN TG_ARGV[0] END;
+            total bigint;
+            batch record;
+        BEGIN
+            SELECT count(*) INTO total FROM changed_rows;
+            IF total = 0 THEN
+                RETURN NULL;
+            END IF;
+            IF total > {RELOAD_THRESHOLD} THEN
+                PERFORM pg_notify('med_changes', json_build_object(
+                    'table', TG_TABLE_NAME, 'op', TG_OP, 'reload', true
+                )::text);
+                RETURN NULL;
+            END IF;
+            FOR batch IN
+                SELECT json_agg(id) AS ids,
+                       COALESCE(json_agg(DISTINCT parent_id) FILTER (WHERE parent_id IS NOT NULL), '[]') AS parent_ids
+                FROM (
+                    SELECT (to_jsonb(r) ->> 'id')::integer AS id,
+                           (to_jsonb(r) ->> parent_column)::integer AS parent_id,
+                           (row_number() OVER () - 1) / {NOTIFY_BATCH} AS chunk
+                    FROM changed_rows r
+                ) t
+                GROUP BY chunk
+            LOOP
+                PERFORM pg_notify('med_changes', json_build_object(
+                    'table', TG_TABLE_NAME, 'op', TG_OP, 'ids', batch.ids, 'parent_ids', batch.parent_ids
+                )::text);
+            END LOOP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table, parent_column in NOTIFY_TABLES.items():
+        argument = f"'{parent_column}'" if parent_column else ""
+        for name, (event, referencing) in EVENTS.items():
+            op.execute(f'CREATE TRIGGER "{table}_notify_{name}" AFTER {event} ON "{table}" '
+                       f"REFERENCING {referencing} FOR EACH STATEMENT EXECUTE FUNCTION med_notify_change({argument})")
+
+
+def downgrade():
+    for table in NOTIFY_TABLES:
+        for name in EVENTS:
+            op.execute(f'DROP TRIGGER IF EXISTS "{table}_notify_{name}" ON "{table}"')
+    op.execute("DROP FUNCTION IF EXISTS med_notify_change()")
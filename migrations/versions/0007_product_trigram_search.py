@@ -0,0 +1,28 @@
+"""Триграммные индексы для поиска товаров
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm — доверенное расширение (PostgreSQL 13+), его может подключить владелец базы
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # GIN по триграммам обслуживает ILIKE '%текст%' по названию и описанию товара
+    op.create_index("ix_Product_name_trgm", "Product", ["name"],
+                    postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"})
+    op.create_index("ix_Product_description_trgm", "Product", ["description"],
+                    postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"})
+
+
+def downgrade():
+    op.drop_index("ix_Product_description_trgm", table_name="Product")
+    op.drop_index("ix_Product_name_trgm", table_name="Product")
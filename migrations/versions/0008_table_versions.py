@@ -0,0 +1,53 @@
+"""Счётчики версий таблиц для кэшей в памяти
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+# Таблица -> имя версии, которую увеличивает любое её изменение
+VERSIONED_TABLES = {
+    "Client": "Client",
+    "IndividualClient": "Client",
+    "LegalEntityClient": "Client",
+}
+
+
+def upgrade():
+    op.create_table(
+        "TableVersion",
+        sa.Column("table_name", sa.String(50), primary_key=True),
+        sa.Column("version", sa.BigInteger, nullable=False, server_default="0"),
+    )
+    op.execute("""INSERT INTO "TableVersion" (table_name) VALUES ('Client')""")
+    # Триггер уровня оператора: массовое изменение увеличивает версию один раз.
+    # Версия меняется в той же транзакции, что и данные, поэтому становится
+    # видна другим сеансам одновременно с изменениями. Строка версии заблокирована
+    # до конца транзакции — для нечастых изменений клиентов это приемлемо.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION med_bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO "TableVersion" (table_name, version) VALUES (TG_ARGV[0], 1)
+            ON CONFLICT (table_name) DO UPDATE SET version = "TableVersion".version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table, version_name in VERSIONED_TABLES.items():
+        op.execute(f'CREATE TRIGGER "{table}_bump_version" AFTER INSERT OR UPDATE OR DELETE ON "{table}" '
+                   f"FOR EACH STATEMENT EXECUTE FUNCTION med_bump_table_version('{version_name}')")
+
+
+def downgrade():
+    for table in VERSIONED_TABLES:
+        op.execute(f'DROP TRIGGER IF EXISTS "{table}_bump_version" ON "{table}"')
+    op.execute("DROP FUNCTION IF EXISTS med_bump_table_version()")
+    op.drop_table("TableVersion")
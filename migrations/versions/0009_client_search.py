@@ -0,0 +1,104 @@
+"""Полнотекстовый и триграммный поиск клиентов
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+SUBTYPE_EVENTS = {
+    "insert": ("INSERT", "NEW TABLE AS changed_rows"),
+    "update": ("UPDATE", "NEW TABLE AS changed_rows"),
+    "delete": ("DELETE", "OLD TABLE AS changed_rows"),
+}
+
+
+def upgrade():
+    # Поля поиска лежат в трёх таблицах, поэтому вместо генерируемых столбцов
+    # Client.search_vector и Client.search_text поддерживаются триггерами
+    op.add_column("Client", sa.Column("search_vector", postgresql.TSVECTOR))
+    op.add_column("Client", sa.Column("search_text", sa.Text))
+
+    # Имена и название компании разбираются морфологией русского языка (вес A),
+    # реквизиты и контакты — как есть (вес B). search_text — те же поля одной
+    # строкой в нижнем регистре для поиска по подстроке (pg_trgm, миграция 0007)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION med_client_search_data(
+            p_client_id integer, p_phone text, p_email text,
+            OUT search_vector tsvector, OUT search_text text
+        ) AS $$
+            SELECT
+                setweight(to_tsvector('russian', concat_ws(' ', i.last_name, i.first_name, i.middle_name, l.company_name)), 'A')
+                || setweight(to_tsvector('simple', concat_ws(' ', l.inn, l.ogrn, p_phone, p_email)), 'B'),
+                lower(concat_ws(' ', i.last_name, i.first_name, i.middle_name, l.company_name, l.inn, l.ogrn, p_phone, p_email))
+            FROM (SELECT p_client_id AS id) c
+            LEFT JOIN "IndividualClient" i ON i.id = c.id
+            LEFT JOIN "LegalEntityClient" l ON l.id = c.id
+        $$ LANGUAGE sql STABLE
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION med_client_search_before() RETURNS trigger AS $$
+        BEGIN
+            SELECT d.search_vector, d.search_text INTO NEW.search_vector, NEW.search_text
+            FROM med_client_search_data(NEW.id, NEW.phone, NEW.email) d;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    # Триггер подтипа уровня оператора: массовая вставка (импорт) обновляет поисковые
+    # столбцы всех своих клиентов одним UPDATE, а не отдельным UPDATE на строку
+    op.execute("""
+        CREATE OR REPLACE FUNCTION med_client_search_subtype() RETURNS trigger AS $$
+        BEGIN
+            UPDATE "Client" c
+            SET (search_vector, search_text) = (
+                SELECT d.search_vector, d.search_text FROM med_client_search_data(c.id, c.phone, c.email) d
+            )
+            WHERE c.id IN (SELECT id FROM changed_rows);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    # UPDATE только search_vector/search_text (из триггера подтипа) не пересчитывает их повторно
+    op.execute('CREATE TRIGGER "Client_search" BEFORE INSERT OR UPDATE OF phone, email ON "Client" '
+               "FOR EACH ROW EXECUTE FUNCTION med_client_search_before()")
+    # Таблицы переходов допустимы только у триггера на одно событие
+    for table in ("IndividualClient", "LegalEntityClient"):
+        for name, (event, referencing) in SUBTYPE_EVENTS.items():
+            op.execute(f'CREATE TRIGGER "{table}_search_{name}" AFTER {event} ON "{table}" '
+                       f"REFERENCING {referencing} FOR EACH STATEMENT EXECUTE FUNCTION med_client_search_subtype()")
+
+    # Заполнение существующих строк не должно рассылать уведомление на каждого клиента
+    op.execute('ALTER TABLE "Client" DISABLE TRIGGER "Client_notify_update"')
+    op.execute("""
+        UPDATE "Client" c
+        SET (search_vector, search_text) = (
+            SELECT d.search_vector, d.search_text FROM med_client_search_data(c.id, c.phone, c.email) d
+        )
+    """)
+    op.execute('ALTER TABLE "Client" ENABLE TRIGGER "Client_notify_update"')
+    op.create_index("ix_Client_search_vector", "Client", ["search_vector"], postgresql_using="gin")
+    op.create_index("ix_Client_search_text", "Client", ["search_text"],
+                    postgresql_using="gin", postgresql_ops={"search_text": "gin_trgm_ops"})
+
+
+def downgrade():
+    op.drop_index("ix_Client_search_text", table_name="Client")
+    op.drop_index("ix_Client_search_vector", table_name="Client")
+    for table in ("IndividualClient", "LegalEntityClient"):
+        for name in SUBTYPE_EVENTS:
+            op.execute(f'DROP TRIGGER IF EXISTS "{table}_search_{name}" ON "{table}"')
+    op.execute('DROP TRIGGER IF EXISTS "Client_search" ON "Client"')
+    op.execute("DROP FUNCTION IF EXISTS med_client_search_subtype()")
+    op.execute("DROP FUNCTION IF EXISTS med_client_search_before()")
+    op.execute("DROP FUNCTION IF EXISTS med_client_search_data(integer, text, text)")
+    op.drop_column("Client", "search_text")
+    op.drop_column("Client", "search_vector")
@@ -0,0 +1,175 @@
+"""Дневные итоги продаж по товарам и клиентам
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "SalesDailyProduct",
+        sa.Column("day", sa.Date, primary_key=True),
+        sa.Column("product_id", sa.Integer, primary_key=True),
+        sa.Column("quantity", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column("amount", sa.Float, nullable=False, server_default="0"),
+    )
+    op.create_table(
+        "SalesDailyClient",
+        sa.Column("day", sa.Date, primary_key=True),
+        sa.Column("client_id", sa.Integer, primary_key=True),
+        sa.Column("order_count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("quantity", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column("amount", sa.Float, nullable=False, server_default="0"),
+    )
+
+    # Старые позиции без стоимости получают её по цене товара — так их уже считают
+    # список заказов, отчёт и выгрузка (coalesce(price, Product.price * quantity)).
+    # После этого итоги, собранные по OrderItem.price, совпадают с отчётом.
+    # Обновление выполняется до создания триггеров итогов: их заполнит запрос ниже.
+    op.execute("""
+        UPDATE "OrderItem" i SET price = p.price * i.quantity
+        FROM "Product" p
+        WHERE p.id = i.product_id AND i.price IS NULL
+    """)
+
+    # Итоги меняются на разницу (старые значения вычитаются, новые прибавляются),
+    # а не пересчитываются. Сумма позиции — OrderItem.price (стоимость строки).
+    # Строка итога по товару за день блокируется до конца транзакции, но заказ
+    # этого товара уже держит блокировку строки Product (списание остатка).
+    op.execute("""
+        CREATE OR REPLACE FUNCTION med_sales_add_item(
+            p_order_id integer, p_product_id integer, p_quantity bigint, p_amount double precision
+        ) RETURNS void AS $$
+        DECLARE
+            order_day date;
+            order_client integer;
+        BEGIN
+            SELECT order_date, client_id INTO order_day, order_client FROM "ClientOrder" WHERE id = p_order_id;
+            IF order_day IS NULL THEN
+                RETURN;
+            END IF;
+            IF p_product_id IS NOT NULL THEN
+                INSERT INTO "SalesDailyProduct" AS s (day, product_id, quantity, amount)
+                VALUES (order_day, p_product_id, p_quantity, p_amount)
+                ON CONFLICT (day, product_id) DO UPDATE
+                SET quantity = s.quantity + EXCLUDED.quantity, amount = s.amount + EXCLUDED.amount;
+            END IF;
+            IF order_client IS NOT NULL THEN
+                INSERT INTO "SalesDailyClient" AS s (day, client_id, quantity, amount)
+                VALUES (order_day, order_client, p_quantity, p_amount)
+                ON CONFLICT (day, client_id) DO UPDATE
+                SET quantity = s.quantity + EXCLUDED.quantity, amount = s.amount + EXCLUDED.amount;
+            END IF;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION med_sales_item() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM med_sales_add_item(OLD.order_id, OLD.product_id, -OLD.quantity, -COALESCE(OLD.price, 0));
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM med_sales_add_item(NEW.order_id, NEW.product_id, NEW.quantity, COALESCE(NEW.price, 0));
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    # Заказ учитывается в order_count; при смене даты или клиента его позиции переносятся
+    op.execute("""
+        CREATE OR REPLACE FUNCTION med_sales_add_order(
+            p_order_id integer, p_day date, p_client_id integer, p_sign integer, p_with_items boolean
+        ) RETURNS void AS $$
+        BEGIN
+            IF p_day IS NULL THEN
+                RETURN;
+            END IF;
+            IF p_client_id IS NOT NULL THEN
+                INSERT INTO "SalesDailyClient" AS s (day, client_id, order_count, quantity, amount)
+                SELECT p_day, p_client_id, p_sign,
+                       CASE WHEN p_with_items THEN p_sign * COALESCE(SUM(i.quantity), 0) ELSE 0 END,
+                       CASE WHEN p_with_items THEN p_sign * COALESCE(SUM(i.price), 0) ELSE 0 END
+                FROM "OrderItem" i WHERE i.order_id = p_order_id
+                ON CONFLICT (day, client_id) DO UPDATE
+                SET order_count = s.order_count + EXCLUDED.order_count,
+                    quantity = s.quantity + EXCLUDED.quantity, amount = s.amount + EXCLUDED.amount;
+            END IF;
+            IF p_with_items THEN
+                INSERT INTO "SalesDailyProduct" AS s (day, product_id, quantity, amount)
+                SELECT p_day, i.product_id, p_sign * SUM(i.quantity), p_sign * SUM(COALESCE(i.price, 0))
+                FROM "OrderItem" i WHERE i.order_id = p_order_id AND i.product_id IS NOT NULL
+                GROUP BY i.product_id
+                ON CONFLICT (day, product_id) DO UPDATE
+                SET quantity = s.quantity + EXCLUDED.quantity, amount = s.amount + EXCLUDED.amount;
+            END IF;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION med_sales_order() RETURNS trigger AS $$
+        BEGIN
+            -- Новый заказ ещё без позиций, удаляемый — уже без них (внешний ключ OrderItem)
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM med_sales_add_order(OLD.id, OLD.order_date, OLD.client_id, -1, TG_OP = 'UPDATE');
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM med_sales_add_order(NEW.id, NEW.order_date, NEW.client_id, 1, TG_OP = 'UPDATE');
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute('CREATE TRIGGER "OrderItem_sales" AFTER INSERT OR UPDATE OF order_id, product_id, quantity, price '
+               'OR DELETE ON "OrderItem" FOR EACH ROW EXECUTE FUNCTION med_sales_item()')
+    op.execute('CREATE TRIGGER "ClientOrder_sales" AFTER INSERT OR UPDATE OF order_date, client_id '
+               'OR DELETE ON "ClientOrder" FOR EACH ROW EXECUTE FUNCTION med_sales_order()')
+
+    # Итоги по уже существующим заказам
+    op.execute("""
+        INSERT INTO "SalesDailyProduct" (day, product_id, quantity, amount)
+        SELECT o.order_date, i.product_id, SUM(i.quantity), SUM(COALESCE(i.price, 0))
+        FROM "OrderItem" i JOIN "ClientOrder" o ON o.id = i.order_id
+        WHERE o.order_date IS NOT NULL AND i.product_id IS NOT NULL
+        GROUP BY o.order_date, i.product_id
+    """)
+    op.execute("""
+        INSERT INTO "SalesDailyClient" (day, client_id, order_count, quantity, amount)
+        SELECT o.order_date, o.client_id, COUNT(*), COALESCE(SUM(t.quantity), 0), COALESCE(SUM(t.amount), 0)
+        FROM "ClientOrder" o
+        LEFT JOIN (
+            SELECT order_id, SUM(quantity) AS quantity, SUM(COALESCE(price, 0)) AS amount
+            FROM "OrderItem" GROUP BY order_id
+        ) t ON t.order_id = o.id
+        WHERE o.order_date IS NOT NULL AND o.client_id IS NOT NULL
+        GROUP BY o.order_date, o.client_id
+    """)
+
+    # Просмотр панели продаж — руководителю и бухгалтеру
+    op.execute("""INSERT INTO "Permission" (name, description) VALUES ('view_sales', 'Панель продаж')""")
+    op.execute("""
+        INSERT INTO "RolePermission" (role_id, permission_id)
+        SELECT r.id, p.id FROM "Role" r, "Permission" p
+        WHERE r.name IN ('Director', 'Accountant') AND p.name = 'view_sales'
+    """)
+
+
+def downgrade():
+    op.execute("""DELETE FROM "Permission" WHERE name = 'view_sales'""")
+    op.execute('DROP TRIGGER IF EXISTS "ClientOrder_sales" ON "ClientOrder"')
+    op.execute('DROP TRIGGER IF EXISTS "OrderItem_sales" ON "OrderItem"')
+    op.execute("DROP FUNCTION IF EXISTS med_sales_order()")
+    op.execute("DROP FUNCTION IF EXISTS med_sales_add_order(integer, date, integer, integer, boolean)")
+    op.execute("DROP FUNCTION IF EXISTS med_sales_item()")
+    op.execute("DROP FUNCTION IF EXISTS med_sales_add_item(integer, integer, bigint, double precision)")
+    op.drop_table("SalesDailyClient")
+    op.drop_table("SalesDailyProduct")
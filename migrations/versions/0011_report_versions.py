@@ -0,0 +1,70 @@
+"""Версии данных заказов и товаров для кэша отчётов
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+# На сколько строк-слотов делится счётчик версии одной таблицы
+VERSION_SLOTS = 64
+
+
+def upgrade():
+    # Заказы меняются часто и параллельно: общий счётчик в одной строке TableVersion
+    # выстроил бы все транзакции заказов в очередь. Поэтому счётчик делится на слоты
+    # по номеру серверного процесса: транзакция увеличивает строку своего соединения,
+    # а версия — сумма слотов. Сумма растёт при фиксации любой транзакции, в том числе
+    # начатой раньше уже зафиксированных, и не видит незафиксированных изменений.
+    op.add_column("TableVersion", sa.Column("slot", sa.SmallInteger, nullable=False, server_default="0"))
+    op.drop_constraint("TableVersion_pkey", "TableVersion", type_="primary")
+    op.create_primary_key("TableVersion_pkey", "TableVersion", ["table_name", "slot"])
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION med_bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO "TableVersion" (table_name, slot, version)
+            VALUES (TG_ARGV[0], mod(pg_backend_pid(), {VERSION_SLOTS}), 1)
+            ON CONFLICT (table_name, slot) DO UPDATE SET version = "TableVersion".version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    # Заказы и их позиции делят одну версию
+    for table in ("ClientOrder", "OrderItem"):
+        op.execute(f'CREATE TRIGGER "{table}_bump_version" AFTER INSERT OR UPDATE OR DELETE ON "{table}" '
+                   "FOR EACH STATEMENT EXECUTE FUNCTION med_bump_table_version('Orders')")
+    # Отчёты берут у товара только название и цену; списание остатка версию не меняет
+    op.execute('CREATE TRIGGER "Product_bump_version" AFTER INSERT OR UPDATE OF name, price OR DELETE ON "Product" '
+               "FOR EACH STATEMENT EXECUTE FUNCTION med_bump_table_version('Product')")
+
+
+def downgrade():
+    for table in ("ClientOrder", "OrderItem", "Product"):
+        op.execute(f'DROP TRIGGER IF EXISTS "{table}_bump_version" ON "{table}"')
+    op.execute("""DELETE FROM "TableVersion" WHERE table_name IN ('Orders', 'Product')""")
+    # Слоты каждой версии сводятся в одну строку
+    op.execute("""
+        INSERT INTO "TableVersion" (table_name, slot, version)
+        SELECT table_name, 0, sum(version) FROM "TableVersion" GROUP BY table_name
+        ON CONFLICT (table_name, slot) DO UPDATE SET version = EXCLUDED.version
+    """)
+    op.execute("""DELETE FROM "TableVersion" WHERE slot <> 0""")
+    op.drop_constraint("TableVersion_pkey", "TableVersion", type_="primary")
+    op.drop_column("TableVersion", "slot")
+    op.create_primary_key("TableVersion_pkey", "TableVersion", ["table_name"])
+    op.execute("""
+        CREATE OR REPLACE FUNCTION med_bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO "TableVersion" (table_name, version) VALUES (TG_ARGV[0], 1)
+            ON CONFLICT (table_name) DO UPDATE SET version = "TableVersion".version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
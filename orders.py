@@ -0,0 +1,105 @@
+# orders.py
+"""Создание и изменение заказов со списанием товара со склада.
+
+Остатки всех товаров заказа меняются одним условным UPDATE ... FROM (VALUES ...)
+WHERE stock_quantity >= quantity RETURNING: проверка и списание происходят
+атомарно в базе, и одновременные заказы не могут продать больше, чем есть на
+складе. Блокируются только строки товаров и только до конца транзакции.
+"""
+from datetime import datetime
+
+from sqlalchemy import Integer, column, insert, update, values
+
+from db import run_in_transaction
+from models import ClientOrder, OrderItem, Product, OrderStatus
+
+
+class InsufficientStock(Exception):
+    """На складе меньше товара, чем требуется."""
+
+    def __init__(self, product_id, available, product_name=None):
+        self.product_id = product_id
+        self.available = available
+        self.product_name = product_name
+        product = f" «{product_name}»" if product_name else ""
+        super().__init__(f"Недостаточно товара{product} на складе. В наличии: {available or 0}")
+
+
+def reserve_stock(session, quantities):
+    """Списывает товар по словарю {ID товара: количество} одним UPDATE.
+
+    Отрицательное количество возвращает товар на склад. Возвращает словарь
+    {ID товара: цена}. Если какого-то товара не хватает, выбрасывает
+    InsufficientStock — уже списанное откатывается вместе с транзакцией.
+    """
+    lines = values(column("product_id", Integer), column("quantity", Integer), name="line") \
+        .data(list(quantities.items()))
+    # Заказы с общими товарами могут заблокировать друг друга; такая транзакция
+    # прерывается базой (deadlock) и повторяется в run_in_transaction
+    rows = session.execute(
+        update(Product)
+        .where(Product.id == lines.c.product_id, Product.stock_quantity >= lines.c.quantity)
+        .values(stock_quantity=Product.stock_quantity - lines.c.quantity)
+        .returning(Product.id, Product.price)
+        .execution_options(synchronize_session=False)
+    ).all()
+    prices = {product_id: price for product_id, price in rows}
+    missing = [product_id for product_id in quantities if product_id not in prices]
+    if missing:
+        name, available = session.query(Product.name, Product.stock_quantity).filter_by(id=missing[0]).first() or (None, None)
+        raise InsufficientStock(missing[0], available, name)
+    return prices
+
+
+def create_order(session, client_id, lines):
+    """Создаёт заказ из позиций [(ID товара, количество), ...] и списывает товар.
+
+    Заказ, все позиции (одним многострочным INSERT) и списание остатков
+    выполняются в одной транзакции. Возвращает ID заказа.
+    """
+    quantities = {}
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+    def work(session):
+        prices = reserve_stock(session, quantities)
+        order = ClientOrder(client_id=client_id, order_date=datetime.now().date(), status=OrderStatus.created)
+        session.add(order)
+        session.flush()  # Получаем ID нового заказа
+        session.execute(insert(OrderItem).values([
+            {"order_id": order.id, "product_id": product_id, "quantity": quantity,
+             "price": prices[product_id] * quantity}
+            for product_id, quantity in quantities.items()
+        ]))
+        return order.id
+
+    return run_in_transaction(session, work)
+
+
+def update_order(session, order_id, quantities=None, status=None):
+    """Меняет количество в позициях заказа (с пересчётом остатков) и/или статус заказа.
+
+    quantities — словарь {ID позиции: новое количество}. Разница по всем
+    позициям списывается или возвращается на склад одним вызовом reserve_stock.
+    """
+
+    def work(session):
+        if quantities:
+            # Позиции блокируются (в порядке ID), чтобы разница считалась от актуального количества
+            items = session.query(OrderItem) \
+                .filter(OrderItem.order_id == order_id, OrderItem.id.in_(list(quantities))) \
+                .order_by(OrderItem.id) \
+                .with_for_update().populate_existing().all()
+            changed = [item for item in items if quantities[item.id] != item.quantity]
+            if changed:
+                differences = {}
+                for item in changed:
+                    differences[item.product_id] = differences.get(item.product_id, 0) + quantities[item.id] - item.quantity
+                prices = reserve_stock(session, differences)
+                for item in changed:
+                    item.quantity = quantities[item.id]
+                    item.price = prices[item.product_id] * item.quantity
+        if status is not None:
+            session.query(ClientOrder).filter_by(id=order_id).update({"status": status}, synchronize_session=False)
+
+    run_in_transaction(session, work)
@@ -0,0 +1,58 @@
+from PySide6.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QCheckBox, QDateEdit, QDialog
+from PySide6.QtCore import Qt, QDate
+from models import OrderStatus
+
+
+class OrdersReportDialog(QDialog):
+    """Выбор периода и статуса для отчёта по заказам."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Отчёт по заказам")
+        self.setGeometry(200, 200, 400, 150)
+
+        # Основной layout
+        layout = QVBoxLayout()
+
+        # Период
+        period_layout = QHBoxLayout()
+        self.period_check = QCheckBox("Период с", self)
+        self.date_from_input = QDateEdit(QDate.currentDate().addMonths(-1), self)
+        self.date_from_input.setCalendarPopup(True)
+        self.date_to_input = QDateEdit(QDate.currentDate(), self)
+        self.date_to_input.setCalendarPopup(True)
+        self.period_check.toggled.connect(self.date_from_input.setEnabled)
+        self.period_check.toggled.connect(self.date_to_input.setEnabled)
+        self.date_from_input.setEnabled(False)
+        self.date_to_input.setEnabled(False)
+        period_layout.addWidget(self.period_check)
+        period_layout.addWidget(self.date_from_input)
+        period_layout.addWidget(QLabel("по"))
+        period_layout.addWidget(self.date_to_input)
+        layout.addLayout(period_layout)
+
+        # Статус
+        status_layout = QHBoxLayout()
+        self.status_combo = QComboBox(self)
+        self.status_combo.addItem("Все статусы", None)
+        for status in OrderStatus:
+            self.status_combo.addItem(status.value, status)
+        status_layout.addWidget(QLabel("Статус:"))
+        status_layout.addWidget(self.status_combo)
+        layout.addLayout(status_layout)
+
+        # Кнопка формирования
+        self.build_button = QPushButton("Сформировать", self)
+        self.build_button.clicked.connect(self.accept)
+        layout.addWidget(self.build_button, alignment=Qt.AlignCenter)
+
+        self.setLayout(layout)
+
+    def filters(self):
+        """Возвращает фильтры отчёта: date_from, date_to, status (None — без ограничения)."""
+        if self.period_check.isChecked():
+            date_from = self.date_from_input.date().toPython()
+            date_to = self.date_to_input.date().toPython()
+        else:
+            date_from = date_to = None
+        return {"date_from": date_from, "date_to": date_to, "status": self.status_combo.currentData()}
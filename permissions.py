@@ -0,0 +1,30 @@
+# permissions.py
+"""Разрешения пользователя.
+
+Какие действия доступны роли, хранится в таблицах Permission и RolePermission.
+При входе разрешения загружаются один раз (см. auth.authenticate), и экраны
+проверяют их через Permissions.can без обращения к базе.
+"""
+from typing import NamedTuple
+
+# Действия, которые проверяет интерфейс
+MANAGE_USERS = "manage_users"  # Интерфейс администратора
+VIEW_CLIENTS = "view_clients"  # Просмотр клиентов и заказов
+MANAGE_CLIENTS = "manage_clients"  # Создание, редактирование, удаление и импорт клиентов
+CREATE_ORDERS = "create_orders"
+EDIT_ORDER_ITEMS = "edit_order_items"  # Изменение количества в заказе
+EDIT_ORDER_STATUS = "edit_order_status"
+BUILD_REPORTS = "build_reports"  # Отчёты и выгрузка данных
+VIEW_SALES = "view_sales"  # Панель продаж
+
+
+class Permissions(NamedTuple):
+    """Неизменяемый набор разрешённых действий роли пользователя."""
+    role_name: str
+    actions: frozenset = frozenset()
+
+    def can(self, action):
+        return action in self.actions
+
+    def can_any(self, *actions):
+        return any(action in self.actions for action in actions)
@@ -0,0 +1,323 @@
+# projections.py
+"""Плоские представления данных для чтения списков.
+
+Каждая функция строит один запрос с JOIN-ами вместо ленивой загрузки
+связей, а строки результата возвращаются как неизменяемые кортежи.
+"""
+import re
+from datetime import date
+from typing import NamedTuple, Optional
+from sqlalchemy import func, literal, literal_column, or_, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from models import User, Role, UserRole, Client, ClientType, IndividualClient, LegalEntityClient, ClientOrder, OrderItem, OrderStatus, Product, TableVersion, SalesDailyProduct, SalesDailyClient
+
+
+class UserRow(NamedTuple):
+    id: int
+    username: str
+    role_name: Optional[str]
+
+
+# Роли пользователя через запятую в алфавитном порядке; NULL, если ролей нет
+USER_ROLE_NAMES = func.string_agg(Role.name, aggregate_order_by(literal(", "), Role.name))
+
+
+def like_prefix(text):
+    """Шаблон LIKE «начинается с text» с экранированием спецсимволов."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def like_contains(text):
+    """Шаблон LIKE «содержит text» с экранированием спецсимволов."""
+    return "%" + like_prefix(text)
+
+
+def user_list_query(session, search=None):
+    """Запрос пользователей с их ролями, по строке на пользователя; search — начало имени без учёта регистра."""
+    query = session.query(User.id, User.username, USER_ROLE_NAMES.label("role_name")) \
+        .outerjoin(UserRole, UserRole.user_id == User.id) \
+        .outerjoin(Role, Role.id == UserRole.role_id) \
+        .group_by(User.id)
+    if search:
+        # Условие по lower(username) обслуживается индексом ix_User_username_lower
+        query = query.filter(func.lower(User.username).like(like_prefix(search.lower()), escape="\\"))
+    return query
+
+
+class ClientRow(NamedTuple):
+    id: int
+    client_type: ClientType
+    display_name: Optional[str]
+    phone: Optional[str]
+    email: Optional[str]
+    last_name: Optional[str]
+    first_name: Optional[str]
+    middle_name: Optional[str]
+    company_name: Optional[str]
+    inn: Optional[str]
+    ogrn: Optional[str]
+    kpp: Optional[str]
+
+
+# Столбцы в порядке полей ClientRow
+CLIENT_COLUMNS = (
+    Client.id,
+    Client.client_type,
+    Client.display_name,
+    Client.phone,
+    Client.email,
+    IndividualClient.last_name,
+    IndividualClient.first_name,
+    IndividualClient.middle_name,
+    LegalEntityClient.company_name,
+    LegalEntityClient.inn,
+    LegalEntityClient.ogrn,
+    LegalEntityClient.kpp,
+)
+
+
+def prefix_tsquery(text):
+    """Текст запроса tsquery, где каждое слово ищется по началу: 'иван':* & '7701':*; None, если слов нет."""
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    return " & ".join("'" + word.replace("'", "''") + "':*" for word in words)
+
+
+# Более короткий запрос не даёт триграмм и совпадает с большой долей клиентов: индекс не помогает
+CLIENT_SEARCH_MIN_LENGTH = 3
+
+
+def client_list_query(session, client_type=None, search=None):
+    """Запрос списка неудалённых клиентов вместе с данными физлица и юрлица.
+
+    search ищет по ФИО, названию компании, ИНН, ОГРН, телефону и email: по словам
+    (полнотекстовый поиск по Client.search_vector) или по подстроке (pg_trgm по
+    Client.search_text). Найденные клиенты упорядочены по релевантности.
+    search короче CLIENT_SEARCH_MIN_LENGTH символов не применяется.
+    """
+    query = session.query(*CLIENT_COLUMNS) \
+        .outerjoin(IndividualClient, IndividualClient.id == Client.id) \
+        .outerjoin(LegalEntityClient, LegalEntityClient.id == Client.id) \
+        .filter(Client.is_deleted == False)
+    if client_type:
+        query = query.filter(Client.client_type == client_type)
+    search = (search or "").strip().lower()
+    if len(search) >= CLIENT_SEARCH_MIN_LENGTH:
+        substring = Client.search_text.like(like_contains(search), escape="\\")
+        rank = func.similarity(Client.search_text, search)
+        words = prefix_tsquery(search)
+        if words:
+            # Конфигурация словаря — литерал SQL: параметр типа regconfig не выводится при literal_binds
+            tsquery = func.to_tsquery(literal_column("'russian'"), words)
+            query = query.filter(or_(Client.search_vector.op("@@")(tsquery), substring))
+            rank = func.ts_rank(Client.search_vector, tsquery) + rank
+        else:
+            query = query.filter(substring)
+        # Сортировка по столбцу таблицы добавляется после релевантности
+        query = query.order_by(rank.desc())
+    return query
+
+
+def fetch_client_rows(query):
+    """Выполняет запрос из client_list_query и возвращает список ClientRow."""
+    return [ClientRow._make(row) for row in query]
+
+
+class ClientLookupRow(NamedTuple):
+    id: int
+    display_name: Optional[str]
+    inn: Optional[str]
+    phone: Optional[str]
+    email: Optional[str]
+
+
+def client_lookup_query(session):
+    """Запрос данных для поиска клиента: имя, ИНН, телефон и email неудалённых клиентов."""
+    return session.query(Client.id, Client.display_name, LegalEntityClient.inn, Client.phone, Client.email) \
+        .outerjoin(LegalEntityClient, LegalEntityClient.id == Client.id) \
+        .filter(Client.is_deleted == False)
+
+
+def table_version(session, table_name):
+    """Текущая версия данных таблицы — сумма её слотов в TableVersion (0, если изменений ещё не было)."""
+    return int(session.query(func.coalesce(func.sum(TableVersion.version), 0)).filter(TableVersion.table_name == table_name).scalar())
+
+
+class OrderRow(NamedTuple):
+    id: int
+    order_date: Optional[date]
+    status: OrderStatus
+    line_count: int
+    total_quantity: int
+    total_amount: float
+
+
+def order_list_query(session, client_id):
+    """Запрос заказов клиента с количеством позиций, товаров и суммой по каждому заказу."""
+    # Цена позиции хранится как стоимость строки; для старых строк без цены берём цену товара
+    line_amount = func.coalesce(OrderItem.price, Product.price * OrderItem.quantity)
+    return session.query(
+        ClientOrder.id,
+        ClientOrder.order_date,
+        ClientOrder.status,
+        func.count(OrderItem.id),
+        func.coalesce(func.sum(OrderItem.quantity), 0),
+        func.coalesce(func.sum(line_amount), 0),
+    ) \
+        .outerjoin(OrderItem, OrderItem.order_id == ClientOrder.id) \
+        .outerjoin(Product, Product.id == OrderItem.product_id) \
+        .filter(ClientOrder.client_id == client_id) \
+        .group_by(ClientOrder.id) \
+        .order_by(ClientOrder.id)
+
+
+def fetch_order_rows(query):
+    """Выполняет запрос из order_list_query и возвращает список OrderRow."""
+    return [OrderRow._make(row) for row in query]
+
+
+class ProductRow(NamedTuple):
+    id: int
+    name: str
+    price: Optional[float]
+    stock_quantity: Optional[int]
+
+
+def product_search_query(session, search, limit=20):
+    """Запрос товаров, в названии или описании которых есть search; ближайшие по названию — первыми."""
+    # ILIKE '%...%' обслуживается триграммными индексами ix_Product_name_trgm и ix_Product_description_trgm
+    pattern = like_contains(search)
+    return session.query(Product.id, Product.name, Product.price, Product.stock_quantity) \
+        .filter(or_(Product.name.ilike(pattern, escape="\\"), Product.description.ilike(pattern, escape="\\"))) \
+        .order_by(func.similarity(Product.name, search).desc(), Product.name, Product.id) \
+        .limit(limit)
+
+
+def fetch_product_rows(query):
+    """Выполняет запрос из product_search_query и возвращает список ProductRow."""
+    return [ProductRow._make(row) for row in query]
+
+
+class OrderReportRow(NamedTuple):
+    client_id: Optional[int]
+    client_name: Optional[str]
+    order_id: Optional[int]
+    order_date: Optional[date]
+    status: Optional[OrderStatus]
+    item_id: Optional[int]
+    product_name: Optional[str]
+    quantity: int
+    amount: float
+    client_total: bool  # строка с итогом по клиенту
+    grand_total: bool  # строка с общим итогом
+
+
+def order_report_query(session, client_id=None, date_from=None, date_to=None, status=None):
+    """Запрос всех позиций заказов с итогами по клиентам и общим итогом.
+
+    Итоги считает база через GROUPING SETS: после позиций каждого клиента
+    идёт строка с client_total, в конце — строка с grand_total.
+    """
+    line_amount = func.coalesce(OrderItem.price, Product.price * OrderItem.quantity)
+    detail = (Client.id, Client.display_name, ClientOrder.id, ClientOrder.order_date, ClientOrder.status,
+              OrderItem.id, Product.name)
+    client_grouping = func.grouping(Client.id)
+    item_grouping = func.grouping(OrderItem.id)
+    query = session.query(
+        *detail,
+        func.coalesce(func.sum(OrderItem.quantity), 0),
+        func.coalesce(func.sum(line_amount), 0),
+        (item_grouping == 1) & (client_grouping == 0),
+        client_grouping == 1,
+    ) \
+        .select_from(OrderItem) \
+        .join(ClientOrder, ClientOrder.id == OrderItem.order_id) \
+        .join(Client, Client.id == ClientOrder.client_id) \
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+    if client_id is not None:
+        query = query.filter(ClientOrder.client_id == client_id)
+    if date_from is not None:
+        query = query.filter(ClientOrder.order_date >= date_from)
+    if date_to is not None:
+        query = query.filter(ClientOrder.order_date <= date_to)
+    if status is not None:
+        query = query.filter(ClientOrder.status == status)
+    return query \
+        .group_by(func.grouping_sets(tuple_(*detail), tuple_(Client.id, Client.display_name), tuple_())) \
+        .order_by(client_grouping, Client.display_name, Client.id, item_grouping, ClientOrder.order_date,
+                  ClientOrder.id, OrderItem.id)
+
+
+def fetch_order_report_rows(query):
+    """Выполняет запрос из order_report_query и возвращает список OrderReportRow."""
+    return [OrderReportRow._make(row) for row in query]
+
+
+class SalesDayRow(NamedTuple):
+    day: date
+    order_count: int
+    quantity: int
+    amount: float
+
+
+class SalesTopRow(NamedTuple):
+    id: int
+    name: Optional[str]
+    quantity: int
+    amount: float
+
+
+def _sales_period(query, day, date_from, date_to):
+    if date_from is not None:
+        query = query.filter(day >= date_from)
+    if date_to is not None:
+        query = query.filter(day <= date_to)
+    return query
+
+
+def sales_by_day_query(session, date_from=None, date_to=None):
+    """Запрос выручки, числа заказов и проданного количества по дням из дневных итогов."""
+    query = session.query(
+        SalesDailyClient.day,
+        func.sum(SalesDailyClient.order_count),
+        func.sum(SalesDailyClient.quantity),
+        func.sum(SalesDailyClient.amount),
+    )
+    return _sales_period(query, SalesDailyClient.day, date_from, date_to) \
+        .group_by(SalesDailyClient.day) \
+        .order_by(SalesDailyClient.day)
+
+
+def top_products_query(session, date_from=None, date_to=None, limit=10):
+    """Запрос товаров с наибольшей выручкой за период."""
+    amount = func.sum(SalesDailyProduct.amount)
+    query = session.query(SalesDailyProduct.product_id, Product.name, func.sum(SalesDailyProduct.quantity), amount) \
+        .outerjoin(Product, Product.id == SalesDailyProduct.product_id)
+    return _sales_period(query, SalesDailyProduct.day, date_from, date_to) \
+        .group_by(SalesDailyProduct.product_id, Product.name) \
+        .having(amount != 0) \
+        .order_by(amount.desc(), SalesDailyProduct.product_id) \
+        .limit(limit)
+
+
+def top_clients_query(session, date_from=None, date_to=None, limit=10):
+    """Запрос клиентов с наибольшей выручкой за период."""
+    amount = func.sum(SalesDailyClient.amount)
+    query = session.query(SalesDailyClient.client_id, Client.display_name, func.sum(SalesDailyClient.quantity), amount) \
+        .outerjoin(Client, Client.id == SalesDailyClient.client_id)
+    return _sales_period(query, SalesDailyClient.day, date_from, date_to) \
+        .group_by(SalesDailyClient.client_id, Client.display_name) \
+        .having(amount != 0) \
+        .order_by(amount.desc(), SalesDailyClient.client_id) \
+        .limit(limit)
+
+
+def fetch_sales_day_rows(query):
+    """Выполняет запрос из sales_by_day_query и возвращает список SalesDayRow."""
+    return [SalesDayRow._make(row) for row in query]
+
+
+def fetch_sales_top_rows(query):
+    """Выполняет запрос из top_products_query или top_clients_query и возвращает список SalesTopRow."""
+    return [SalesTopRow._make(row) for row in query]
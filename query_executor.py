@@ -0,0 +1,94 @@
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class _ExecutorSignals(QObject):
+    # (задача, успех, результат или текст ошибки)
+    done = Signal(object, bool, object)
+
+
+class QueryTask(QRunnable):
+    """Выполняет функцию запроса в рабочем потоке с собственной сессией."""
+
+    def __init__(self, session_factory, func, key, signals):
+        super().__init__()
+        self.session_factory = session_factory
+        self.func = func
+        self.key = key
+        self.signals = signals
+        self.cancelled = False
+
+    def run(self):
+        if self.cancelled:
+            self.signals.done.emit(self, False, None)
+            return
+        session = self.session_factory()
+        try:
+            result = self.func(session)
+            ok = True
+        except Exception as e:
+            session.rollback()
+            result = str(e)
+            ok = False
+        finally:
+            session.close()
+        self.signals.done.emit(self, ok, result)
+
+
+class QueryExecutor(QObject):
+    """Пул потоков для запросов к базе, чтобы не блокировать цикл событий Qt.
+
+    Функция запроса получает отдельную сессию и должна возвращать простые
+    данные (кортежи, списки), а не ORM-объекты. Результат передаётся в
+    обработчик через сигнал, то есть уже в потоке интерфейса. Новый запрос
+    с тем же ключом отменяет предыдущий: если тот ещё в очереди, он снимается
+    с неё, а результат уже выполняющегося запроса отбрасывается.
+    """
+
+    def __init__(self, session_factory, parent=None, max_threads=4):
+        super().__init__(parent)
+        self.session_factory = session_factory
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._signals = _ExecutorSignals()
+        self._signals.done.connect(self._on_done)
+        self._pending = {}
+        # Ссылки на запущенные задачи держим до их завершения
+        self._running = set()
+
+    def submit(self, key, func, on_result, on_error=None):
+        """Ставит func(session) в очередь под ключом key; on_result получит результат."""
+        self.cancel(key)
+        task = QueryTask(self.session_factory, func, key, self._signals)
+        task.setAutoDelete(False)
+        self._pending[key] = (task, on_result, on_error)
+        self._running.add(task)
+        self.pool.start(task)
+
+    def cancel(self, key):
+        """Отменяет активный запрос с ключом key, если он есть."""
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        task = pending[0]
+        task.cancelled = True
+        if self.pool.tryTake(task):
+            self._running.discard(task)
+
+    def is_pending(self, key):
+        return key in self._pending
+
+    def wait(self, msecs=-1):
+        """Ожидает завершения всех запросов (используется при закрытии окна и в тестах)."""
+        return self.pool.waitForDone(msecs)
+
+    def _on_done(self, task, ok, result):
+        self._running.discard(task)
+        # Результаты отменённых и устаревших запросов игнорируем
+        pending = self._pending.get(task.key)
+        if task.cancelled or pending is None or pending[0] is not task:
+            return
+        _, on_result, on_error = self._pending.pop(task.key)
+        if ok:
+            on_result(result)
+        elif on_error is not None:
+            on_error(result)
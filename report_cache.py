@@ -0,0 +1,147 @@
+# report_cache.py
+"""Кэш готовых PDF-отчётов.
+
+Ключ отчёта — хеш от типа отчёта, его параметров (клиент, фильтры) и версий
+данных, которые отчёт читает. Версии берутся из таблицы TableVersion: их
+увеличивают триггеры при любом изменении клиентов, заказов и товаров
+(миграции 0008 и 0011). Пока данные не менялись, повторный запрос того же
+отчёта копирует сохранённый файл вместо запросов к базе и вёрстки; после
+изменения данных ключ другой, и отчёт формируется заново.
+
+Файлы кэша лежат в одном каталоге. Неиспользуемые дольше срока хранения
+удаляются, а при превышении предельного размера удаляются самые давно
+использованные. Ошибки кэша не мешают формированию отчёта.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from functools import lru_cache
+
+from db import load_report_settings
+from projections import table_version
+
+# Версии данных, от которых зависит каждый отчёт
+REPORT_VERSIONS = {
+    "clients": ("Client",),
+    "orders": ("Client", "Orders", "Product"),
+}
+
+# Увеличивается при изменении вёрстки отчётов, чтобы старые файлы не выдавались
+LAYOUT_VERSION = 2
+
+SUFFIX = ".pdf"
+
+
+class ReportCache:
+    """Каталог готовых отчётов с ограничением по размеру и сроку хранения."""
+
+    def __init__(self, directory, max_bytes, max_age):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age  # секунд
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(database, report_type, params, versions):
+        """Ключ отчёта; database отличает отчёты разных баз с совпадающими версиями."""
+        payload = json.dumps([LAYOUT_VERSION, database, report_type, params, versions], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key, filename):
+        """Копирует отчёт с ключом key в filename; False, если его нет в кэше."""
+        path = self.path(key)
+        try:
+            shutil.copyfile(path, filename)
+            # Время изменения файла служит временем последнего использования
+            os.utime(path)
+        except OSError:
+            return False
+        return True
+
+    def put(self, key, filename):
+        """Сохраняет сформированный отчёт filename под ключом key и освобождает место."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Запись во временный файл и переименование: параллельное чтение не увидит недописанный файл
+            fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+            os.close(fd)
+            try:
+                shutil.copyfile(filename, temp_path)
+                os.replace(temp_path, self.path(key))
+            except OSError:
+                os.unlink(temp_path)
+                raise
+        except OSError:
+            return
+        self.evict()
+
+    def evict(self):
+        """Удаляет отчёты старше срока хранения, затем самые давние, пока кэш больше предела."""
+        try:
+            entries = []
+            with os.scandir(self.directory) as scanner:
+                for entry in scanner:
+                    if entry.is_file() and entry.name.endswith(SUFFIX):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        expired = time.time() - self.max_age
+        for mtime, size, path in entries:
+            if mtime >= expired and total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+
+
+def data_versions(session, report_type):
+    """Текущие версии данных, которые читает отчёт report_type."""
+    return {name: table_version(session, name) for name in REPORT_VERSIONS[report_type]}
+
+
+def cached_report(session, filename, report_type, params, build, progress=None, cache=None):
+    """Записывает в filename отчёт из кэша или формирует его вызовом build(data_version) и сохраняет в кэш.
+
+    params — параметры отчёта (клиент, фильтры); build возвращает имя файла.
+    data_version — строка версий данных для заголовка: отчёт, который может быть
+    выдан из кэша позже, не должен показывать время своего формирования.
+    При отключённом кэше build получает None и печатает обычную дату.
+    """
+    cache = cache if cache is not None else report_cache()
+    if not cache.enabled:
+        return build(None)
+    # Версии читаются до формирования: изменение во время вёрстки даст новый ключ
+    # следующему запросу, а не устаревший файл
+    database = session.get_bind().url.render_as_string(hide_password=True)
+    versions = data_versions(session, report_type)
+    key = cache.make_key(database, report_type, params, versions)
+    if cache.get(key, filename):
+        if progress is not None:
+            progress.summary = "из кэша, данные не менялись"
+        return filename
+    filename = build("-".join(str(versions[name]) for name in REPORT_VERSIONS[report_type]))
+    if filename:
+        cache.put(key, filename)
+    return filename
+
+
+@lru_cache(maxsize=None)
+def report_cache():
+    """Кэш отчётов процесса с настройками из секции [reports]."""
+    settings = load_report_settings()
+    directory = settings["cache_dir"] or os.path.join(tempfile.gettempdir(), "med_report_cache")
+    return ReportCache(directory, settings["cache_max_mb"] * 1024 * 1024, settings["cache_max_age_days"] * 86400)
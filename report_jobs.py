@@ -0,0 +1,171 @@
+import os
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QUrl, Signal
+from PySide6.QtGui import QDesktopServices
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget, QTableWidgetItem, QAbstractItemView
+
+from db import disable_statement_timeout
+from reports import ReportCancelled, ReportProgress
+
+
+class _JobSignals(QObject):
+    progress = Signal(object, int, int)  # (задание, строк, страниц)
+    finished = Signal(object, object)  # (задание, имя файла или None)
+    failed = Signal(object, str)  # (задание, текст ошибки)
+    cancelled = Signal(object)
+
+
+class ReportJob(QRunnable):
+    """Фоновое формирование одного отчёта.
+
+    build(session, progress) выполняется в потоке пула с отдельной сессией
+    и возвращает имя сформированного файла (или None, если файла нет).
+    Транзакция задания выполняется без statement_timeout: отчёты, экспорт и
+    импорт читают таблицы целиком и могут идти дольше интерактивных запросов.
+    """
+
+    def __init__(self, title, session_factory, build, signals, on_finished=None):
+        super().__init__()
+        self.title = title
+        self.session_factory = session_factory
+        self.build = build
+        self.signals = signals
+        self.cancel_requested = False
+        self.on_finished = on_finished
+        self.state = "В очереди"
+        self.filename = None
+        self.summary = None
+        self.done = False
+
+    def cancel(self):
+        self.cancel_requested = True
+
+    def run(self):
+        progress = ReportProgress(
+            on_progress=lambda rows, pages: self.signals.progress.emit(self, rows, pages),
+            is_cancelled=lambda: self.cancel_requested,
+        )
+        session = self.session_factory()
+        try:
+            progress.check()
+            self.signals.progress.emit(self, 0, 0)
+            disable_statement_timeout(session)
+            filename = self.build(session, progress)
+        except ReportCancelled:
+            self.signals.cancelled.emit(self)
+        except Exception as e:
+            self.signals.failed.emit(self, str(e))
+        else:
+            self.summary = progress.summary
+            self.signals.progress.emit(self, progress.rows, progress.pages)
+            self.signals.finished.emit(self, filename)
+        finally:
+            session.close()
+
+
+class ReportJobsPanel(QWidget):
+    """Список фоновых отчётов с ходом выполнения, отменой и открытием готовых файлов."""
+
+    COLUMNS = ["Отчёт", "Состояние", "Строк", "Страниц", "Файл"]
+
+    def __init__(self, session_factory, parent=None, max_threads=2):
+        super().__init__(parent)
+        self.session_factory = session_factory
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self.jobs = []
+        self._signals = _JobSignals()
+        self._signals.progress.connect(self._on_progress)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+        self._signals.cancelled.connect(self._on_cancelled)
+
+        layout = QVBoxLayout()
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.doubleClicked.connect(self.open_selected)
+        layout.addWidget(self.table)
+
+        buttons_layout = QHBoxLayout()
+        self.cancel_button = QPushButton("Отменить")
+        self.cancel_button.clicked.connect(self.cancel_selected)
+        self.open_button = QPushButton("Открыть")
+        self.open_button.clicked.connect(self.open_selected)
+        buttons_layout.addWidget(self.cancel_button)
+        buttons_layout.addWidget(self.open_button)
+        buttons_layout.addStretch()
+        layout.addLayout(buttons_layout)
+        self.setLayout(layout)
+
+    def start(self, title, build, on_finished=None):
+        """Ставит отчёт в очередь и возвращает задание.
+
+        on_finished(job) вызывается в потоке интерфейса после успешного завершения.
+        """
+        job = ReportJob(title, self.session_factory, build, self._signals, on_finished)
+        job.setAutoDelete(False)
+        self.jobs.append(job)
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        self.table.setItem(row, 0, QTableWidgetItem(title))
+        self._update_row(job)
+        self.pool.start(job)
+        return job
+
+    def cancel_selected(self):
+        job = self._selected_job()
+        if job is not None and not job.done:
+            job.cancel()
+            if self.pool.tryTake(job):
+                self._on_cancelled(job)
+            else:
+                job.state = "Отмена…"
+                self._update_row(job)
+
+    def open_selected(self):
+        job = self._selected_job()
+        if job is not None and job.filename:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(os.path.abspath(job.filename)))
+
+    def wait(self, msecs=-1):
+        """Ожидает завершения всех отчётов (используется при закрытии окна и в тестах)."""
+        return self.pool.waitForDone(msecs)
+
+    def _selected_job(self):
+        row = self.table.currentRow()
+        return self.jobs[row] if 0 <= row < len(self.jobs) else None
+
+    def _update_row(self, job, rows=None, pages=None):
+        row = self.jobs.index(job)
+        self.table.setItem(row, 1, QTableWidgetItem(job.state))
+        if rows is not None:
+            self.table.setItem(row, 2, QTableWidgetItem(str(rows)))
+            self.table.setItem(row, 3, QTableWidgetItem(str(pages)))
+        if job.filename:
+            self.table.setItem(row, 4, QTableWidgetItem(job.filename))
+
+    def _on_progress(self, job, rows, pages):
+        if not job.cancel_requested:
+            job.state = "Формируется"
+        self._update_row(job, rows, pages)
+
+    def _on_finished(self, job, filename):
+        job.state = f"Готов: {job.summary}" if job.summary else "Готов"
+        job.filename = filename
+        job.done = True
+        self._update_row(job)
+        if job.on_finished is not None:
+            job.on_finished(job)
+
+    def _on_failed(self, job, error):
+        job.state = f"Ошибка: {error}"
+        job.done = True
+        self._update_row(job)
+
+    def _on_cancelled(self, job):
+        job.state = "Отменён"
+        job.done = True
+        self._update_row(job)
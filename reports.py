@@ -0,0 +1,253 @@
+# reports.py
+"""Формирование PDF-отчётов.
+
+Функции не зависят от Qt и выполняются в фоновом потоке (см. report_jobs.py):
+они получают собственную сессию и объект ReportProgress, через который
+сообщают о ходе работы и проверяют, не отменён ли отчёт.
+"""
+import os
+from datetime import datetime
+from functools import lru_cache
+from itertools import chain
+
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from models import Client
+from projections import OrderReportRow, client_list_query, order_report_query
+
+FONTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts')
+
+# Сколько строк читать из серверного курсора за раз
+STREAM_BATCH = 500
+# Сколько строк данных помещать в одну таблицу; у каждой таблицы свой заголовок
+CHUNK_ROWS = 40
+
+# Стиль таблиц, общий для всех отчётов
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'DejaVuSans'),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+])
+
+
+class ReportCancelled(Exception):
+    """Формирование отчёта отменено пользователем."""
+
+
+class ReportProgress:
+    """Счётчик прочитанных строк и отрисованных страниц с проверкой отмены."""
+
+    # Как часто (в строках) сообщать о прочитанных строках
+    rows_step = 100
+
+    def __init__(self, on_progress=None, is_cancelled=None):
+        self.on_progress = on_progress
+        self.is_cancelled = is_cancelled
+        self.rows = 0
+        self.pages = 0
+        # Краткий итог задания для панели (например, число импортированных строк)
+        self.summary = None
+
+    def check(self):
+        if self.is_cancelled is not None and self.is_cancelled():
+            raise ReportCancelled()
+
+    def row_fetched(self):
+        self.rows_fetched(1)
+
+    def rows_fetched(self, count):
+        step = self.rows // self.rows_step
+        self.rows += count
+        if self.rows // self.rows_step != step:
+            self.check()
+            self._report()
+
+    def page_rendered(self, canvas, doc):
+        """Колбэк onPage для reportlab."""
+        self.pages += 1
+        self.check()
+        self._report()
+
+    def _report(self):
+        if self.on_progress is not None:
+            self.on_progress(self.rows, self.pages)
+
+
+@lru_cache(maxsize=None)
+def report_styles():
+    """Регистрирует шрифты и создаёт стили один раз на процесс."""
+    pdfmetrics.registerFont(TTFont('DejaVuSans', os.path.join(FONTS_DIR, 'DejaVuSans.ttf')))
+    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', os.path.join(FONTS_DIR, 'DejaVuSans-Bold.ttf')))
+    styles = getSampleStyleSheet()
+
+    # Определяем стили с использованием шрифта DejaVuSans
+    styles.add(ParagraphStyle(name='MyTitle', fontName='DejaVuSans-Bold', fontSize=14, leading=16, alignment=1))
+    styles.add(ParagraphStyle(name='MyNormal', fontName='DejaVuSans', fontSize=10, leading=12))
+    styles.add(ParagraphStyle(name='TableCell', fontName='DejaVuSans', fontSize=8, leading=10, alignment=1))
+    styles.add(ParagraphStyle(name='TableCellBold', fontName='DejaVuSans-Bold', fontSize=8, leading=10, alignment=1))
+    return styles
+
+
+class FlowableStream(list):
+    """Список flowables для doc.build, пополняемый из итератора по мере вёрстки.
+
+    reportlab обрабатывает список с головы (len, [0], del [0]), поэтому
+    достаточно дозаполнять его при проверке длины. В памяти одновременно
+    находятся лишь несколько ещё не свёрстанных элементов.
+    """
+
+    def __init__(self, flowables, low_water=4):
+        super().__init__()
+        self._source = iter(flowables)
+        self._low_water = low_water
+
+    def __len__(self):
+        while self._source is not None and super().__len__() < self._low_water:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+        return super().__len__()
+
+
+def _title_elements(title, subtitles=(), data_version=None):
+    """Заголовок отчёта; отчёт из кэша вместо времени формирования показывает версию данных."""
+    styles = report_styles()
+    if data_version is not None:
+        stamp = f"Версия данных: {data_version}"
+    else:
+        stamp = f"Дата формирования: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+    elements = [
+        Paragraph(title, styles['MyTitle']),
+        Paragraph(stamp, styles['MyNormal']),
+        Paragraph("<br/><br/>", styles['MyNormal']),
+    ]
+    elements.extend(Paragraph(subtitle, styles['MyNormal']) for subtitle in subtitles)
+    return elements
+
+
+def table_chunks(header, rows, col_widths, chunk_rows=CHUNK_ROWS):
+    """Разбивает поток строк на таблицы по chunk_rows строк с повторяющимся заголовком."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_rows:
+            yield _chunk_table(header, chunk, col_widths)
+            chunk = []
+    if chunk:
+        yield _chunk_table(header, chunk, col_widths)
+
+
+def _chunk_table(header, rows, col_widths):
+    # repeatRows повторяет заголовок, если таблица переносится на следующую страницу
+    table = Table([header] + rows, colWidths=col_widths, repeatRows=1)
+    table.setStyle(TABLE_STYLE)
+    return table
+
+
+def _build_document(filename, elements, progress):
+    # Сжимаем содержимое страниц: многостраничные отчёты получаются в разы меньше
+    doc = SimpleDocTemplate(filename, pagesize=A4, pageCompression=1)
+    progress.check()
+    doc.build(FlowableStream(elements), onFirstPage=progress.page_rendered, onLaterPages=progress.page_rendered)
+    return filename
+
+
+def build_clients_report(session, filename, progress=None, data_version=None):
+    """Формирует отчёт по клиентам в файл filename.
+
+    data_version — версия данных для заголовка вместо времени формирования (отчёты для кэша).
+    """
+    progress = progress or ReportProgress()
+    cell = report_styles()['TableCell']
+
+    def rows():
+        # Строки читаются из серверного курсора порциями и сразу превращаются в ячейки
+        for client in client_list_query(session).order_by(Client.id).yield_per(STREAM_BATCH):
+            progress.row_fetched()
+            yield [
+                Paragraph(str(client.id), cell),
+                Paragraph(client.client_type.value, cell),
+                Paragraph(client.phone or "", cell),
+                Paragraph(client.email or "", cell),
+                Paragraph(client.inn or "", cell),
+                Paragraph(client.ogrn or "", cell),
+                Paragraph(client.kpp or "", cell)
+            ]
+
+    header = ["ID", "Тип клиента", "Телефон", "Email", "ИНН", "ОГРН", "КПП"]
+    # Указываем ширину столбцов (сумма должна быть около 540 пунктов для A4)
+    col_widths = [40, 80, 80, 120, 80, 80, 50]  # Подобраны экспериментально
+    elements = chain(_title_elements("Отчёт по клиентам", data_version=data_version), table_chunks(header, rows(), col_widths))
+    return _build_document(filename, elements, progress)
+
+
+def build_orders_report(session, filename, client_id=None, date_from=None, date_to=None, status=None, progress=None,
+                        data_version=None):
+    """Формирует отчёт по позициям заказов с итогами по клиентам в файл filename.
+
+    client_id, date_from, date_to и status ограничивают выборку; None — без ограничения.
+    data_version — как в build_clients_report.
+    """
+    progress = progress or ReportProgress()
+    styles = report_styles()
+    cell = styles['TableCell']
+    bold = styles['TableCellBold']
+
+    subtitles = []
+    if client_id is not None:
+        client_display = session.query(Client.display_name).filter_by(id=client_id).scalar()
+        # Отображаем название организации или ФИО в заголовке отчёта
+        subtitles.append(f"Клиент: {client_display or 'Неизвестный клиент'}")
+    else:
+        subtitles.append("Все заказы")
+    if date_from is not None or date_to is not None:
+        subtitles.append(f"Период: {date_from or '…'} — {date_to or '…'}")
+    if status is not None:
+        subtitles.append(f"Статус: {status.value}")
+
+    query = order_report_query(session, client_id, date_from, date_to, status)
+
+    def rows():
+        # Одна выборка: все позиции заказов и итоги, посчитанные в базе через GROUPING SETS
+        for row in query.yield_per(STREAM_BATCH):
+            row = OrderReportRow._make(row)
+            progress.row_fetched()
+            client_name = row.client_name or "Неизвестный клиент"
+            if row.grand_total:
+                yield ["", "", "", Paragraph("Итого по всем клиентам", bold), "",
+                       Paragraph(str(row.quantity), bold), Paragraph(f"{row.amount:.2f}", bold)]
+            elif row.client_total:
+                yield ["", "", "", Paragraph(f"Итого: {client_name}", bold), "",
+                       Paragraph(str(row.quantity), bold), Paragraph(f"{row.amount:.2f}", bold)]
+            else:
+                yield [
+                    Paragraph(str(row.order_id), cell),
+                    Paragraph(str(row.order_date) if row.order_date else "", cell),
+                    Paragraph(row.status.value, cell),
+                    Paragraph(client_name, cell),
+                    Paragraph(row.product_name or "", cell),
+                    Paragraph(str(row.quantity), cell),
+                    Paragraph(f"{row.amount:.2f}", cell)
+                ]
+
+    header = ["ID", "Дата заказа", "Статус", "Клиент", "Товар", "Количество", "Сумма"]
+    # Указываем ширину столбцов (сумма должна быть около 540 пунктов для A4)
+    col_widths = [40, 70, 70, 100, 120, 60, 80]  # Подобраны экспериментально
+    elements = chain(_title_elements("Отчёт по заказам", subtitles, data_version), table_chunks(header, rows(), col_widths))
+    return _build_document(filename, elements, progress)
@@ -0,0 +1,145 @@
+# sales_dashboard.py
+"""Панель продаж: выручка по дням и лучшие товары и клиенты за период.
+
+Данные читаются не из заказов, а из дневных итогов SalesDailyProduct и
+SalesDailyClient, которые триггеры обновляют при каждом изменении позиций
+и заказов (миграция 0010). Поэтому объём чтения зависит от длины периода,
+а не от числа заказов, и панель открывается быстро при любой истории продаж.
+"""
+from datetime import date, timedelta
+
+from PySide6.QtCharts import QChart, QChartView, QDateTimeAxis, QLineSeries, QValueAxis
+from PySide6.QtCore import QDateTime, QTime, Qt
+from PySide6.QtGui import QPainter
+from PySide6.QtWidgets import (QAbstractItemView, QComboBox, QHBoxLayout, QLabel, QMessageBox, QPushButton,
+                               QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget)
+
+from projections import (fetch_sales_day_rows, fetch_sales_top_rows, sales_by_day_query, top_clients_query,
+                         top_products_query)
+
+# Длительность периода в днях; None — вся история
+PERIODS = [("7 дней", 7), ("30 дней", 30), ("90 дней", 90), ("Год", 365), ("Всё время", None)]
+
+# Сколько товаров и клиентов показывать в рейтингах
+TOP_LIMIT = 10
+
+
+def load_sales(session, date_from, date_to, limit=TOP_LIMIT):
+    """Читает данные панели: (итоги по дням, лучшие товары, лучшие клиенты)."""
+    return (
+        fetch_sales_day_rows(sales_by_day_query(session, date_from, date_to)),
+        fetch_sales_top_rows(top_products_query(session, date_from, date_to, limit)),
+        fetch_sales_top_rows(top_clients_query(session, date_from, date_to, limit)),
+    )
+
+
+class SalesDashboard(QWidget):
+    def __init__(self, executor, parent=None):
+        super().__init__(parent)
+        self.executor = executor
+        layout = QVBoxLayout()
+
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(QLabel("Период:"))
+        self.period_combo = QComboBox(self)
+        for name, days in PERIODS:
+            self.period_combo.addItem(name, days)
+        self.period_combo.setCurrentIndex(1)
+        self.period_combo.currentIndexChanged.connect(self.reload)
+        controls_layout.addWidget(self.period_combo)
+        self.refresh_button = QPushButton("Обновить", self)
+        self.refresh_button.clicked.connect(self.reload)
+        controls_layout.addWidget(self.refresh_button)
+        controls_layout.addStretch()
+        self.summary_label = QLabel(self)
+        controls_layout.addWidget(self.summary_label)
+        layout.addLayout(controls_layout)
+
+        # Выручка по дням
+        self.chart = QChart()
+        self.chart.setTitle("Выручка по дням")
+        self.chart.legend().hide()
+        self.chart_view = QChartView(self.chart, self)
+        self.chart_view.setRenderHint(QPainter.Antialiasing)
+        layout.addWidget(self.chart_view, stretch=2)
+
+        # Рейтинги товаров и клиентов
+        tops_layout = QHBoxLayout()
+        self.products_table = self._create_top_table("Товар")
+        self.clients_table = self._create_top_table("Клиент")
+        tops_layout.addWidget(self.products_table)
+        tops_layout.addWidget(self.clients_table)
+        layout.addLayout(tops_layout, stretch=1)
+
+        self.setLayout(layout)
+
+    def _create_top_table(self, title):
+        table = QTableWidget(0, 3, self)
+        table.setHorizontalHeaderLabels([title, "Количество", "Выручка"])
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.horizontalHeader().setStretchLastSection(True)
+        return table
+
+    def period(self):
+        """Возвращает (date_from, date_to) выбранного периода; date_from None — вся история."""
+        days = self.period_combo.currentData()
+        today = date.today()
+        return (today - timedelta(days=days - 1) if days else None), today
+
+    def reload(self):
+        """Перечитывает данные панели в фоне; незавершённая загрузка отменяется."""
+        date_from, date_to = self.period()
+        self.executor.submit(
+            "sales",
+            lambda session: load_sales(session, date_from, date_to),
+            lambda result: self.show_sales(*result, date_from=date_from, date_to=date_to),
+            self._on_load_failed,
+        )
+
+    def show_sales(self, days, products, clients, date_from=None, date_to=None):
+        """Отображает итоги по дням и рейтинги."""
+        revenue = sum(row.amount for row in days)
+        orders = sum(row.order_count for row in days)
+        self.summary_label.setText(f"Выручка: {revenue:.2f} руб.   Заказов: {orders}")
+        self._show_chart(days, date_from, date_to)
+        self._fill_top_table(self.products_table, products)
+        self._fill_top_table(self.clients_table, clients)
+
+    def _show_chart(self, days, date_from, date_to):
+        self.chart.removeAllSeries()
+        for axis in self.chart.axes():
+            self.chart.removeAxis(axis)
+        series = QLineSeries()
+        amounts = {row.day: row.amount for row in days}
+        # Дни без продаж отмечаются нулём, чтобы линия не соединяла соседние продажи напрямую
+        first = date_from or (days[0].day if days else date_to)
+        day = first
+        while day <= date_to:
+            moment = QDateTime(day, QTime(0, 0))
+            series.append(moment.toMSecsSinceEpoch(), amounts.get(day, 0))
+            day += timedelta(days=1)
+        self.chart.addSeries(series)
+
+        date_axis = QDateTimeAxis()
+        date_axis.setFormat("dd.MM.yyyy")
+        date_axis.setTickCount(min(max(series.count(), 2), 8))
+        self.chart.addAxis(date_axis, Qt.AlignBottom)
+        series.attachAxis(date_axis)
+        amount_axis = QValueAxis()
+        amount_axis.setLabelFormat("%.0f")
+        amount_axis.setMin(0)
+        amount_axis.setMax(max(amounts.values(), default=0) or 1)
+        amount_axis.applyNiceNumbers()
+        self.chart.addAxis(amount_axis, Qt.AlignLeft)
+        series.attachAxis(amount_axis)
+
+    def _fill_top_table(self, table, rows):
+        table.setRowCount(len(rows))
+        for row, item in enumerate(rows):
+            table.setItem(row, 0, QTableWidgetItem(item.name or f"ID {item.id}"))
+            table.setItem(row, 1, QTableWidgetItem(str(item.quantity)))
+            table.setItem(row, 2, QTableWidgetItem(f"{item.amount:.2f}"))
+
+    def _on_load_failed(self, error):
+        QMessageBox.critical(self, "Ошибка", f"Ошибка при загрузке данных: {error}")
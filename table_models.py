@@ -0,0 +1,330 @@
+import enum
+from bisect import bisect_left
+from functools import cmp_to_key
+from itertools import count
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
+from sqlalchemy import Boolean, Date, DateTime, Enum, Integer, Numeric, asc, desc
+from models import User, Client, LegalEntityClient
+from projections import CLIENT_SEARCH_MIN_LENGTH, USER_ROLE_NAMES, UserRow, ClientRow, user_list_query, client_list_query
+
+# Типы столбцов, которые Python упорядочивает так же, как PostgreSQL. Строки база
+# сравнивает по правилам сортировки (collation), поэтому позицию строки по ним не вычислить
+ORDERABLE_TYPES = (Integer, Numeric, Boolean, Date, DateTime, Enum)
+
+
+class PagedTableModel(QAbstractTableModel):
+    """Табличная модель, подгружающая строки из базы страницами по мере прокрутки.
+
+    Наследники задают заголовки, поля строк, выражения для сортировки и метод
+    query(), возвращающий запрос без LIMIT/OFFSET. В памяти хранятся только
+    кортежи уже показанных строк, первое поле — идентификатор записи.
+
+    Если передан QueryExecutor, страницы читаются в фоновом потоке, а на время
+    загрузки модель испускает loading_changed(True).
+
+    После изменения отдельных записей достаточно вызвать refresh_rows(ids):
+    перечитываются только эти записи, остальные строки и прокрутка сохраняются.
+    Строки ищутся по словарю ID и двоичным поиском по ключу сортировки; если
+    порядок строк в Python не совпадает с порядком базы, модель перечитывается.
+    """
+
+    loading_changed = Signal(bool)
+    load_failed = Signal(str)
+
+    page_size = 200
+    headers = []
+    fields = []
+    sort_columns = []
+
+    def __init__(self, session, parent=None, executor=None):
+        # abc.ABCMeta несовместим с метаклассом Qt, поэтому обязательность query() проверяется здесь
+        if type(self).query is PagedTableModel.query:
+            raise TypeError(f"{type(self).__name__} должен переопределить query()")
+        super().__init__(parent)
+        self.session = session
+        self.executor = executor
+        self._rows = []
+        # Загруженные строки по ID
+        self._rows_by_id = {}
+        self._exhausted = False
+        self._loading = False
+        self._sort_column = 0
+        self._sort_order = Qt.AscendingOrder
+        self._fetch_key = f"{type(self).__name__}:{id(self)}"
+        # Номер поколения строк: результаты запросов, начатых до reload, отбрасываются
+        self._generation = 0
+        self._refresh_keys = count()
+
+    def query(self, session):
+        """Возвращает запрос строк модели в указанной сессии; обязательно переопределяется наследником."""
+
+    def make_row(self, row):
+        """Преобразует строку результата запроса в хранимую строку модели."""
+        return row
+
+    def format_value(self, column, value):
+        """Преобразует значение из базы в текст ячейки."""
+        if value is None:
+            return ""
+        if hasattr(value, "value"):
+            return value.value
+        return str(value)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        column = index.column()
+        return self.format_value(column, getattr(self._rows[index.row()], self.fields[column]))
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or self._loading:
+            return
+        load_page = self._page_loader(len(self._rows), self.page_size)
+        if self.executor is None:
+            self._append_page(load_page(self.session))
+            return
+        self._set_loading(True)
+        self.executor.submit(self._fetch_key, load_page, self._append_page, self._on_fetch_failed)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Сортировка выполняется на стороне базы, модель перечитывается с начала."""
+        if column < 0 or column >= len(self.sort_columns):
+            return
+        self._sort_column = column
+        self._sort_order = order
+        self.reload()
+
+    def reload(self):
+        """Сбрасывает загруженные строки; первая страница подгрузится представлением."""
+        if self.executor is not None:
+            self.executor.cancel(self._fetch_key)
+        self._generation += 1
+        self.beginResetModel()
+        self._rows = []
+        self._rows_by_id = {}
+        self._exhausted = False
+        self.endResetModel()
+        self._set_loading(False)
+
+    def refresh_rows(self, ids):
+        """Перечитывает записи с указанными ID и обновляет только их строки.
+
+        Изменённая запись заменяется на месте, удалённая или больше не проходящая
+        фильтр убирается, новая вставляется в позицию по текущей сортировке.
+        """
+        ids = list(ids)
+        if not ids:
+            return
+        if not self._can_refresh_in_place():
+            self.reload()
+            return
+        key_column = self.sort_columns[0]
+        generation = self._generation
+
+        def load_rows(session):
+            return [self.make_row(row) for row in self.query(session).filter(key_column.in_(ids))]
+
+        def apply(rows):
+            if generation == self._generation:
+                self._apply_rows(ids, rows)
+
+        if self.executor is None:
+            apply(load_rows(self.session))
+        else:
+            self.executor.submit(f"{self._fetch_key}:refresh:{next(self._refresh_keys)}", load_rows, apply,
+                                 self.load_failed.emit)
+
+    def sorted_by_columns(self):
+        """Упорядочен ли запрос только по столбцам sort_columns (без сортировки по релевантности)."""
+        return True
+
+    def _can_refresh_in_place(self):
+        column_type = self.sort_columns[self._sort_column].type
+        return self.sorted_by_columns() and isinstance(column_type, ORDERABLE_TYPES)
+
+    def row_data(self, row):
+        """Возвращает загруженную строку модели или None."""
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        return None
+
+    def row_id(self, row):
+        """Возвращает идентификатор записи в строке или None."""
+        if 0 <= row < len(self._rows):
+            return self._rows[row][0]
+        return None
+
+    def _page_loader(self, offset, limit):
+        """Возвращает функцию, читающую страницу с текущими сортировкой и фильтрами."""
+        direction = asc if self._sort_order == Qt.AscendingOrder else desc
+        order_by = [direction(self.sort_columns[self._sort_column])]
+        # Добавляем первичный ключ, чтобы страницы не перекрывались при равных значениях
+        if self._sort_column != 0:
+            order_by.append(self.sort_columns[0])
+
+        def load_page(session):
+            return [self.make_row(row) for row in self.query(session).order_by(*order_by).offset(offset).limit(limit)]
+        return load_page
+
+    def _apply_rows(self, ids, rows):
+        fresh = {row[0]: row for row in rows}
+        for row_id in ids:
+            position = self._find_row(row_id)
+            row = fresh.get(row_id)
+            if position is not None and row is not None and self._sort_key(row) == self._sort_key(self._rows[position]):
+                # Положение в сортировке не изменилось — обновляем ячейки на месте
+                self._rows[position] = row
+                self._rows_by_id[row_id] = row
+                self.dataChanged.emit(self.index(position, 0), self.index(position, len(self.headers) - 1))
+                continue
+            if position is not None:
+                self.beginRemoveRows(QModelIndex(), position, position)
+                del self._rows[position]
+                del self._rows_by_id[row_id]
+                self.endRemoveRows()
+            if row is not None:
+                position = self._insert_position(row)
+                # Строку за пределами загруженных страниц добавит следующая подгрузка
+                if position < len(self._rows) or self._exhausted:
+                    self.beginInsertRows(QModelIndex(), position, position)
+                    self._rows.insert(position, row)
+                    self._rows_by_id[row_id] = row
+                    self.endInsertRows()
+
+    def _find_row(self, row_id):
+        row = self._rows_by_id.get(row_id)
+        if row is None:
+            return None
+        return self._insert_position(row)
+
+    def _sort_key(self, row):
+        value = getattr(row, self.fields[self._sort_column])
+        if isinstance(value, enum.Enum):
+            # Перечисления в PostgreSQL сортируются в порядке объявления
+            value = list(type(value)).index(value)
+        return value
+
+    def _compare(self, row, other):
+        """Сравнение строк в порядке ORDER BY из _page_loader: -1, если row идёт раньше other."""
+        key, other_key = self._sort_key(row), self._sort_key(other)
+        if key == other_key:
+            return (row[0] > other[0]) - (row[0] < other[0])
+        # NULL в PostgreSQL больше любого значения
+        if key is None or other_key is None:
+            less = other_key is None
+        else:
+            less = key < other_key
+        if self._sort_order != Qt.AscendingOrder:
+            less = not less
+        return -1 if less else 1
+
+    def _insert_position(self, row):
+        """Позиция строки в загруженных строках; они уже упорядочены так же, как в базе."""
+        order_key = cmp_to_key(self._compare)
+        return bisect_left(self._rows, order_key(row), key=order_key)
+
+    def _append_page(self, rows):
+        self._set_loading(False)
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+        self._rows.extend(rows)
+        self._rows_by_id.update((row[0], row) for row in rows)
+        self.endInsertRows()
+
+    def _on_fetch_failed(self, error):
+        self._set_loading(False)
+        self._exhausted = True
+        self.load_failed.emit(error)
+
+    def _set_loading(self, loading):
+        if self._loading != loading:
+            self._loading = loading
+            self.loading_changed.emit(loading)
+
+
+class ClientTableModel(PagedTableModel):
+    """Модель списка клиентов для страницы "Клиенты"."""
+
+    headers = ["ID", "Тип клиента", "Клиент", "Телефон", "Email", "ИНН", "ОГРН", "КПП"]
+    fields = ["id", "client_type", "display_name", "phone", "email", "inn", "ogrn", "kpp"]
+    sort_columns = [
+        Client.id,
+        Client.client_type,
+        Client.display_name,
+        Client.phone,
+        Client.email,
+        LegalEntityClient.inn,
+        LegalEntityClient.ogrn,
+        LegalEntityClient.kpp,
+    ]
+
+    def __init__(self, session, parent=None, executor=None):
+        super().__init__(session, parent, executor)
+        self.client_type = None
+        self.search = ""
+
+    def set_client_type(self, client_type):
+        """Устанавливает фильтр по типу клиента (None — все клиенты)."""
+        self.client_type = client_type
+        self.reload()
+
+    def set_search(self, search):
+        """Устанавливает поисковый запрос (пустая строка — без поиска); найденные идут по релевантности."""
+        self.search = search
+        self.reload()
+
+    def query(self, session):
+        return client_list_query(session, self.client_type, self.search)
+
+    def sorted_by_columns(self):
+        # Найденные клиенты упорядочены по релевантности, которую в Python не вычислить
+        return len(self.search.strip()) < CLIENT_SEARCH_MIN_LENGTH
+
+    def make_row(self, row):
+        return ClientRow._make(row)
+
+
+class UserTableModel(PagedTableModel):
+    """Модель списка пользователей для окна администратора."""
+
+    headers = ["ID", "Имя пользователя", "Роль"]
+    fields = ["id", "username", "role_name"]
+    sort_columns = [User.id, User.username, USER_ROLE_NAMES]
+
+    def __init__(self, session, parent=None, executor=None):
+        super().__init__(session, parent, executor)
+        self.search = ""
+
+    def set_search(self, search):
+        """Устанавливает фильтр по началу имени пользователя (пустая строка — все)."""
+        self.search = search
+        self.reload()
+
+    def query(self, session):
+        return user_list_query(session, self.search)
+
+    def make_row(self, row):
+        return UserRow._make(row)
+
+    def format_value(self, column, value):
+        if self.fields[column] == "role_name" and value is None:
+            return "Не указана"
+        return super().format_value(column, value)
@@ -2,14 +2,43 @@
 import unittest
 from unittest.mock import patch
 import psycopg2
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.orm import Session, sessionmaker
 from login_window import LoginWindow
 from admin_window import AdminWindow, CreateUserDialog
 from user_window import UserWindow, CreateClientDialog, CreateOrderDialog
-from models import Base, User, Role, UserRole, Client, ClientType, IndividualClient, Product, ClientOrder, OrderItem, OrderStatus
-from datetime import datetime
-from PySide6.QtWidgets import QApplication
+from models import User, Role, UserRole, Permission, RolePermission, Client, ClientType, IndividualClient, LegalEntityClient, Product, ClientOrder, OrderItem, OrderStatus, SalesDailyProduct, SalesDailyClient
+from client_import import import_clients
+from export import export_dataset
+from bootstrap import bootstrap
+from auth import authenticate
+from permissions import Permissions, MANAGE_USERS, VIEW_CLIENTS, CREATE_ORDERS, EDIT_ORDER_ITEMS, BUILD_REPORTS
+from projections import client_list_query, client_lookup_query, order_list_query, order_report_query, fetch_order_report_rows, user_list_query, product_search_query, fetch_product_rows, sales_by_day_query, fetch_sales_day_rows, table_version
+from table_models import PagedTableModel, ClientTableModel
+from query_executor import QueryExecutor
+from loading_overlay import LoadingOverlay
+from db import load_settings, get_engine, dispose_engine
+from live_updates import ChangeListener
+from client_lookup import ClientLookupIndex
+from client_writes import create_client, update_client, DuplicateEmail
+from orders import create_order, update_order, InsufficientStock
+from sales_dashboard import load_sales
+from reports import build_clients_report, build_orders_report, ReportProgress
+from report_cache import ReportCache, cached_report
+from report_jobs import ReportJobsPanel
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
+import csv
+import os
+import tempfile
+import time
+from PySide6.QtWidgets import QApplication, QTableView
+from PySide6.QtCore import Qt
+
+# Разрешения ролей, с которыми открываются окна в тестах
+ADMINISTRATOR = Permissions("Administrator", frozenset({MANAGE_USERS}))
+SALES_MANAGER = Permissions("Sales Manager", frozenset({VIEW_CLIENTS, CREATE_ORDERS, EDIT_ORDER_ITEMS}))
+ACCOUNTANT = Permissions("Accountant", frozenset({VIEW_CLIENTS, BUILD_REPORTS}))
 
 class TestApp(unittest.TestCase):
     @classmethod
@@ -40,7 +69,8 @@ class TestApp(unittest.TestCase):
         cls.engine = create_engine(
             f"postgresql+psycopg2://{cls.db_user}:{cls.db_password}@{cls.db_host}:{cls.db_port}/{cls.db_name}"
         )
-        Base.metadata.create_all(cls.engine)
+        # Схема создаётся теми же миграциями, что и в рабочей базе
+        bootstrap(cls.engine)
         cls.session = Session(cls.engine)
 
     @classmethod
@@ -69,8 +99,11 @@ class TestApp(unittest.TestCase):
         # Очищаем таблицы в правильном порядке, учитывая зависимости внешних ключей
         self.session.query(OrderItem).delete()
         self.session.query(ClientOrder).delete()
+        self.session.query(SalesDailyProduct).delete()
+        self.session.query(SalesDailyClient).delete()
         self.session.query(UserRole).delete()
         self.session.query(IndividualClient).delete()
+        self.session.query(LegalEntityClient).delete()
         self.session.query(Client).delete()
         self.session.query(Product).delete()
         self.session.query(User).delete()
@@ -81,6 +114,10 @@ class TestApp(unittest.TestCase):
         admin_role = Role(id=1, name="Administrator")
         user_role = Role(id=2, name="Sales Manager")
         self.session.add_all([admin_role, user_role])
+        # Таблица Permission заполнена миграцией, права ролей удаляются вместе с ролями
+        self.session.flush()
+        self.grant(admin_role, ADMINISTRATOR)
+        self.grant(user_role, SALES_MANAGER)
 
         admin_user = User(id=1, username="admin", password_hash=User.hash_password("admin123"))
         admin_user_role = UserRole(user_id=1, role_id=1)
@@ -97,29 +134,75 @@ class TestApp(unittest.TestCase):
         individual = IndividualClient(id=1, first_name="Иван", last_name="Петров", middle_name="Сергеевич")
         self.session.add_all([client, individual])
 
+        # Записи выше добавлены с явными ID: сдвигаем последовательности, чтобы новые строки их не повторяли
+        self.session.flush()
+        for table in ("Role", "User", "Product", "Client"):
+            self.session.execute(text(f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), (SELECT max(id) FROM \"{table}\"))"))
+
         self.session.commit()
 
+    def open_user_window(self, permissions):
+        """Окно пользователя без подписки LISTEN; закрывается после теста, освобождая соединения."""
+        window = UserWindow(self.session, user=None, permissions=permissions, live_updates=False)
+        self.addCleanup(window.close)
+        return window
+
+    def grant(self, role, permissions):
+        for permission in self.session.query(Permission).filter(Permission.name.in_(permissions.actions)):
+            self.session.add(RolePermission(role_id=role.id, permission_id=permission.id))
+
     def test_login_success(self):
         """Тест успешной авторизации (TC-001)"""
-        login_window = LoginWindow()
+        login_window = LoginWindow(sessionmaker(bind=self.engine))
         with patch.object(login_window, 'username_input', create=True) as mock_username, \
              patch.object(login_window, 'password_input', create=True) as mock_password, \
              patch.object(login_window, 'close', create=True) as mock_close:
             mock_username.text.return_value = "admin"
             mock_password.text.return_value = "admin123"
             login_window.login()
+            # Пароль проверяется в фоне, дожидаемся задачи и доставки сигнала
+            login_window.executor.wait()
+            QApplication.processEvents()
             self.assertTrue(hasattr(login_window, 'admin_window'))
             mock_close.assert_called_once()
+            # Окно администратора держит свою сессию: без закрытия соединение мешает удалить базу
+            self.addCleanup(login_window.admin_window.session.close)
+            self.addCleanup(login_window.admin_window.close)
+
+    def test_login_rehashes_weak_password_hash(self):
+        """Хеш с меньшей стоимостью bcrypt пересчитывается при входе"""
+        admin = self.session.get(User, 1)
+        admin.password_hash = User.hash_password("admin123", rounds=4)
+        self.session.commit()
+        self.assertTrue(admin.needs_rehash())
+        with Session(self.engine) as session:
+            user_id, permissions = authenticate(session, "admin", "admin123")
+        self.assertEqual(user_id, 1)
+        self.assertEqual(permissions, ADMINISTRATOR)
+        self.session.refresh(admin)
+        self.assertFalse(admin.needs_rehash())
+        self.assertTrue(admin.check_password("admin123"))
+
+    def test_authenticate_with_several_roles(self):
+        """Пользователь с несколькими ролями получает разрешения всех ролей и их названия"""
+        self.session.add(UserRole(user_id=2, role_id=1))
+        self.session.commit()
+        with Session(self.engine) as session:
+            user_id, permissions = authenticate(session, "sales", "sales123")
+        self.assertEqual(user_id, 2)
+        self.assertEqual(permissions.role_name, "Administrator, Sales Manager")
+        self.assertEqual(permissions.actions, ADMINISTRATOR.actions | SALES_MANAGER.actions)
 
     def test_create_user(self):
         """Тест создания нового пользователя (TC-003)"""
-        admin_window = AdminWindow(self.session, user=None, role="admin")
+        admin_window = AdminWindow(self.session, user=None, permissions=ADMINISTRATOR)
+        self.addCleanup(admin_window.close)
         dialog = CreateUserDialog(self.session, parent=admin_window)
         with patch.object(dialog, 'username_input', create=True) as mock_username, \
              patch.object(dialog, 'password_input', create=True) as mock_password, \
              patch.object(dialog, 'role_combo', create=True) as mock_role_combo, \
              patch.object(dialog, 'accept', create=True) as mock_accept, \
-             patch('admin_window.QMessageBox') as mock_msgbox:
+             patch('create_user_dialog.QMessageBox') as mock_msgbox:
             mock_username.text.return_value = "newuser"
             mock_password.text.return_value = "newpass123"
             mock_role_combo.currentText.return_value = "Sales Manager"
@@ -129,10 +212,11 @@ class TestApp(unittest.TestCase):
             user = self.session.query(User).filter_by(username="newuser").first()
             self.assertIsNotNone(user)
             self.assertTrue(user.check_password("newpass123"))
+            self.assertEqual(dialog.changed_ids, [user.id])
 
     def test_create_individual_client(self):
         """Тест создания клиента-физлица (TC-004)"""
-        user_window = UserWindow(self.session, user=None, role="sales_manager")
+        user_window = self.open_user_window(SALES_MANAGER)
         dialog = CreateClientDialog(self.session, parent=user_window)
         with patch.object(dialog, 'client_type_combo', create=True) as mock_type, \
              patch.object(dialog, 'phone_input', create=True) as mock_phone, \
@@ -141,7 +225,7 @@ class TestApp(unittest.TestCase):
              patch.object(dialog, 'last_name_input', create=True) as mock_last, \
              patch.object(dialog, 'middle_name_input', create=True) as mock_middle, \
              patch.object(dialog, 'accept', create=True) as mock_accept, \
-             patch('user_window.QMessageBox') as mock_msgbox:
+             patch('create_client_dialog.QMessageBox') as mock_msgbox:
             mock_type.currentText.return_value = "individual"
             mock_phone.text.return_value = "+79991234568"
             mock_email.text.return_value = "new.client@example.com"
@@ -158,19 +242,42 @@ class TestApp(unittest.TestCase):
             self.assertEqual(client.client_type, ClientType.individual)
             individual = self.session.query(IndividualClient).filter_by(id=client.id).first()
             self.assertEqual(individual.first_name, "Алексей")
+            self.assertEqual(dialog.changed_ids, [client.id])
+
+    def test_client_writes(self):
+        """Клиент пишется одним запросом, повтор email отклоняется ограничением базы"""
+        client_id = create_client(self.session, ClientType.legal_entity, None, "info@honey.ru",
+                                  company_name="ООО Пасека", inn="7701234567")
+        client = self.session.get(Client, client_id)
+        self.assertEqual(client.display_name, "ООО Пасека")
+        self.assertEqual(self.session.get(LegalEntityClient, client_id).inn, "7701234567")
+
+        with self.assertRaises(DuplicateEmail):
+            create_client(self.session, ClientType.individual, None, "ivan.petrov@example.com",
+                          first_name="Пётр", last_name="Иванов")
+        self.assertFalse(self.session.new)
+        self.assertEqual(self.session.query(Client).count(), 2)
+
+        with self.assertRaises(DuplicateEmail):
+            update_client(self.session, client_id, ClientType.legal_entity, None, "ivan.petrov@example.com",
+                          company_name="ООО Пасека", inn="7701234567")
+        update_client(self.session, 1, ClientType.individual, "+79990000000", "ivan.petrov@example.com",
+                      first_name="Иван", last_name="Петров")
+        self.session.expire_all()
+        self.assertEqual(self.session.get(Client, 1).display_name, "Петров Иван")
+        self.assertIsNone(self.session.get(IndividualClient, 1).middle_name)
 
     def test_create_order(self):
         """Тест создания заказа (TC-005)"""
-        user_window = UserWindow(self.session, user=None, role="sales_manager")
+        user_window = self.open_user_window(SALES_MANAGER)
         dialog = CreateOrderDialog(self.session, parent=user_window)
-        with patch.object(dialog, 'client_combo', create=True) as mock_client, \
-             patch.object(dialog, 'product_combo', create=True) as mock_product, \
-             patch.object(dialog, 'quantity_input', create=True) as mock_quantity, \
+        with patch.object(dialog, 'quantity_input', create=True) as mock_quantity, \
              patch.object(dialog, 'accept', create=True) as mock_accept, \
-             patch('user_window.QMessageBox') as mock_msgbox:
-            mock_client.currentData.return_value = 1
-            mock_product.currentData.return_value = 1
+             patch('create_order_dialog.QMessageBox') as mock_msgbox:
+            dialog.select_client(1, "Петров Иван Сергеевич")
+            dialog.select_product(1, "Мёд липовый")
             mock_quantity.text.return_value = "5"
+            dialog.add_line()
             dialog.create_order()
             if mock_msgbox.critical.called:
                 print("QMessageBox.critical was called with:", mock_msgbox.critical.call_args)
@@ -178,24 +285,643 @@ class TestApp(unittest.TestCase):
             mock_accept.assert_called_once()
             order = self.session.query(ClientOrder).filter_by(client_id=1).first()
             self.assertIsNotNone(order)
+            self.assertEqual(dialog.changed_ids, [order.id])
             order_item = self.session.query(OrderItem).filter_by(order_id=order.id).first()
             self.assertEqual(order_item.quantity, 5)
             self.assertEqual(order_item.price, 2500.0)
             product = self.session.query(Product).filter_by(id=1).first()
             self.assertEqual(product.stock_quantity, 95)
 
+    def test_concurrent_orders_do_not_oversell(self):
+        """Параллельные заказы не списывают больше товара, чем есть на складе"""
+        def place_order(_):
+            session = Session(self.engine)
+            try:
+                create_order(session, 1, [(1, 1)])
+                return True
+            except InsufficientStock:
+                return False
+            finally:
+                session.close()
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            results = list(pool.map(place_order, range(300)))
+
+        self.session.expire_all()
+        self.assertEqual(results.count(True), 100)
+        self.assertEqual(self.session.get(Product, 1).stock_quantity, 0)
+        self.assertEqual(self.session.query(func.sum(OrderItem.quantity)).scalar(), 100)
+
+    def test_create_order_with_several_lines(self):
+        """Заказ из нескольких товаров создаётся целиком или не создаётся совсем"""
+        self.session.add(Product(id=2, name="Мёд гречишный", price=600.0, stock_quantity=3))
+        self.session.commit()
+
+        order_id = create_order(self.session, 1, [(1, 2), (2, 1), (1, 3)])
+        items = {item.product_id: item for item in self.session.query(OrderItem).filter_by(order_id=order_id)}
+        self.assertEqual({product_id: item.quantity for product_id, item in items.items()}, {1: 5, 2: 1})
+        self.assertEqual(items[2].price, 600.0)
+
+        with self.assertRaises(InsufficientStock) as error:
+            create_order(self.session, 1, [(1, 1), (2, 5)])
+        self.assertEqual(error.exception.product_id, 2)
+        self.session.expire_all()
+        self.assertEqual(self.session.get(Product, 1).stock_quantity, 95)
+        self.assertEqual(self.session.get(Product, 2).stock_quantity, 2)
+        self.assertEqual(self.session.query(ClientOrder).count(), 1)
+
+    def test_update_order_quantity(self):
+        """Изменение количества в позициях заказа возвращает или списывает разницу только по ним"""
+        self.session.add(Product(id=2, name="Прополис", price=200.0, stock_quantity=50))
+        self.session.commit()
+        order_id = create_order(self.session, 1, [(1, 10), (2, 5)])
+        items = {item.product_id: item.id for item in self.session.query(OrderItem).filter_by(order_id=order_id)}
+
+        update_order(self.session, order_id, quantities={items[2]: 8})
+        self.session.expire_all()
+        self.assertEqual(self.session.get(Product, 1).stock_quantity, 90)
+        self.assertEqual(self.session.get(Product, 2).stock_quantity, 42)
+
+        with self.assertRaises(InsufficientStock):
+            update_order(self.session, order_id, quantities={items[1]: 4, items[2]: 200})
+        self.session.expire_all()
+        self.assertEqual(self.session.get(Product, 1).stock_quantity, 90)
+
+        update_order(self.session, order_id, quantities={items[1]: 4, items[2]: 8})
+        self.session.expire_all()
+        self.assertEqual(self.session.get(Product, 1).stock_quantity, 96)
+        self.assertEqual(self.session.get(OrderItem, items[1]).quantity, 4)
+        self.assertEqual(self.session.get(OrderItem, items[1]).price, 2000.0)
+        self.assertEqual(self.session.get(OrderItem, items[2]).quantity, 8)
+
+    def test_sales_rollups(self):
+        """Дневные итоги продаж следуют за созданием, изменением и удалением заказов"""
+        self.session.add(Product(id=2, name="Прополис", price=200.0, stock_quantity=50))
+        self.session.commit()
+        today = date.today()
+        create_order(self.session, 1, [(1, 3), (2, 2)])
+        order_id = create_order(self.session, 1, [(1, 10)])
+        item_id = self.session.query(OrderItem.id).filter_by(order_id=order_id).scalar()
+        update_order(self.session, order_id, quantities={item_id: 4})
+
+        days, products, clients = load_sales(self.session, today - timedelta(days=6), today)
+        self.assertEqual(days, fetch_sales_day_rows(sales_by_day_query(self.session, today, today)))
+        self.assertEqual([(row.order_count, row.quantity, row.amount) for row in days], [(2, 9, 3900.0)])
+        self.assertEqual([(row.id, row.quantity, row.amount) for row in products], [(1, 7, 3500.0), (2, 2, 400.0)])
+        self.assertEqual([(row.id, row.amount) for row in clients], [(1, 3900.0)])
+
+        # Перенос заказа на другой день переносит и его продажи
+        yesterday = today - timedelta(days=1)
+        self.session.query(ClientOrder).filter_by(id=order_id).update({"order_date": yesterday})
+        self.session.commit()
+        days = fetch_sales_day_rows(sales_by_day_query(self.session, yesterday, today))
+        self.assertEqual([(row.day, row.order_count, row.amount) for row in days],
+                         [(yesterday, 1, 2000.0), (today, 1, 1900.0)])
+
+        self.session.query(OrderItem).filter_by(order_id=order_id).delete()
+        self.session.query(ClientOrder).filter_by(id=order_id).delete()
+        self.session.commit()
+        days, products, _ = load_sales(self.session, yesterday, today)
+        self.assertEqual([(row.day, row.order_count, row.amount) for row in days],
+                         [(yesterday, 0, 0.0), (today, 1, 1900.0)])
+        self.assertEqual([(row.id, row.quantity) for row in products], [(1, 3), (2, 2)])
+
+    def test_search_products(self):
+        """Товар находится по части названия или описания без учёта регистра"""
+        self.session.add(Product(id=2, name="Пыльца цветочная", description="Собрана с липы", price=300.0, stock_quantity=7))
+        self.session.commit()
+        rows = fetch_product_rows(product_search_query(self.session, "лип"))
+        self.assertEqual([row.id for row in rows], [1, 2])
+        self.assertEqual(rows[1].stock_quantity, 7)
+        self.assertEqual(fetch_product_rows(product_search_query(self.session, "%")), [])
+
     def test_generate_clients_report(self):
         """Тест генерации отчёта по клиентам (TC-006)"""
-        user_window = UserWindow(self.session, user=None, role="accountant")
-        with patch('user_window.SimpleDocTemplate') as mock_doc, \
-             patch('user_window.QMessageBox') as mock_msgbox:
-            user_window.generate_clients_report()
-            mock_msgbox.information.assert_called_once()
+        user_window = self.open_user_window(ACCOUNTANT)
+        with patch('reports.SimpleDocTemplate') as mock_doc:
+            job = user_window.generate_clients_report()
+            # Отчёт формируется в фоне, дожидаемся задания и доставки сигналов
+            user_window.report_jobs.wait()
+            QApplication.processEvents()
             mock_doc.return_value.build.assert_called_once()
+            self.assertEqual(job.state, "Готов")
+
+    def test_orders_report(self):
+        """Отчёт по заказам: все позиции многострочных заказов, итоги по клиентам и общий итог"""
+        self.session.query(Client).filter_by(id=1).update({"display_name": "Петров Иван"})
+        self.session.add(Client(id=2, client_type=ClientType.legal_entity, email="info@honey.ru",
+                                display_name="ООО Пасека", is_deleted=False))
+        self.session.add(Product(id=2, name="Пыльца цветочная", price=300.0, stock_quantity=10))
+        self.session.add_all([
+            ClientOrder(id=1, client_id=1, order_date=date.today(), status=OrderStatus.created),
+            ClientOrder(id=2, client_id=1, order_date=date.today() - timedelta(days=10), status=OrderStatus.completed),
+            ClientOrder(id=3, client_id=2, order_date=date.today(), status=OrderStatus.created),
+        ])
+        self.session.flush()
+        self.session.add_all([
+            OrderItem(id=1, order_id=1, product_id=1, quantity=2, price=1000.0),
+            # Сумма позиции без цены считается по цене товара
+            OrderItem(id=2, order_id=1, product_id=2, quantity=1, price=None),
+            OrderItem(id=3, order_id=2, product_id=1, quantity=4, price=2000.0),
+            OrderItem(id=4, order_id=3, product_id=1, quantity=3, price=1500.0),
+        ])
+        self.session.commit()
+
+        def report(**filters):
+            return [(row.client_id, row.order_id, row.item_id, row.quantity, row.amount, row.client_total, row.grand_total)
+                    for row in fetch_order_report_rows(order_report_query(self.session, **filters))]
+
+        self.assertEqual(report(), [
+            (2, 3, 4, 3, 1500.0, False, False),
+            (2, None, None, 3, 1500.0, True, False),
+            (1, 2, 3, 4, 2000.0, False, False),
+            (1, 1, 1, 2, 1000.0, False, False),
+            (1, 1, 2, 1, 300.0, False, False),
+            (1, None, None, 7, 3300.0, True, False),
+            (None, None, None, 10, 4800.0, False, True),
+        ])
+        self.assertEqual(report(client_id=1, date_from=date.today() - timedelta(days=1)), [
+            (1, 1, 1, 2, 1000.0, False, False),
+            (1, 1, 2, 1, 300.0, False, False),
+            (1, None, None, 3, 1300.0, True, False),
+            (None, None, None, 3, 1300.0, False, True),
+        ])
+        self.assertEqual(report(status=OrderStatus.completed, date_to=date.today()), [
+            (1, 2, 3, 4, 2000.0, False, False),
+            (1, None, None, 4, 2000.0, True, False),
+            (None, None, None, 4, 2000.0, False, True),
+        ])
+
+        with tempfile.TemporaryDirectory() as directory:
+            progress = ReportProgress()
+            filename = build_orders_report(self.session, os.path.join(directory, "orders.pdf"), progress=progress)
+            self.assertTrue(os.path.getsize(filename) > 0)
+            self.assertEqual(progress.rows, 7)
+        self.session.commit()
+
+    def test_report_cache(self):
+        """Повторный отчёт без изменения данных копируется из кэша"""
+        builds = []
+
+        def build(filename, data_version):
+            builds.append(filename)
+            return build_clients_report(self.session, filename, data_version=data_version)
+
+        with tempfile.TemporaryDirectory() as cache_dir, tempfile.TemporaryDirectory() as directory:
+            cache = ReportCache(cache_dir, 10 * 1024 * 1024, 3600)
+            first, second, third = (os.path.join(directory, f"clients_{n}.pdf") for n in range(3))
+            cached_report(self.session, first, "clients", {}, lambda data_version: build(first, data_version), cache=cache)
+            progress = ReportProgress()
+            cached_report(self.session, second, "clients", {}, lambda data_version: build(second, data_version), progress, cache)
+            self.assertEqual(builds, [first])
+            self.assertEqual(progress.summary, "из кэша, данные не менялись")
+            with open(first, "rb") as built, open(second, "rb") as copied:
+                self.assertEqual(built.read(), copied.read())
+
+            # Изменение клиентов меняет ключ отчёта
+            self.session.query(Client).filter_by(id=1).update({"phone": "+79990000000"})
+            self.session.commit()
+            cached_report(self.session, third, "clients", {}, lambda data_version: build(third, data_version), cache=cache)
+            self.assertEqual(builds, [first, third])
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+            # При превышении размера удаляются все файлы сверх предела
+            cache.max_bytes = 1
+            cache.evict()
+            self.assertEqual(os.listdir(cache_dir), [])
+
+    def test_order_versions_do_not_block(self):
+        """Параллельные транзакции заказов не ждут друг друга на счётчике версии"""
+        self.session.add(Client(id=2, client_type=ClientType.legal_entity, email="info@honey.ru",
+                                display_name="ООО Пасека", is_deleted=False))
+        self.session.commit()
+        version = table_version(self.session, "Orders")
+        self.session.commit()
+        first, second = Session(self.engine), Session(self.engine)
+        try:
+            slots = [session.execute(text("SELECT mod(pg_backend_pid(), 64)")).scalar() for session in (first, second)]
+            if slots[0] == slots[1]:
+                self.skipTest("оба соединения попали в один слот счётчика")
+            first.add(ClientOrder(client_id=1, order_date=date.today(), status=OrderStatus.created))
+            first.flush()
+            # Пока первая транзакция не зафиксирована, вторая не должна ждать блокировки
+            second.execute(text("SET LOCAL lock_timeout = '1s'"))
+            second.add(ClientOrder(client_id=2, order_date=date.today(), status=OrderStatus.created))
+            second.commit()
+            self.assertEqual(table_version(self.session, "Orders"), version + 1)
+            self.session.commit()
+            first.commit()
+        finally:
+            first.close()
+            second.close()
+        self.assertEqual(table_version(self.session, "Orders"), version + 2)
+
+    def test_import_clients(self):
+        """Тест массового импорта клиентов из CSV"""
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "clients.csv")
+            with open(filename, "w", encoding="utf-8-sig", newline="") as file:
+                file.write("client_type,email,phone,last_name,first_name,company_name,inn,kpp,ogrn\n")
+                file.write("Физлицо,anna@example.com,+79990000001,Иванова,Анна,,,,\n")
+                file.write("Юрлицо,info@honey.ru,,,,ООО Пасека,7701234567,770101001,1027700132195\n")
+                file.write("Физлицо,ivan.petrov@example.com,,Петров,Иван,,,,\n")
+                file.write("Юрлицо,bad@honey.ru,,,,ООО Улей,12345,,\n")
+                # Отклонённая строка не делает повтором следующую строку с тем же email
+                file.write("Юрлицо,dup@honey.ru,,,,ООО Соты,12345,,\n")
+                file.write("Физлицо,dup@honey.ru,,Сидоров,Пётр,,,,\n")
+                file.write("Физлицо,dup@honey.ru,,Сидорова,Мария,,,,\n")
+            rejection_file = import_clients(self.session, filename)
+
+            self.assertIsNotNone(self.session.query(Client).filter_by(email="anna@example.com", display_name="Иванова Анна").first())
+            legal = self.session.query(LegalEntityClient).filter_by(inn="7701234567").first()
+            self.assertEqual(legal.company_name, "ООО Пасека")
+            # Поисковые столбцы импортированных клиентов заполнены триггерами подтипов
+            self.assertEqual([row.display_name for row in client_list_query(self.session, search="пасек")], ["ООО Пасека"])
+            self.assertEqual([row.display_name for row in client_list_query(self.session, search="Анна")], ["Иванова Анна"])
+            with open(rejection_file, encoding="utf-8-sig", newline="") as file:
+                rejected = list(csv.DictReader(file))
+            self.assertEqual([row["line"] for row in rejected], ["4", "5", "6", "8"])
+            self.assertEqual(rejected[0]["error"], "Клиент с таким email уже существует")
+            self.assertEqual(rejected[3]["error"], "Email повторяется в файле")
+            self.assertEqual(self.session.query(Client).filter_by(email="dup@honey.ru").one().display_name, "Сидоров Пётр")
+
+    def test_export_formats(self):
+        """Выгрузка клиентов в CSV, XLSX и Parquet читается обратно без потерь"""
+        self.session.add(Client(id=2, client_type=ClientType.legal_entity, email="info@honey.ru",
+                                display_name='ООО "Пасека",\nфилиал', is_deleted=False))
+        self.session.add(LegalEntityClient(id=2, company_name='ООО "Пасека",\nфилиал', inn="7701234567"))
+        self.session.commit()
+        expected = [(1, "Физлицо", "ivan.petrov@example.com", None), (2, "Юрлицо", "info@honey.ru", 'ООО "Пасека",\nфилиал')]
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "clients.csv")
+            progress = ReportProgress()
+            export_dataset(self.session, "clients", filename, progress)
+            self.session.commit()
+            # Перевод строки внутри значения не считается лишней строкой
+            self.assertEqual(progress.rows, 2)
+            with open(filename, encoding="utf-8-sig", newline="") as file:
+                rows = [(int(row["ID"]), row["Тип клиента"], row["Email"], row["Название компании"] or None)
+                        for row in csv.DictReader(file)]
+            self.assertEqual(rows, expected)
+
+            from openpyxl import load_workbook
+            filename = os.path.join(directory, "clients.xlsx")
+            export_dataset(self.session, "clients", filename)
+            self.session.commit()
+            sheet = load_workbook(filename).active
+            header, *values = sheet.iter_rows(values_only=True)
+            rows = [(row[header.index("ID")], row[header.index("Тип клиента")], row[header.index("Email")],
+                     row[header.index("Название компании")]) for row in values]
+            self.assertEqual(rows, expected)
+
+            import pyarrow.parquet as pq
+            filename = os.path.join(directory, "clients.parquet")
+            export_dataset(self.session, "clients", filename)
+            self.session.commit()
+            table = pq.read_table(filename).to_pydict()
+            rows = list(zip(table["ID"], table["Тип клиента"], table["Email"], table["Название компании"]))
+            self.assertEqual(rows, expected)
+
+    def test_export_without_extension(self):
+        """Имя файла без расширения и без выбранного фильтра выгружается в CSV"""
+        user_window = self.open_user_window(ACCOUNTANT)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "clients")
+            with patch("user_window.QFileDialog.getSaveFileName", return_value=(filename, "")):
+                job = user_window.export_data("clients")
+            user_window.report_jobs.wait()
+            QApplication.processEvents()
+            self.assertEqual(job.state, "Готов")
+            self.assertTrue(os.path.exists(filename + ".csv"))
+
+    def _plan_scans(self, query):
+        """Возвращает таблицы, которые план запроса читает последовательным сканированием, и имена использованных индексов."""
+        statement = query.statement if hasattr(query, "statement") else query
+        sql = statement.compile(dialect=self.engine.dialect, compile_kwargs={"literal_binds": True})
+        plan = self.session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        tables, indexes, nodes = [], set(), [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if node["Node Type"] == "Seq Scan":
+                tables.append(node["Relation Name"])
+            if "Index Name" in node:
+                indexes.add(node["Index Name"])
+            nodes.extend(node.get("Plans", []))
+        return tables, indexes
+
+    def test_hot_queries_use_indexes(self):
+        """Частые запросы не должны читать таблицы последовательным сканированием"""
+        self.session.execute(text("""
+            INSERT INTO "Client" (id, client_type, email, is_deleted, display_name)
+            SELECT g, CAST(CASE WHEN g % 20 = 1 THEN 'individual' ELSE 'legal_entity' END AS clienttype),
+                   'seed' || g || '@example.com', g % 10 = 0, 'Клиент ' || g
+            FROM generate_series(2, 2001) g"""))
+        self.session.execute(text("""
+            INSERT INTO "ClientOrder" (id, client_id, order_date, status)
+            SELECT g, 2 + g % 2000, current_date - g % 365, 'created' FROM generate_series(1, 10000) g"""))
+        self.session.execute(text("""
+            INSERT INTO "OrderItem" (id, order_id, product_id, quantity, price)
+            SELECT g, 1 + g % 10000, 1, 1, 500 FROM generate_series(1, 20000) g"""))
+        self.session.execute(text("""
+            INSERT INTO "User" (id, username, password_hash)
+            SELECT g, 'user' || g, 'x' FROM generate_series(3, 2002) g"""))
+        self.session.commit()
+        for table in ["Client", "ClientOrder", "OrderItem", "User", "UserRole"]:
+            self.session.execute(text(f'ANALYZE "{table}"'))
+        # На небольших данных планировщик вправе предпочесть Seq Scan; с enable_seqscan = off
+        # он выбирает его, только если подходящего индекса нет
+        self.session.execute(text("SET LOCAL enable_seqscan = off"))
+
+        # Запрос и индексы, которые он должен использовать: отсутствие Seq Scan само по себе
+        # ничего не доказывает — например, список клиентов можно прочитать и по Client_pkey.
+        # Физлиц среди заполненных клиентов 5%: страницу из них дешевле читать по частичному
+        # индексу ix_Client_active_type, чем отфильтровывать всю таблицу при обходе Client_pkey
+        hot_queries = {
+            "список заказов клиента": (order_list_query(self.session, 2), {"ix_ClientOrder_client_id"}),
+            "позиции заказа": (self.session.query(OrderItem).filter_by(order_id=1), {"ix_OrderItem_order_id"}),
+            "позиции по товару": (self.session.query(OrderItem).filter_by(product_id=1), {"ix_OrderItem_product_id"}),
+            "список клиентов по типу": (client_list_query(self.session, ClientType.individual)
+                                        .order_by(Client.id).limit(PagedTableModel.page_size),
+                                        {"ix_Client_active_type"}),
+            "роль пользователя": (self.session.query(UserRole).filter_by(user_id=1), {"UserRole_pkey"}),
+            "поиск пользователя": (user_list_query(self.session, "User12"), {"ix_User_username_lower"}),
+            "поиск клиента": (client_list_query(self.session, search="seed12")
+                              .order_by(Client.id).limit(PagedTableModel.page_size),
+                              {"ix_Client_search_vector", "ix_Client_search_text"}),
+            "поиск товара": (product_search_query(self.session, "мёд"),
+                             {"ix_Product_name_trgm", "ix_Product_description_trgm"}),
+            "отчёт по заказам клиента": (order_report_query(self.session, client_id=2), {"ix_ClientOrder_client_id"}),
+        }
+        for name, (query, expected_indexes) in hot_queries.items():
+            with self.subTest(name):
+                seq_scans, indexes = self._plan_scans(query)
+                self.assertEqual(seq_scans, [])
+                self.assertLessEqual(expected_indexes, indexes)
+        self.session.rollback()
+
+    def test_search_users(self):
+        """Поиск пользователей по началу имени без учёта регистра"""
+        rows = user_list_query(self.session, "ADM").all()
+        self.assertEqual([tuple(row) for row in rows], [(1, "admin", "Administrator")])
+        self.assertEqual(user_list_query(self.session, "adm_").all(), [])
+
+        # Пользователь с несколькими ролями занимает одну строку
+        self.session.add(UserRole(user_id=1, role_id=2))
+        self.session.commit()
+        rows = user_list_query(self.session, "adm").all()
+        self.assertEqual([tuple(row) for row in rows], [(1, "admin", "Administrator, Sales Manager")])
+
+    def test_search_clients(self):
+        """Поиск клиентов по словам ФИО, реквизитам и подстроке контактов"""
+        self.session.add(Client(id=2, client_type=ClientType.legal_entity, phone="+74950000000",
+                                email="info@honey.ru", display_name="ООО Пасека", is_deleted=False))
+        self.session.add(LegalEntityClient(id=2, company_name="ООО Пасека", inn="7701234567", ogrn="1027700000000"))
+        self.session.commit()
+
+        def found(search):
+            return [row.id for row in client_list_query(self.session, search=search)]
+
+        self.assertEqual(found("Петров Иван"), [1])
+        self.assertEqual(found("пасек"), [2])
+        self.assertEqual(found("7701"), [2])
+        self.assertEqual(found("petrov@example"), [1])
+        self.assertEqual(found("+7495"), [2])
+        self.assertEqual(found("Сидоров"), [])
+        # Запрос короче трёх символов не отправляется в базу
+        window = self.open_user_window(SALES_MANAGER)
+        window.search_clients("пасек")
+        window.search_clients("па")
+        self.assertEqual(window.client_model.search, "пасек")
+
+        # Изменение данных физлица сразу попадает в поисковые столбцы клиента
+        self.session.get(IndividualClient, 1).last_name = "Сидоров"
+        self.session.commit()
+        self.assertEqual(found("Сидоров"), [1])
+
+    def test_refresh_client_rows(self):
+        """Изменённые клиенты обновляются в таблице без полной перезагрузки"""
+        model = ClientTableModel(self.session)
+        model.fetchMore()
+        resets = []
+        model.modelReset.connect(lambda: resets.append(True))
+
+        client = self.session.get(Client, 1)
+        client.phone = "+79990000000"
+        self.session.commit()
+        model.refresh_rows([1])
+        self.assertEqual(model.row_data(0).phone, "+79990000000")
+
+        client.is_deleted = True
+        self.session.commit()
+        model.refresh_rows([1])
+        self.assertEqual(model.rowCount(), 0)
+        self.assertEqual(resets, [])
+
+        # Порядок по релевантности и по строкам (collation) в Python не повторить — модель перечитывается
+        model.set_search("Петров")
+        resets.clear()
+        model.refresh_rows([1])
+        self.assertEqual(resets, [True])
+        model.set_search("")
+        model.sort(2)
+        resets.clear()
+        model.refresh_rows([1])
+        self.assertEqual(resets, [True])
+
+    def test_paged_client_model(self):
+        """Клиенты подгружаются страницами, сортировка перечитывает модель с начала"""
+        for client_id in range(2, 6):
+            self.session.add(Client(id=client_id, client_type=ClientType.legal_entity, email=f"{client_id}@honey.ru",
+                                    display_name=f"ООО Улей {client_id}", is_deleted=False))
+        self.session.commit()
+        model = ClientTableModel(self.session)
+        model.page_size = 2
+        model.fetchMore()
+        self.assertEqual(model.rowCount(), 2)
+        self.assertTrue(model.canFetchMore())
+        model.fetchMore()
+        model.fetchMore()
+        self.assertEqual([model.row_id(row) for row in range(model.rowCount())], [1, 2, 3, 4, 5])
+        self.assertFalse(model.canFetchMore())
+
+        model.sort(0, Qt.DescendingOrder)
+        self.assertEqual(model.rowCount(), 0)
+        model.fetchMore()
+        self.assertEqual([model.row_id(row) for row in range(model.rowCount())], [5, 4])
+        self.assertEqual(model.data(model.index(0, 2)), "ООО Улей 5")
+
+        with self.assertRaises(TypeError):
+            PagedTableModel(self.session)
+
+    def test_query_executor(self):
+        """Фоновые запросы: новый запрос с тем же ключом отменяет старый, ошибка уходит в on_error"""
+        executor = QueryExecutor(sessionmaker(bind=self.engine))
+        results, errors = [], []
+
+        def slow_count(session):
+            time.sleep(0.2)
+            return session.query(Client).count()
+
+        executor.submit("clients", slow_count, lambda result: results.append(("slow", result)))
+        executor.submit("clients", lambda session: session.query(Client).count(),
+                        lambda result: results.append(("fast", result)))
+        executor.submit("cancelled", lambda session: 1, results.append)
+        executor.cancel("cancelled")
+        executor.submit("error", lambda session: session.execute(text("SELECT * FROM missing_table")),
+                        results.append, errors.append)
+        executor.wait()
+        QApplication.processEvents()
+        self.assertEqual(results, [("fast", 1)])
+        self.assertEqual(len(errors), 1)
+        self.assertIn("missing_table", errors[0])
+        self.assertFalse(executor.is_pending("clients"))
+
+    def test_loading_overlay(self):
+        """Надпись загрузки видна, пока страница читается в фоне"""
+        executor = QueryExecutor(sessionmaker(bind=self.engine))
+        model = ClientTableModel(self.session, executor=executor)
+        table = QTableView()
+        self.addCleanup(table.close)
+        overlay = LoadingOverlay(table)
+        model.loading_changed.connect(overlay.set_loading)
+        table.setModel(model)
+        self.assertTrue(overlay.isHidden())
+
+        model.fetchMore()
+        self.assertFalse(overlay.isHidden())
+        executor.wait()
+        QApplication.processEvents()
+        self.assertTrue(overlay.isHidden())
+        self.assertEqual(model.row_id(0), 1)
+
+    def test_settings_and_statement_timeout(self):
+        """Настройки читаются из файла и окружения, statement_timeout задаётся соединениям пула"""
+        url = f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
+        with tempfile.TemporaryDirectory() as directory:
+            config_file = os.path.join(directory, "med.ini")
+            with open(config_file, "w", encoding="utf-8") as file:
+                file.write(f"[database]\nurl = {url}\npool_size = 2\nstatement_timeout = 1500\n")
+            with patch.dict(os.environ, {"MED_DB_MAX_OVERFLOW": "3"}):
+                settings = load_settings(config_file)
+        self.assertEqual((settings["url"], settings["pool_size"], settings["max_overflow"]), (url, 2, 3))
+        self.assertEqual(settings["statement_timeout"], 1500)
+        self.assertTrue(settings["pool_pre_ping"])
+
+        dispose_engine()
+        self.addCleanup(dispose_engine)
+        with patch("db.load_settings", return_value=settings):
+            engine = get_engine()
+        self.assertIs(get_engine(), engine)
+        with engine.connect() as connection:
+            self.assertEqual(connection.execute(text("SHOW statement_timeout")).scalar(), "1500ms")
+
+        # Фоновые задания (отчёты, экспорт, импорт) выполняются без ограничения
+        panel = ReportJobsPanel(sessionmaker(bind=engine))
+        self.addCleanup(panel.close)
+        job = panel.start("statement_timeout", lambda session, progress: session.execute(text("SHOW statement_timeout")).scalar())
+        panel.wait()
+        QApplication.processEvents()
+        self.assertEqual(job.filename, "0")
+
+    def test_live_updates(self):
+        """Изменение клиента в другой сессии приходит уведомлением LISTEN/NOTIFY"""
+        listener = ChangeListener(self.engine)
+        received = []
+        listener.changed.connect(lambda table, ids, parent_ids: received.append((table, ids)))
+        listener.start()
+        try:
+            other = sessionmaker(bind=self.engine)()
+            client = other.get(Client, 1)
+            # Подписка устанавливается в фоне, поэтому изменение повторяется до получения
+            deadline = time.monotonic() + 10
+            while not received and time.monotonic() < deadline:
+                client.phone = f"+7999{int(time.monotonic() * 1000) % 10000000:07d}"
+                other.commit()
+                for _ in range(10):
+                    time.sleep(0.05)
+                    QApplication.processEvents()
+            other.close()
+        finally:
+            listener.stop()
+        self.assertIn(("Client", {1}), received)
+
+        # Массовое изменение приходит одним требованием перечитать списки, а не уведомлением на строку
+        reloads = []
+        listener = ChangeListener(self.engine)
+        listener.reload_required.connect(lambda: reloads.append(True))
+        listener.changed.connect(lambda table, ids, parent_ids: received.append((table, ids)))
+        listener.start()
+        try:
+            received.clear()
+            deadline = time.monotonic() + 10
+            offset = 1000
+            while not reloads and time.monotonic() < deadline:
+                self.session.execute(text(f"""
+                    INSERT INTO "Product" (id, name, price, stock_quantity)
+                    SELECT g, 'Товар ' || g, 1, 1 FROM generate_series({offset}, {offset + 1500}) g"""))
+                self.session.commit()
+                offset += 2000
+                for _ in range(10):
+                    time.sleep(0.05)
+                    QApplication.processEvents()
+        finally:
+            listener.stop()
+        self.assertTrue(reloads)
+        self.assertNotIn("Product", [table for table, _ in received])
+
+        # Закрытое окно останавливает свой поток LISTEN и освобождает соединение
+        window = UserWindow(self.session, user=None, permissions=SALES_MANAGER)
+        thread = window.live_updates._thread
+        self.assertTrue(thread.is_alive())
+        window.close()
+        self.assertFalse(thread.is_alive())
+
+    def test_client_lookup_index(self):
+        """Индекс клиентов ищет по началу и подстроке и перестраивается только после изменений"""
+        session_factory = sessionmaker(bind=self.engine)
+        index = ClientLookupIndex()
+        index.refresh(session_factory, background=False)
+        self.assertTrue(index.ready)
+        self.assertEqual([client.id for client in index.search("IVAN.P")], [1])
+        self.assertEqual([client.id for client in index.search("petrov@exa")], [1])
+        self.assertEqual(index.search("несуществующий"), [])
+
+        version = index.version
+        index.refresh(session_factory, background=False)
+        self.assertEqual(index.version, version)
+
+        self.session.add(Client(id=2, client_type=ClientType.legal_entity, email="info@honey.ru",
+                                display_name="ООО Пасека", is_deleted=False))
+        self.session.add(LegalEntityClient(id=2, company_name="ООО Пасека", inn="7701234567"))
+        self.session.commit()
+        index.refresh(session_factory, background=False)
+        self.assertGreater(index.version, version)
+        self.assertEqual([client.id for client in index.search("770123")], [2])
+        self.assertEqual(index.get(2).display_name, "ООО Пасека")
+
+        # Проверка, запрошенная во время перестройки, выполняется после неё
+        loads = []
+
+        def lookup_query(session):
+            loads.append(True)
+            if len(loads) == 1:
+                self.session.query(Client).filter_by(id=2).update({"phone": "+74950000000"})
+                self.session.commit()
+                index.refresh(session_factory, background=False)
+            return client_lookup_query(session)
+
+        self.session.query(Client).filter_by(id=1).update({"phone": "+79990000000"})
+        self.session.commit()
+        with patch("client_lookup.client_lookup_query", lookup_query):
+            index.refresh(session_factory, background=False)
+        self.assertEqual(len(loads), 2)
+        self.assertEqual(index.version, table_version(self.session, "Client"))
+        self.session.commit()
 
     def test_select_client(self):
         """Тест выбора клиента из списка (TC-007)"""
-        user_window = UserWindow(self.session, user=None, role="sales_manager")
+        user_window = self.open_user_window(SALES_MANAGER)
         with patch.object(user_window, 'clients_table', create=True) as mock_table, \
              patch.object(user_window, 'load_orders', create=True) as mock_load_orders:
             mock_table.currentRow.return_value = 0
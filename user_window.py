@@ -1,37 +1,51 @@
-from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QPushButton, QMessageBox, QStackedWidget
-from sqlalchemy.orm import Session
-from models import Client, ClientOrder, OrderItem, Product, ClientType
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import QMainWindow, QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QTableView, QAbstractItemView, QPushButton, QMessageBox, QStackedWidget, QFileDialog, QLineEdit
+from sqlalchemy.orm import Session, sessionmaker
+from models import Client, ClientOrder, ClientType
 from datetime import datetime
+import os
+from itertools import count
 from create_client_dialog import CreateClientDialog
 from create_order_dialog import CreateOrderDialog
 from edit_client_dialog import EditClientDialog
 from edit_order_dialog import EditOrderDialog
+from table_models import ClientTableModel
+from projections import order_list_query, fetch_order_rows, CLIENT_SEARCH_MIN_LENGTH
+from query_executor import QueryExecutor
+from loading_overlay import LoadingOverlay
+from report_jobs import ReportJobsPanel
+from reports import build_clients_report, build_orders_report
+from report_cache import cached_report
+from orders_report_dialog import OrdersReportDialog
+from export import FORMATS, export_dataset
+from permissions import Permissions, VIEW_CLIENTS, MANAGE_CLIENTS, CREATE_ORDERS, EDIT_ORDER_ITEMS, EDIT_ORDER_STATUS, BUILD_REPORTS, VIEW_SALES
+from client_import import import_clients
+from live_updates import ChangeListener
+from client_lookup import client_index
+from sales_dashboard import SalesDashboard
 
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-
-pdfmetrics.registerFont(TTFont('DejaVuSans', 'fonts/DejaVuSans.ttf'))
-pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', 'fonts/DejaVuSans-Bold.ttf'))
 
 class UserWindow(QMainWindow):
-    def __init__(self, session: Session, user, role: str):
+    def __init__(self, session: Session, user, permissions: Permissions, live_updates=True):
         super().__init__()
         self.session = session
         self.user = user
-        self.role = role
-        self.setWindowTitle(f"Интерфейс пользователя - {self.role}")
+        self.permissions = permissions
+        # Чтение списков выполняется в фоновых потоках со своими сессиями
+        self.executor = QueryExecutor(sessionmaker(bind=session.get_bind()), self)
+        self._order_refresh_keys = count()
+        self.live_updates = None
+        self.create_order_dialog = None
+        self.sales_dashboard = None
+        self.setWindowTitle(f"Интерфейс пользователя - {self.permissions.role_name}")
         self.setGeometry(100, 100, 900, 600)
 
         # Центральный виджет и основной layout
         widget = QWidget()
         main_layout = QHBoxLayout()
 
-        # Проверяем роль пользователя
-        if self.role == "basic":
+        # Проверяем разрешения пользователя
+        if not self.permissions.can(VIEW_CLIENTS):
             # Базовый пользователь ничего не может
             layout = QVBoxLayout()
             layout.addWidget(QLabel("У вас нет доступа к функционалу. Обратитесь к администратору."))
@@ -52,6 +66,11 @@ class UserWindow(QMainWindow):
         self.orders_button.clicked.connect(lambda: self.stacked_widget.setCurrentIndex(1))
         sidebar_layout.addWidget(self.orders_button)
 
+        self.sales_button = QPushButton("Продажи")
+        self.sales_button.clicked.connect(self.show_sales_dashboard)
+        if self.permissions.can(VIEW_SALES):
+            sidebar_layout.addWidget(self.sales_button)
+
         sidebar_layout.addStretch()
         sidebar.setLayout(sidebar_layout)
 
@@ -75,27 +94,49 @@ class UserWindow(QMainWindow):
         self.edit_client_button.clicked.connect(self.open_edit_client_dialog)
         self.delete_client_button = QPushButton("Удалить клиента")
         self.delete_client_button.clicked.connect(self.delete_client)
+        self.import_clients_button = QPushButton("Импорт клиентов")
+        self.import_clients_button.clicked.connect(self.import_clients)
         self.clients_report_button = QPushButton("Сформировать отчёт")
         self.clients_report_button.clicked.connect(self.generate_clients_report)
+        self.clients_export_button = QPushButton("Экспорт")
+        self.clients_export_button.clicked.connect(lambda: self.export_data("clients"))
 
         # Ограничиваем доступ к кнопкам на странице "Клиенты"
         filter_layout.addWidget(self.all_clients_button)
         filter_layout.addWidget(self.individual_clients_button)
         filter_layout.addWidget(self.legal_entity_clients_button)
-        if self.role == "director":
-            # Руководитель может управлять клиентами
+        if self.permissions.can(MANAGE_CLIENTS):
             filter_layout.addWidget(self.create_client_button)
             filter_layout.addWidget(self.edit_client_button)
             filter_layout.addWidget(self.delete_client_button)
-        if self.role in ["accountant", "director"]:
-            # Бухгалтер и руководитель могут формировать отчёты
+            filter_layout.addWidget(self.import_clients_button)
+        if self.permissions.can(BUILD_REPORTS):
             filter_layout.addWidget(self.clients_report_button)
+            filter_layout.addWidget(self.clients_export_button)
 
         client_layout.addLayout(filter_layout)
 
-        self.client_table = QTableWidget()
-        self.client_table.setColumnCount(7)
-        self.client_table.setHorizontalHeaderLabels(["ID", "Тип клиента", "Телефон", "Email", "ИНН", "ОГРН", "КПП"])
+        # Поиск клиента выполняется в базе; запрос отправляется после паузы в наборе
+        self.client_search_input = QLineEdit(self)
+        self.client_search_input.setPlaceholderText(f"Поиск (от {CLIENT_SEARCH_MIN_LENGTH} символов): ФИО, компания, ИНН, ОГРН, телефон или email")
+        self.client_search_timer = QTimer(self)
+        self.client_search_timer.setSingleShot(True)
+        self.client_search_timer.setInterval(300)
+        self.client_search_timer.timeout.connect(lambda: self.search_clients(self.client_search_input.text()))
+        self.client_search_input.textChanged.connect(self.client_search_timer.start)
+        client_layout.addWidget(self.client_search_input)
+
+        # Клиенты подгружаются из базы страницами по мере прокрутки
+        self.client_model = ClientTableModel(self.session, self, self.executor)
+        self.client_table = QTableView()
+        self.client_table.setModel(self.client_model)
+        self.client_loading = LoadingOverlay(self.client_table)
+        self.client_model.loading_changed.connect(self.client_loading.set_loading)
+        self.client_model.load_failed.connect(self.show_load_error)
+        self.client_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.client_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.client_table.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
+        self.client_table.setSortingEnabled(True)
         self.client_table.clicked.connect(self.load_orders)
         client_layout.addWidget(self.client_table)
         self.client_page.setLayout(client_layout)
@@ -103,8 +144,9 @@ class UserWindow(QMainWindow):
         # Страница "Заказы"
         order_layout = QVBoxLayout()
         self.order_table = QTableWidget()
-        self.order_table.setColumnCount(4)
-        self.order_table.setHorizontalHeaderLabels(["ID", "Дата заказа", "Статус", "Клиент"])
+        self.order_table.setColumnCount(7)
+        self.order_table.setHorizontalHeaderLabels(["ID", "Дата заказа", "Статус", "Клиент", "Позиций", "Количество", "Сумма"])
+        self.order_loading = LoadingOverlay(self.order_table)
 
         order_buttons_layout = QHBoxLayout()
         self.create_order_button = QPushButton("Создать заказ")
@@ -113,17 +155,17 @@ class UserWindow(QMainWindow):
         self.edit_order_button.clicked.connect(self.open_edit_order_dialog)
         self.orders_report_button = QPushButton("Сформировать отчёт")
         self.orders_report_button.clicked.connect(self.generate_orders_report)
+        self.orders_export_button = QPushButton("Экспорт")
+        self.orders_export_button.clicked.connect(lambda: self.export_data("orders"))
 
         # Ограничиваем доступ к кнопкам на странице "Заказы"
-        if self.role in ["sales_manager", "director"]:
-            # Менеджер по продажам и руководитель могут создавать заказы
+        if self.permissions.can(CREATE_ORDERS):
             order_buttons_layout.addWidget(self.create_order_button)
-        if self.role in ["sales_manager", "production_worker", "director"]:
-            # Менеджер, производственный сотрудник и руководитель могут редактировать заказы
+        if self.permissions.can_any(EDIT_ORDER_ITEMS, EDIT_ORDER_STATUS):
             order_buttons_layout.addWidget(self.edit_order_button)
-        if self.role in ["accountant", "director"]:
-            # Бухгалтер и руководитель могут формировать отчёты
+        if self.permissions.can(BUILD_REPORTS):
             order_buttons_layout.addWidget(self.orders_report_button)
+            order_buttons_layout.addWidget(self.orders_export_button)
 
         order_layout.addLayout(order_buttons_layout)
         order_layout.addWidget(self.order_table)
@@ -132,6 +174,9 @@ class UserWindow(QMainWindow):
         # Добавление страниц в QStackedWidget
         self.stacked_widget.addWidget(self.client_page)
         self.stacked_widget.addWidget(self.order_page)
+        if self.permissions.can(VIEW_SALES):
+            self.sales_dashboard = SalesDashboard(self.executor, self)
+            self.stacked_widget.addWidget(self.sales_dashboard)
 
         # Сборка основного layout
         main_layout.addWidget(sidebar)
@@ -139,34 +184,51 @@ class UserWindow(QMainWindow):
         widget.setLayout(main_layout)
         self.setCentralWidget(widget)
 
+        # Панель фоновых отчётов: оператор продолжает работу, пока отчёт формируется
+        self.report_jobs = ReportJobsPanel(self.executor.session_factory, self)
+        self.report_dock = QDockWidget("Отчёты", self)
+        self.report_dock.setWidget(self.report_jobs)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.report_dock)
+        if not self.permissions.can_any(BUILD_REPORTS, MANAGE_CLIENTS):
+            self.report_dock.hide()
+
         # Загрузка клиентов при старте
         self.load_clients()
         self.stacked_widget.setCurrentIndex(0)
+        if self.permissions.can(CREATE_ORDERS):
+            # Индекс для выбора клиента в заказе строится заранее, пока оператор работает со списком
+            client_index().refresh(self.executor.session_factory)
+
+        # Изменения, сделанные на других рабочих местах, сразу попадают в открытые списки;
+        # live_updates=False открывает окно без подписки (в тестах)
+        if live_updates and ChangeListener.is_supported(session.get_bind()):
+            self.live_updates = ChangeListener(session.get_bind(), self)
+            self.live_updates.changed.connect(self.apply_changes)
+            self.live_updates.reload_required.connect(self.reload_all)
+            self.live_updates.start()
 
     def open_create_client_dialog(self):
         dialog = CreateClientDialog(self.session, self)
         if dialog.exec():
-            self.load_clients()
+            self.client_model.refresh_rows(dialog.changed_ids)
 
     def open_edit_client_dialog(self):
-        selected_row = self.client_table.currentRow()
-        if selected_row < 0:
+        client_id = self.selected_client_id()
+        if client_id is None:
             QMessageBox.warning(self, "Ошибка", "Выберите клиента для редактирования")
             return
-        client_id = int(self.client_table.item(selected_row, 0).text())
         client = self.session.query(Client).filter_by(id=client_id).first()
         if client:
             dialog = EditClientDialog(self.session, client, self)
             if dialog.exec():
-                self.load_clients()
+                self.client_model.refresh_rows(dialog.changed_ids)
 
     def delete_client(self):
-        selected_row = self.client_table.currentRow()
-        if selected_row < 0:
+        client_id = self.selected_client_id()
+        if client_id is None:
             QMessageBox.warning(self, "Ошибка", "Выберите клиента для удаления")
             return
 
-        client_id = int(self.client_table.item(selected_row, 0).text())
         client = self.session.query(Client).filter_by(id=client_id).first()
         if not client:
             QMessageBox.warning(self, "Ошибка", "Клиент не найден")
@@ -179,16 +241,21 @@ class UserWindow(QMainWindow):
                 client.is_deleted = True
                 self.session.commit()
                 QMessageBox.information(self, "Успех", "Клиент успешно удалён")
-                self.load_clients()
+                self.client_model.refresh_rows([client_id])
                 self.order_table.setRowCount(0)
             except Exception as e:
                 self.session.rollback()
                 QMessageBox.critical(self, "Ошибка", f"Ошибка при удалении клиента: {e}")
 
     def open_create_order_dialog(self):
-        dialog = CreateOrderDialog(self.session, self)
-        if dialog.exec():
-            self.load_orders()
+        dialog = CreateOrderDialog(self.session, self, self.executor)
+        # Пока диалог открыт, изменения товаров обновляют его список
+        self.create_order_dialog = dialog
+        try:
+            if dialog.exec():
+                self.refresh_orders(dialog.changed_ids)
+        finally:
+            self.create_order_dialog = None
 
     def open_edit_order_dialog(self):
         selected_row = self.order_table.currentRow()
@@ -198,206 +265,208 @@ class UserWindow(QMainWindow):
         order_id = int(self.order_table.item(selected_row, 0).text())
         order = self.session.query(ClientOrder).filter_by(id=order_id).first()
         if order:
-            dialog = EditOrderDialog(self.session, order, self.role, self)
+            dialog = EditOrderDialog(self.session, order, self.permissions, self)
             if dialog.exec():
-                self.load_orders()
+                self.refresh_orders(dialog.changed_ids)
 
     def generate_clients_report(self):
-        try:
-            current_date = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"clients_report_{current_date}.pdf"
-            doc = SimpleDocTemplate(filename, pagesize=A4)
-            elements = []
-            styles = getSampleStyleSheet()
-
-            # Определяем стили с использованием шрифта DejaVuSans
-            styles.add(ParagraphStyle(name='MyTitle', fontName='DejaVuSans-Bold', fontSize=14, leading=16, alignment=1))
-            styles.add(ParagraphStyle(name='MyNormal', fontName='DejaVuSans', fontSize=10, leading=12))
-            styles.add(ParagraphStyle(name='TableCell', fontName='DejaVuSans', fontSize=8, leading=10, alignment=1))
-
-            elements.append(Paragraph("Отчёт по клиентам", styles['MyTitle']))
-            elements.append(Paragraph(f"Дата формирования: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['MyNormal']))
-            elements.append(Paragraph("<br/><br/>", styles['MyNormal']))
-
-            # Заголовки таблицы
-            data = [["ID", "Тип клиента", "Телефон", "Email", "ИНН", "ОГРН", "КПП"]]
-            clients = self.session.query(Client).filter_by(is_deleted=False).all()
-
-            # Преобразуем данные в Paragraph для переноса текста
-            for client in clients:
-                row = [
-                    Paragraph(str(client.id), styles['TableCell']),
-                    Paragraph(client.client_type.value, styles['TableCell']),
-                    Paragraph(client.phone or "", styles['TableCell']),
-                    Paragraph(client.email or "", styles['TableCell']),
-                    Paragraph(client.legal_entity_client.inn if client.client_type == ClientType.legal_entity and client.legal_entity_client else "", styles['TableCell']),
-                    Paragraph(client.legal_entity_client.ogrn if client.client_type == ClientType.legal_entity and client.legal_entity_client else "", styles['TableCell']),
-                    Paragraph(client.legal_entity_client.kpp if client.client_type == ClientType.legal_entity and client.legal_entity_client else "", styles['TableCell'])
-                ]
-                data.append(row)
-
-            # Указываем ширину столбцов (сумма должна быть около 540 пунктов для A4)
-            col_widths = [40, 80, 80, 120, 80, 80, 50]  # Подобраны экспериментально
-            table = Table(data, colWidths=col_widths)
-
-            # Настраиваем стиль таблицы
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-                ('FONTNAME', (0, 1), (-1, -1), 'DejaVuSans'),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            elements.append(table)
-
-            doc.build(elements)
-            QMessageBox.information(self, "Успех", f"Отчёт успешно сформирован: {filename}")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка при формировании отчёта: {e}")
+        """Ставит отчёт по клиентам в очередь фоновых отчётов."""
+        current_date = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"clients_report_{current_date}.pdf"
+        # Если клиенты не менялись с прошлого такого отчёта, файл берётся из кэша
+        job = self.report_jobs.start(
+            "Отчёт по клиентам",
+            lambda session, progress: cached_report(
+                session, filename, "clients", {},
+                lambda data_version: build_clients_report(session, filename, progress, data_version), progress),
+        )
+        self.report_dock.show()
+        return job
 
     def generate_orders_report(self):
-        try:
-            current_date = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"orders_report_{current_date}.pdf"
-            doc = SimpleDocTemplate(filename, pagesize=A4)
-            elements = []
-            styles = getSampleStyleSheet()
-
-            # Определяем стили с использованием шрифта DejaVuSans
-            styles.add(ParagraphStyle(name='MyTitle', fontName='DejaVuSans-Bold', fontSize=14, leading=16, alignment=1))
-            styles.add(ParagraphStyle(name='MyNormal', fontName='DejaVuSans', fontSize=10, leading=12))
-            styles.add(ParagraphStyle(name='TableCell', fontName='DejaVuSans', fontSize=8, leading=10, alignment=1))
-
-            elements.append(Paragraph("Отчёт по заказам", styles['MyTitle']))
-            elements.append(Paragraph(f"Дата формирования: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['MyNormal']))
-            elements.append(Paragraph("<br/><br/>", styles['MyNormal']))
-
-            selected_row = self.client_table.currentRow()
-            if selected_row >= 0:
-                client_id = int(self.client_table.item(selected_row, 0).text())
-                client = self.session.query(Client).filter_by(id=client_id).first()
-                # Отображаем название организации или ФИО в заголовке отчёта
-                if client.client_type == ClientType.legal_entity and client.legal_entity_client:
-                    client_display = client.legal_entity_client.name
-                elif client.client_type == ClientType.individual and client.individual_client:
-                    client_display = f"{client.individual_client.last_name} {client.individual_client.first_name}" + \
-                                     (f" {client.individual_client.middle_name}" if client.individual_client.middle_name else "")
-                else:
-                    client_display = "Неизвестный клиент"
-                elements.append(Paragraph(f"Клиент: {client_display}", styles['MyNormal']))
-                orders = self.session.query(ClientOrder).filter_by(client_id=client_id).all()
-            else:
-                elements.append(Paragraph("Все заказы", styles['MyNormal']))
-                orders = self.session.query(ClientOrder).all()
-
-            # Заголовки таблицы
-            data = [["ID", "Дата заказа", "Статус", "Клиент", "Товар", "Количество", "Цена"]]
-            for order in orders:
-                order_item = self.session.query(OrderItem).filter_by(order_id=order.id).first()
-                if order_item:
-                    product = self.session.query(Product).filter_by(id=order_item.product_id).first()
-                    # Получаем клиента по client_id
-                    client = self.session.query(Client).filter_by(id=order.client_id).first()
-                    # Определяем, что отображать: название организации или ФИО
-                    if client:
-                        if client.client_type == ClientType.legal_entity and client.legal_entity_client:
-                            client_display = client.legal_entity_client.name
-                        elif client.client_type == ClientType.individual and client.individual_client:
-                            client_display = f"{client.individual_client.last_name} {client.individual_client.first_name}" + \
-                                             (f" {client.individual_client.middle_name}" if client.individual_client.middle_name else "")
-                        else:
-                            client_display = "Неизвестный клиент"
-                    else:
-                        client_display = "Неизвестный клиент"
-                    row = [
-                        Paragraph(str(order.id), styles['TableCell']),
-                        Paragraph(str(order.order_date) if order.order_date else "", styles['TableCell']),
-                        Paragraph(order.status.value, styles['TableCell']),
-                        Paragraph(client_display, styles['TableCell']),
-                        Paragraph(product.name if product else "", styles['TableCell']),
-                        Paragraph(str(order_item.quantity), styles['TableCell']),
-                        Paragraph(str(order_item.price), styles['TableCell'])
-                    ]
-                    data.append(row)
-
-            # Указываем ширину столбцов (сумма должна быть около 540 пунктов для A4)
-            col_widths = [40, 100, 60, 60, 120, 60, 80]  # Подобраны экспериментально
-            table = Table(data, colWidths=col_widths)
-
-            # Настраиваем стиль таблицы
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-                ('FONTNAME', (0, 1), (-1, -1), 'DejaVuSans'),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            elements.append(table)
-
-            doc.build(elements)
-            QMessageBox.information(self, "Успех", f"Отчёт успешно сформирован: {filename}")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка при формировании отчёта: {e}")
+        """Ставит отчёт по заказам выбранного клиента (или по всем заказам) в очередь фоновых отчётов."""
+        dialog = OrdersReportDialog(self)
+        if not dialog.exec():
+            return None
+        filters = dialog.filters()
+        current_date = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"orders_report_{current_date}.pdf"
+        client_id = self.selected_client_id()
+        title = f"Отчёт по заказам клиента {client_id}" if client_id is not None else "Отчёт по всем заказам"
+        job = self.report_jobs.start(
+            title,
+            lambda session, progress: cached_report(
+                session, filename, "orders", dict(filters, client_id=client_id),
+                lambda data_version: build_orders_report(session, filename, client_id, progress=progress,
+                                                         data_version=data_version, **filters), progress),
+        )
+        self.report_dock.show()
+        return job
+
+    def export_data(self, dataset):
+        """Выгружает клиентов или заказы в CSV/XLSX/Parquet в фоновом задании."""
+        current_date = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename, selected_filter = QFileDialog.getSaveFileName(
+            self, "Экспорт", f"{dataset}_{current_date}.csv", ";;".join(FORMATS.values()))
+        if not filename:
+            return None
+        # Если расширение не указано, берём его из выбранного фильтра, а без фильтра выгружаем в CSV
+        if os.path.splitext(filename)[1].lower() not in FORMATS:
+            filename += next((ext for ext, name in FORMATS.items() if name == selected_filter), ".csv")
+        title = f"Экспорт {'клиентов' if dataset == 'clients' else 'заказов'}: {os.path.basename(filename)}"
+        job = self.report_jobs.start(title, lambda session, progress: export_dataset(session, dataset, filename, progress))
+        self.report_dock.show()
+        return job
+
+    def import_clients(self):
+        """Загружает клиентов из CSV в фоновом задании; отклонённые строки попадают в отдельный файл."""
+        filename, _ = QFileDialog.getOpenFileName(self, "Импорт клиентов", "", FORMATS[".csv"])
+        if not filename:
+            return None
+        job = self.report_jobs.start(
+            f"Импорт клиентов: {os.path.basename(filename)}",
+            lambda session, progress: import_clients(session, filename, progress),
+            on_finished=lambda job: self.client_model.reload(),
+        )
+        self.report_dock.show()
+        return job
+
+    def selected_client_id(self):
+        """Возвращает ID выбранного в таблице клиента или None."""
+        index = self.client_table.currentIndex()
+        if not index.isValid():
+            return None
+        return self.client_model.row_id(index.row())
 
     def load_clients(self, client_type=None):
-        self.client_table.setRowCount(0)
-        query = self.session.query(Client).filter_by(is_deleted=False)
-        if client_type:
-            query = query.filter_by(client_type=client_type)
-        clients = query.all()
-        self.client_table.setRowCount(len(clients))
-        for row, client in enumerate(clients):
-            self.client_table.setItem(row, 0, QTableWidgetItem(str(client.id)))
-            self.client_table.setItem(row, 1, QTableWidgetItem(client.client_type.value))
-            self.client_table.setItem(row, 2, QTableWidgetItem(client.phone or ""))
-            self.client_table.setItem(row, 3, QTableWidgetItem(client.email or ""))
-            if client.client_type == ClientType.legal_entity and client.legal_entity_client:
-                self.client_table.setItem(row, 4, QTableWidgetItem(client.legal_entity_client.inn or ""))
-                self.client_table.setItem(row, 5, QTableWidgetItem(client.legal_entity_client.ogrn or ""))
-                self.client_table.setItem(row, 6, QTableWidgetItem(client.legal_entity_client.kpp or ""))
-            else:
-                self.client_table.setItem(row, 4, QTableWidgetItem(""))
-                self.client_table.setItem(row, 5, QTableWidgetItem(""))
-                self.client_table.setItem(row, 6, QTableWidgetItem(""))
+        # Фильтрация и сортировка выполняются в базе, строки подгружаются по мере прокрутки
+        self.client_model.set_client_type(client_type)
+
+    def search_clients(self, search):
+        search = search.strip()
+        # Слишком короткий запрос не отправляется: список остаётся прежним до следующего символа
+        if 0 < len(search) < CLIENT_SEARCH_MIN_LENGTH:
+            return
+        # Заказы прежнего выбранного клиента к новому списку не относятся
+        self.order_table.setRowCount(0)
+        self.client_model.set_search(search)
 
     def load_orders(self):
-        selected_row = self.client_table.currentRow()
-        if selected_row >= 0:
-            client_id = int(self.client_table.item(selected_row, 0).text())
-            self.order_table.setRowCount(0)
-            orders = self.session.query(ClientOrder).filter_by(client_id=client_id).all()
-            self.order_table.setRowCount(len(orders))
-            for row, order in enumerate(orders):
-                # Получаем клиента по client_id
-                client = self.session.query(Client).filter_by(id=order.client_id).first()
-                # Определяем, что отображать: название организации или ФИО
-                if client:
-                    if client.client_type == ClientType.legal_entity and client.legal_entity_client:
-                        client_display = client.legal_entity_client.name
-                    elif client.client_type == ClientType.individual and client.individual_client:
-                        client_display = f"{client.individual_client.last_name} {client.individual_client.first_name}" + \
-                                         (f" {client.individual_client.middle_name}" if client.individual_client.middle_name else "")
-                    else:
-                        client_display = "Неизвестный клиент"
-                else:
-                    client_display = "Неизвестный клиент"
-                self.order_table.setItem(row, 0, QTableWidgetItem(str(order.id)))
-                self.order_table.setItem(row, 1, QTableWidgetItem(str(order.order_date) if order.order_date else ""))
-                self.order_table.setItem(row, 2, QTableWidgetItem(order.status.value))
-                self.order_table.setItem(row, 3, QTableWidgetItem(client_display))
\ No newline at end of file
+        index = self.client_table.currentIndex()
+        client = self.client_model.row_data(index.row()) if index.isValid() else None
+        if client is None:
+            return
+        # При быстром переключении клиентов предыдущий запрос отменяется
+        self.order_loading.set_loading(True)
+        self.executor.submit(
+            "orders",
+            lambda session: fetch_order_rows(order_list_query(session, client.id)),
+            lambda orders: self.show_orders(client, orders),
+            self.show_load_error,
+        )
+
+    def refresh_orders(self, order_ids):
+        """Перечитывает указанные заказы выбранного клиента и обновляет только их строки."""
+        index = self.client_table.currentIndex()
+        client = self.client_model.row_data(index.row()) if index.isValid() else None
+        order_ids = list(order_ids)
+        if client is None or not order_ids:
+            return
+        # У каждого обновления свой ключ: одновременные обновления не отменяют друг друга
+        self.executor.submit(
+            f"orders:refresh:{next(self._order_refresh_keys)}",
+            lambda session: fetch_order_rows(order_list_query(session, client.id).filter(ClientOrder.id.in_(order_ids))),
+            lambda orders: self.patch_orders(client, orders, order_ids),
+            self.show_load_error,
+        )
+
+    def patch_orders(self, client, orders, order_ids=()):
+        """Заменяет строки заказов из orders, новые заказы добавляет в конец (список отсортирован по ID).
+
+        Строки заказов из order_ids, которых нет в orders, удаляются.
+        """
+        if self.selected_client_id() != client.id:
+            return
+        found = {str(order.id) for order in orders}
+        for row in reversed(range(self.order_table.rowCount())):
+            order_id = self.order_table.item(row, 0).text()
+            if order_id not in found and int(order_id) in order_ids:
+                self.order_table.removeRow(row)
+        positions = {self.order_table.item(row, 0).text(): row for row in range(self.order_table.rowCount())}
+        for order in orders:
+            row = positions.get(str(order.id))
+            if row is None:
+                row = self.order_table.rowCount()
+                self.order_table.insertRow(row)
+            self.set_order_row(row, order, client)
+
+    def apply_changes(self, table, ids, parent_ids):
+        """Применяет изменения, полученные от других рабочих мест."""
+        if table in ("Client", "IndividualClient", "LegalEntityClient"):
+            # Массовые изменения (импорт) проще перечитать целиком
+            if len(ids) > self.client_model.page_size:
+                self.client_model.reload()
+            else:
+                self.client_model.refresh_rows(ids)
+            client_index().refresh(self.executor.session_factory)
+        elif table == "ClientOrder":
+            if self.selected_client_id() in parent_ids:
+                self.refresh_orders(ids)
+            self.refresh_sales_dashboard()
+        elif table == "OrderItem":
+            # Позиции меняют суммы заказов; чужие заказы refresh_orders отфильтрует
+            self.refresh_orders(parent_ids)
+            self.refresh_sales_dashboard()
+        elif table == "Product" and self.create_order_dialog is not None:
+            self.create_order_dialog.refresh_product_matches()
+
+    def show_sales_dashboard(self):
+        """Открывает панель продаж с актуальными итогами."""
+        self.stacked_widget.setCurrentWidget(self.sales_dashboard)
+        self.sales_dashboard.reload()
+
+    def refresh_sales_dashboard(self):
+        """Перечитывает итоги продаж, если панель открыта; скрытая обновится при следующем открытии."""
+        if self.sales_dashboard is not None and self.stacked_widget.currentWidget() is self.sales_dashboard:
+            self.sales_dashboard.reload()
+
+    def reload_all(self):
+        """Перечитывает открытые списки, если часть уведомлений могла быть потеряна или их слишком много."""
+        self.client_model.reload()
+        client_index().refresh(self.executor.session_factory)
+        self.refresh_sales_dashboard()
+        # После перезагрузки выделение сброшено, заказы выберутся заново вместе с клиентом
+        self.order_table.setRowCount(0)
+
+    def show_orders(self, client, orders):
+        """Заполняет таблицу заказов результатом фонового запроса."""
+        self.order_loading.set_loading(False)
+        self.order_table.setRowCount(0)
+        self.order_table.setRowCount(len(orders))
+        for row, order in enumerate(orders):
+            self.set_order_row(row, order, client)
+
+    def set_order_row(self, row, order, client):
+        # Все заказы принадлежат выбранному клиенту, имя берём из уже загруженной строки
+        self.order_table.setItem(row, 0, QTableWidgetItem(str(order.id)))
+        self.order_table.setItem(row, 1, QTableWidgetItem(str(order.order_date) if order.order_date else ""))
+        self.order_table.setItem(row, 2, QTableWidgetItem(order.status.value))
+        self.order_table.setItem(row, 3, QTableWidgetItem(client.display_name or ""))
+        self.order_table.setItem(row, 4, QTableWidgetItem(str(order.line_count)))
+        self.order_table.setItem(row, 5, QTableWidgetItem(str(order.total_quantity)))
+        self.order_table.setItem(row, 6, QTableWidgetItem(f"{order.total_amount:.2f}"))
+
+    def show_load_error(self, error):
+        self.order_loading.set_loading(False)
+        QMessageBox.critical(self, "Ошибка", f"Ошибка при загрузке данных: {error}")
+
+    def closeEvent(self, event):
+        # Дожидаемся фоновых запросов, чтобы потоки не пережили окно
+        if self.live_updates is not None:
+            self.live_updates.stop()
+        self.executor.wait()
+        if hasattr(self, "report_jobs"):
+            for job in self.report_jobs.jobs:
+                job.cancel()
+            self.report_jobs.wait()
+        super().closeEvent(event)